@@ -1,23 +1,96 @@
+import copy
+from fractions import Fraction
+
+import allocators
+import simd
 import utils
 from code_generator import CodeGenerator
 import workload_generation
 
 
+# maximum number of chunks of a period of the mixed patterns, i.e. the denominator approximating --read-ratio
+MAX_MIXED_PERIOD = 32
+
+
+class Traffic:
+    """
+    Memory traffic caused by a single array in one iteration of the kernel loop of a pattern
+    """
+    def __init__(self, data_type: str, elements: str = "1", reads: int = 0, writes: int = 0, non_temporal: bool = False):
+        """
+        :param data_type: C type of the array elements
+        :param elements: C expression of the number of elements accessed per iteration
+        :param reads: Number of reads of each accessed element
+        :param writes: Number of writes of each accessed element
+        :param non_temporal: Whether the writes are non-temporal stores, which do not cause write-allocate traffic
+        """
+        self.data_type = data_type
+        self.elements = elements
+        self.reads = reads
+        self.writes = writes
+        self.non_temporal = non_temporal
+
+    def get_bytes(self, write_allocate: bool) -> str:
+        """
+        Returns a C expression of the bytes moved per iteration
+        :param write_allocate: Whether writes additionally cause a read of the cache line (write-allocate)
+        """
+        accesses = self.reads + self.writes * (2 if write_allocate and not self.non_temporal else 1)
+        return f"{accesses} * {self.elements} * sizeof({self.data_type})"
+
+
 class AccessPattern:
+    # whether the kernel is timed as a whole and reported with the traffic model, see get_traffic()
+    measures_bandwidth = True
+    # whether write_body() can execute a slice of the iterations of the kernel loop, see --sample-interval
+    supports_slices = False
+
     def write_definitions(self, args, generator: CodeGenerator):
         pass
 
     def write_header(self, args, generator: CodeGenerator):
         pass
 
-    def write_body(self, args, generator: CodeGenerator):
+    def write_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
+        """
+        Writes the kernel. Patterns supporting slices only execute the iterations [begin, end) of the kernel loop
+        :param begin: C expression of the first iteration
+        :param end: C expression of the iteration after the last one, None for all iterations (see get_iterations())
+        """
         raise NotImplementedError
 
     def write_footer(self, args, generator: CodeGenerator):
         pass
 
+    def get_iterations(self, args) -> str:
+        """
+        Returns a C expression of the number of iterations of the kernel loop, valid after write_header()
+        """
+        raise NotImplementedError
+
+    def get_traffic(self, args) -> [Traffic]:
+        """
+        Returns the traffic model of a single iteration of the kernel loop
+        """
+        raise NotImplementedError
+
+    def get_accesses(self, args) -> str:
+        """
+        Returns a C expression of the number of independent memory accesses of the kernel, reported as accesses per
+        second, or None if the pattern is only reported as bandwidth
+        """
+        return None
+
+    def get_compiler_flags(self) -> list:
+        return []
+
+    def get_linker_flags(self) -> list:
+        return []
+
 
 class StridedPattern(AccessPattern):
+    supports_slices = True
+
     def __init__(self, id):
         self.id = id.lower()
         self.unary = self.id == "copy" or self.id == "scale"
@@ -41,10 +114,22 @@ class StridedPattern(AccessPattern):
     def get_variable_names(self):
         return ["A", "B", "C"][:self.get_num_arrays()]
 
+    def write_definitions(self, args, generator: CodeGenerator):
+        if args.ntStores and len(self.get_output_array_names()) == 0:
+            print(f"warning: --nt-stores has no effect for {self}, which does not store any data")
+        if args.prefetchDistance > 0 and len(self._get_prefetched_arrays(args)) == 0:
+            print(f"warning: --prefetch-distance has no effect for {self} with --nt-stores, whose stores bypass the cache")
+        workload_generation.write_memory_hint_definitions(args, generator)
+        if args.simd != "auto":
+            self._write_simd_definitions(args, generator)
+
     def write_header(self, args, generator: CodeGenerator):
-        per_array_size = args.size // self.get_num_arrays()
+        if args.runtimeParameters:
+            per_array_size = f"({workload_generation.get_parameter(args, 'size')} / {self.get_num_arrays()})"
+        else:
+            per_array_size = args.size // self.get_num_arrays()
         generator.add_line(
-            f"long N = ((long) {args.stride}*{per_array_size})/sizeof({args.dataType});")  # compute number of elements in each array
+            f"long N = ((long) {workload_generation.get_parameter(args, 'stride')}*{per_array_size})/sizeof({args.dataType});")  # compute number of elements in each array
 
         for var in self.get_variable_names():  # allocate all required arrays
             generator.add_line(f"{args.dataType}* {var};")
@@ -55,23 +140,15 @@ class StridedPattern(AccessPattern):
         generator.add_line(f"{args.dataType} temp = 0;")
         generator.add_line("temp = 1;")
         generator.include("math.h", sys=True)
+        if args.simd != "auto":
+            self._write_kernel_dispatch(args, generator)
 
     def _write_kernel_line(self, args, generator: CodeGenerator, offset: str):
         if offset != "0":
             offset = " + " + offset
         else:
             offset = ""
-        if self.id == "copy":
-            generator.add_line(f"B[i{offset}] = A[i{offset}];")
-        elif self.id == "scale":
-            generator.add_line(f"B[i{offset}] = 3 * A[i{offset}];")
-        elif self.id == "add":
-            generator.add_line(f"C[i{offset}] = A[i{offset}] + B[i{offset}];")
-        elif self.id == "triad":
-            generator.add_line(f"C[i{offset}] = A[i{offset}] + 3 * B[i{offset}];")
-        elif self.id == "store":
-            generator.add_line(f"A[i{offset}] = {utils.get_number_literal(args, 1)};")
-        elif self.id == "load":
+        if self.id == "load":
             generator.add_line(f"index = i{offset};")
             generator.add_line("__asm__ volatile (")
             generator.add_line("\"movq (%[array], %[index], 8), %[out]\\n\"")
@@ -81,26 +158,66 @@ class StridedPattern(AccessPattern):
             generator.add_line(": [array]\"r\"(A), [index]\"r\"(index)")
             generator.add_line(");")
         else:
-            raise ValueError("Invalid operation id: " + self.id)
+            generator.add_line(self._get_scalar_statement(args, f"i{offset}"))
 
-    def write_body(self, args, generator: CodeGenerator):
-        stride = args.stride
-        if args.parallelize:
-            omp_flags = ""
-            input_array_names = list(set(self.get_variable_names()) - set(self.get_output_array_names()))
-            if len(input_array_names) > 0:
-                omp_flags = f" firstprivate({', '.join(input_array_names)})"
-            generator.add_line(f"#pragma omp parallel for{omp_flags} lastprivate(temp)")
-        generator.add_line(f"for (int i = 0; i < N - {stride + args.chunkSize}; i += {stride + args.chunkSize - 1}) {{")
+    def _get_loop_bounds(self, args) -> (str, str):
+        """
+        Returns C expressions of the upper bound offset and the step of the kernel loop
+        """
+        if args.runtimeParameters:
+            stride = workload_generation.get_parameter(args, "stride")
+            chunk_size = workload_generation.get_parameter(args, "chunkSize")
+            return f"({stride} + {chunk_size})", f"({stride} + {chunk_size} - 1)"
+        return str(args.stride + args.chunkSize), str(args.stride + args.chunkSize - 1)
+
+    def _write_loop(self, args, generator: CodeGenerator, chunk_size: int = None, begin: str = "0", end: str = None):
+        """
+        Writes the kernel loop over the chunks [begin, end). The chunk loop is unrolled if chunk_size is a small
+        compile-time constant, otherwise it iterates over the chunk size parameter
+        """
+        bound, step = self._get_loop_bounds(args)
+        omp_flags = ""
+        input_array_names = sorted(set(self.get_variable_names()) - set(self.get_output_array_names()))
+        if len(input_array_names) > 0:
+            omp_flags = f" firstprivate({', '.join(input_array_names)})"
+        if len(self._get_prefetched_arrays(args)) > 0:
+            generator.add_line(f"long prefetch_ahead = {args.prefetchDistance} * {step};")
+        workload_generation.write_parallel_for(args, generator, lambda: self._write_loop_nest(args, generator, chunk_size, begin, end),
+                                               omp_flags, " lastprivate(temp)", fence=self._uses_nt_stores(args))
+
+    def _uses_nt_stores(self, args) -> bool:
+        return args.ntStores and len(self.get_output_array_names()) > 0
+
+    def _get_prefetched_arrays(self, args) -> [str]:
+        if args.prefetchDistance == 0:
+            return []
+        # non-temporal stores bypass the cache, so their output arrays are not prefetched
+        return [var for var in self.get_variable_names() if not (args.ntStores and var in self.get_output_array_names())]
+
+    def _write_prefetches(self, args, generator: CodeGenerator, index: str, elements: str):
+        for var in self._get_prefetched_arrays(args):
+            workload_generation.write_prefetch(args, generator, var, index, elements,
+                                               write=var in self.get_output_array_names())
+
+    def _write_loop_nest(self, args, generator: CodeGenerator, chunk_size: int = None, begin: str = "0", end: str = None):
+        bound, step = self._get_loop_bounds(args)
+        first = "0" if begin == "0" else f"{begin} * {step}"
+        limit = f"N - {bound}" if end is None else f"{end} * {step}"
+        generator.add_line(f"for (long i = {first}; i < {limit}; i += {step}) {{")
         generator.start_indent()
 
         if self.id == "load":
             generator.add_line("size_t index;")
-        if args.chunkSize < 4:
-            for i in range(args.chunkSize):
+        if len(self._get_prefetched_arrays(args)) > 0:
+            small_chunk = chunk_size is not None and chunk_size < 4
+            self._write_prefetches(args, generator, "i + prefetch_ahead",
+                                   "1" if small_chunk else workload_generation.get_parameter(args, "chunkSize"))
+        if chunk_size is not None and chunk_size < 4:
+            for i in range(chunk_size):
                 self._write_kernel_line(args, generator, offset=str(i))
         else:
-            generator.add_line(f"for (int j = 0; j < {args.chunkSize}; j += 1) {{")
+            chunk_size = workload_generation.get_parameter(args, "chunkSize") if chunk_size is None else chunk_size
+            generator.add_line(f"for (int j = 0; j < {chunk_size}; j += 1) {{")
             generator.start_indent()
             self._write_kernel_line(args, generator, "j")
             generator.close_indent()
@@ -108,13 +225,214 @@ class StridedPattern(AccessPattern):
 
         generator.close_indent()
         generator.add_line("}")
-        generator.add_print_statement("Temp: %f", "temp")
-        generator.add_line("result = A[0]; // do not optimize away loop")
+
+    def _get_kernel_name(self, instruction_set) -> str:
+        return f"mwg_strided_{self.id}_{instruction_set if instruction_set is not None else 'scalar'}"
+
+    def _get_vector_statements(self, args, instruction_set, index: str) -> [str]:
+        data_type = args.dataType
+        load = lambda array: instruction_set.load(data_type, f"{array} + {index}")
+        store = instruction_set.stream if args.ntStores else instruction_set.store
+        three = instruction_set.set1(data_type, utils.get_number_literal(args, 3))
+        if self.id == "copy":
+            return [store(data_type, f"B + {index}", load("A"))]
+        elif self.id == "scale":
+            return [store(data_type, f"B + {index}", instruction_set.mul(data_type, three, load("A")))]
+        elif self.id == "add":
+            return [store(data_type, f"C + {index}", instruction_set.add(data_type, load("A"), load("B")))]
+        elif self.id == "triad":
+            return [store(data_type, f"C + {index}",
+                          instruction_set.add(data_type, load("A"), instruction_set.mul(data_type, three, load("B"))))]
+        elif self.id == "store":
+            return [store(data_type, f"A + {index}", instruction_set.set1(data_type, utils.get_number_literal(args, 1)))]
+        elif self.id == "load":
+            return [f"acc = {instruction_set.add(data_type, 'acc', load('A'))};"]
+        raise ValueError("Invalid operation id: " + self.id)
+
+    def _get_scalar_statement(self, args, index: str) -> str:
+        store = lambda target, value: workload_generation.get_store_statement(args, target, value)
+        if self.id == "copy":
+            return store(f"B[{index}]", f"A[{index}]")
+        elif self.id == "scale":
+            return store(f"B[{index}]", f"3 * A[{index}]")
+        elif self.id == "add":
+            return store(f"C[{index}]", f"A[{index}] + B[{index}]")
+        elif self.id == "triad":
+            return store(f"C[{index}]", f"A[{index}] + 3 * B[{index}]")
+        elif self.id == "store":
+            return store(f"A[{index}]", utils.get_number_literal(args, 1))
+        elif self.id == "load":
+            return f"sum += A[{index}];"
+        raise ValueError("Invalid operation id: " + self.id)
+
+    def _write_simd_kernel(self, args, generator: CodeGenerator, instruction_set):
+        """
+        Writes a kernel function processing `count` chunks starting at chunk `first`, either with intrinsics of the
+        given instruction set (remainder of each chunk handled by scalar code) or purely scalar if instruction_set is
+        None. Non-temporal vector stores require aligned addresses, so the elements of a chunk before the first aligned
+        output address are stored by scalar code
+        """
+        data_type = args.dataType
+        attribute = instruction_set.get_function_attribute() if instruction_set is not None else "MWG_SCALAR_FUNCTION"
+        generator.add_line(f"{attribute} double {self._get_kernel_name(instruction_set)}({data_type}* A, {data_type}* B, {data_type}* C, long first, long count, long step, long chunk) {{")
+        generator.start_indent()
+        generator.add_line("double sum = 0.0;")
+        if len(self._get_prefetched_arrays(args)) > 0:
+            generator.add_line(f"long ahead = {args.prefetchDistance} * step;")
+        if instruction_set is not None and self.id == "load":
+            generator.add_line(f"{instruction_set.vector_type(data_type)} acc = {instruction_set.setzero(data_type)};")
+        generator.add_line("for (long c = 0; c < count; c++) {")
+        generator.start_indent()
+        generator.add_line("long base = (first + c) * step;")
+        generator.add_line("long j = 0;")
+        if instruction_set is not None:
+            width = instruction_set.get_vector_width(data_type)
+            if self._uses_nt_stores(args):
+                output = self.get_output_array_names()[0]
+                generator.add_line(f"for (; j < chunk && (uintptr_t) ({output} + base + j) % {instruction_set.get_register_bytes()} != 0; j++) {{")
+                generator.new_intended_block(lambda: generator.add_line(self._get_scalar_statement(args, "base + j")))
+                generator.add_line("}")
+            generator.add_line(f"for (; j + {width} <= chunk; j += {width}) {{")
+            generator.start_indent()
+            if len(self._get_prefetched_arrays(args)) > 0:
+                self._write_prefetches(args, generator, "base + j + ahead", "1")
+            for statement in self._get_vector_statements(args, instruction_set, "base + j"):
+                generator.add_line(statement)
+            generator.close_indent()
+            generator.add_line("}")
+            generator.add_line("for (; j < chunk; j++) {")
+            generator.new_intended_block(lambda: generator.add_line(self._get_scalar_statement(args, "base + j")))
+            generator.add_line("}")
+        else:
+            generator.add_line("MWG_NOVECTOR")
+            generator.add_line("for (; j < chunk; j++) {")
+            generator.start_indent()
+            if len(self._get_prefetched_arrays(args)) > 0:
+                self._write_prefetches(args, generator, "base + j + ahead", "1")
+            generator.add_line(self._get_scalar_statement(args, "base + j"))
+            generator.close_indent()
+            generator.add_line("}")
+        generator.close_indent()
+        generator.add_line("}")
+        if instruction_set is not None and self.id == "load":
+            width = instruction_set.get_vector_width(data_type)
+            generator.add_line(f"{data_type} lanes[{width}];")
+            generator.add_line(instruction_set.store(data_type, "lanes", "acc"))
+            generator.add_line(f"for (int l = 0; l < {width}; l++) {{")
+            generator.new_intended_block(lambda: generator.add_line("sum += lanes[l];"))
+            generator.add_line("}")
+        if self._uses_nt_stores(args):
+            generator.add_line("mwg_stream_fence();")
+        generator.add_line("return sum;")
+        generator.close_indent()
+        generator.add_line("}")
+
+    def _write_simd_definitions(self, args, generator: CodeGenerator):
+        data_type = args.dataType
+        if self.id == "load" and args.arithmeticIntensity > 0:
+            print("warning: The arithmetic intensity is ignored for explicit SIMD kernels")
+        generator.include("stdint.h", sys=True)
+        generator.add_definition("simd_scalar", """#if defined(__clang__)
+#define MWG_NOVECTOR _Pragma("clang loop vectorize(disable) interleave(disable)")
+#define MWG_SCALAR_FUNCTION
+#else
+#define MWG_NOVECTOR
+#define MWG_SCALAR_FUNCTION __attribute__((optimize("no-tree-vectorize")))
+#endif
+#if defined(__x86_64__) || defined(__i386__)
+#include <immintrin.h>
+#define MWG_X86 1
+#endif""")
+        generator.add_line(f"typedef double (*mwg_strided_kernel_t)({data_type}*, {data_type}*, {data_type}*, long, long, long, long);")
+        self._write_simd_kernel(args, generator, None)
+        instruction_set = simd.get_registered(args.simd)
+        if instruction_set is not None:
+            generator.add_line("#ifdef MWG_X86")
+            self._write_simd_kernel(args, generator, instruction_set)
+            generator.add_line("#endif")
+        generator.add_multiline_indented(f"""double mwg_strided_run(mwg_strided_kernel_t kernel, {data_type}* A, {data_type}* B, {data_type}* C, long first, long last, long step, long chunk) {{
+    if (step == chunk) {{
+        // adjacent chunks form a single contiguous range
+        return kernel(A, B, C, first, 1, step, (last - first) * chunk);
+    }}
+    return kernel(A, B, C, first, last - first, step, chunk);
+}}""")
+
+    def _write_kernel_dispatch(self, args, generator: CodeGenerator):
+        generator.add_line(f"mwg_strided_kernel_t kernel = {self._get_kernel_name(None)};")
+        generator.add_line("const char* kernel_isa = \"scalar\";")
+        instruction_set = simd.get_registered(args.simd)
+        if instruction_set is not None:
+            generator.add_line("#ifdef MWG_X86")
+            generator.add_line(f"if (__builtin_cpu_supports(\"{instruction_set.cpu_feature}\")) {{")
+            generator.start_indent()
+            generator.add_line(f"kernel = {self._get_kernel_name(instruction_set)};")
+            generator.add_line(f"kernel_isa = \"{instruction_set}\";")
+            generator.close_indent()
+            generator.add_line("}")
+            generator.add_line("#endif")
+        if not args.silent:
+            generator.add_print_statement("Using %s kernel", "kernel_isa")
+
+    def _write_simd_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
+        bound, step = self._get_loop_bounds(args)
+        arrays = ", ".join([var if var in self.get_variable_names() else "NULL" for var in ["A", "B", "C"]])
+        generator.add_line(f"long chunks = {self.get_iterations(args) if end is None else f'{end} - {begin}'};")
+        first = "" if begin == "0" else f"{begin} + "
+        generator.add_line("double kernel_sum = 0.0;")
+        if args.parallelize:
+            generator.add_line("#pragma omp parallel reduction(+:kernel_sum)")
+            generator.add_line("{")
+            generator.start_indent()
+            generator.add_line("long threads = omp_get_num_threads();")
+            generator.add_line("long t = omp_get_thread_num();")
+            generator.add_line(f"kernel_sum += mwg_strided_run(kernel, {arrays}, {first}chunks * t / threads, {first}chunks * (t + 1) / threads, {step}, {workload_generation.get_parameter(args, 'chunkSize')});")
+            generator.close_indent()
+            generator.add_line("}")
+        else:
+            generator.add_line(f"kernel_sum += mwg_strided_run(kernel, {arrays}, {begin}, {first}chunks, {step}, {workload_generation.get_parameter(args, 'chunkSize')});")
+        generator.add_line("temp = kernel_sum;")
+
+    def write_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
+        if args.simd != "auto":
+            self._write_simd_body(args, generator, begin, end)
+        elif args.runtimeParameters:
+            # dispatch to loops specialized for small chunk sizes
+            chunk_size = workload_generation.get_parameter(args, "chunkSize")
+            for i, specialized in enumerate(workload_generation.SPECIALIZED_CHUNK_SIZES):
+                generator.add_line(f"{'if' if i == 0 else '} else if'} ({chunk_size} == {specialized}) {{")
+                generator.new_intended_block(lambda: self._write_loop(args, generator, specialized, begin, end))
+            generator.add_line("} else {")
+            generator.new_intended_block(lambda: self._write_loop(args, generator, None, begin, end))
+            generator.add_line("}")
+        else:
+            self._write_loop(args, generator, args.chunkSize, begin, end)
+        generator.add_line(f"result = {self._get_result_expression()}; // do not optimize away loop")
+
+    def _get_result_expression(self) -> str:
+        """
+        Returns a C expression reading the input array A and every output array, such that the stores of the kernel are
+        not eliminated as dead stores. The first element is read, as the loop bounds may leave the last ones unwritten
+        """
+        return " + ".join(dict.fromkeys(["A[0]"] + [f"{array}[0]" for array in self.get_output_array_names()]))
 
     def write_footer(self, args, generator: CodeGenerator):
+        generator.add_print_statement("Temp: %f", "temp")
         for array in self.get_variable_names():
             args.allocator.free(args, generator, array, args.dataType, "N")
 
+    def get_iterations(self, args) -> str:
+        bound, step = self._get_loop_bounds(args)
+        if args.runtimeParameters:
+            return f"((N - {bound}) + {step} - 1) / {step}"
+        return f"((N - {bound}) + {int(step) - 1}) / {step}"
+
+    def get_traffic(self, args) -> [Traffic]:
+        outputs = self.get_output_array_names()
+        return [Traffic(args.dataType, workload_generation.get_parameter(args, "chunkSize"), reads=0 if var in outputs else 1, writes=1 if var in outputs else 0,
+                        non_temporal=args.ntStores)
+                for var in self.get_variable_names()]
+
     def __repr__(self):
         return f"strided-{self.id}"
 
@@ -125,7 +443,7 @@ class CRSSumAccessPattern(AccessPattern):
         generator.include("stdlib.h", sys=True)
 
         # three array: vals, col_index, row_index
-        generator.add_line(f"int NNZ = {args.size}/sizeof({args.dataType});")  # compute number of non-zero values
+        generator.add_line(f"int NNZ = {workload_generation.get_parameter(args, 'size')}/sizeof({args.dataType});")  # compute number of non-zero values
         generator.add_line(f"int row_count = 64;")
         generator.add_line(f"int nnz_per_row = NNZ / row_count;")
         generator.add_line(f"int row_factor = 64;")
@@ -153,7 +471,7 @@ for (int i = 0; i < row_count; i++) {{
         generator.add_line("row_index[row_count] = NNZ;")
         generator.add_print_statement("Init completed")
 
-    def write_body(self, args, generator: CodeGenerator):
+    def write_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
         generator.add_line(f"{args.dataType} sum = 0.0;")
         if args.parallelize:
             generator.add_line("#pragma omp parallel for reduction(+:sum)")
@@ -169,11 +487,19 @@ for (int i = 0; i < row_count; i++) {{
         args.allocator.free(args, generator, "col_index", "int", "NNZ")
         args.allocator.free(args, generator, "row_index", "int", "row_count + 1")
 
+    def get_iterations(self, args) -> str:
+        return "NNZ"
+
+    def get_traffic(self, args) -> [Traffic]:
+        return [Traffic("int", reads=1), Traffic(args.dataType, reads=1)]
+
     def __repr__(self):
         return "crs-sum"
 
 
 class RandomAccessPattern(AccessPattern):
+    supports_slices = True
+
     def __init__(self, sid: str):
         self.sid = sid
 
@@ -183,216 +509,931 @@ class RandomAccessPattern(AccessPattern):
 
         if args.stride != 1:
             print("warning: The stride parameter will be ignored for pointer-chasing access pattern")
-        generator.add_multiline_indented("""void fisher_yates_shuffle(size_t n, size_t* a) {
-    for (size_t i = n - 1; i > 0; i--) {
-        size_t j = rand() % (i + 1);
-        size_t tmp = a[j];
-        a[j] = a[i];
-        a[i] = tmp;
-    }
-}       
-""")
+        if args.ntStores and self.sid != "store":
+            print(f"warning: --nt-stores has no effect for {self}, which does not store any data")
+        if args.chains is not None and args.distribution != "uniform":
+            print(f"warning: --chains is ignored for --distribution {args.distribution}, whose accesses are independent already")
+        elif args.chains is not None and args.prefetchDistance > 0:
+            print("warning: --prefetch-distance is ignored with --chains")
+        workload_generation.write_random_definitions(args, generator)
+        workload_generation.write_distribution_definitions(args, generator)
+        workload_generation.write_memory_hint_definitions(args, generator)
 
     def write_header(self, args, generator: CodeGenerator):
-        generator.add_line(f"size_t size = {args.size} / ({args.chunkSize} * sizeof({args.dataType}));")
-        generator.add_line(f"size_t chunkSize = {args.chunkSize};")
+        generator.add_line(f"size_t size = {workload_generation.get_parameter(args, 'size')} / ({workload_generation.get_parameter(args, 'chunkSize')} * sizeof({args.dataType}));")
+        generator.add_line(f"size_t chunkSize = {workload_generation.get_parameter(args, 'chunkSize')};")
         generator.add_line(f"size_t dataSize = size + chunkSize;")
         generator.add_line("size_t* next_indices;")
         args.allocator.allocate(args, generator, "next_indices", "size_t", "size", silent=True)
-        generator.add_multiline_indented("""for(size_t i = 0; i < size; i++) {
+        if args.distribution != "uniform":
+            # a skewed distribution revisits offsets, so next_indices holds the offsets of all steps instead of a cycle
+            workload_generation.write_random_indices(args, generator, "next_indices", "size", "size", 37)
+        elif self._has_chains(args):
+            self._write_chain_setup(args, generator)
+        else:
+            if args.parallelize:
+                generator.add_line("#pragma omp parallel for schedule(static)")
+            generator.add_multiline_indented("""for(size_t i = 0; i < size; i++) {
     next_indices[i] = i;
-}
-fisher_yates_shuffle(size, next_indices);
-""")
+}""")
+            workload_generation.write_shuffle(args, generator, "size", "next_indices", 37)
         generator.add_line(f"{args.dataType}* data;")
         args.allocator.allocate(args, generator, "data", args.dataType, "dataSize")
         workload_generation.write_array_initialization(args, generator, "data", "dataSize",
                                                        utils.get_number_literal(args, 1))
 
-    def write_body(self, args, generator: CodeGenerator):
-        if self.sid == "store":
-            if args.parallelize:
-                generator.add_multiline_indented("""#pragma omp parallel firstprivate(data, next_indices)
-{
-    size_t per_thread = (size / omp_get_num_threads());
-    size_t offset = per_thread * omp_get_thread_num();
-    for (int i = 0; i < per_thread; i++) {
-        for(int j = 0; j < chunkSize; j++) {
-            data[offset + j] = 3.0;
-        }
-        offset = next_indices[offset];
-    }
-}
-""")
-            else:
-                generator.add_multiline_indented("""size_t offset = 0;
-for (int i = 0; i < size; i++) {
-    for(int j = 0; j < chunkSize; j++) {
-        data[offset + j] = 3.0;
+    def _has_chains(self, args) -> bool:
+        return args.chains is not None and args.distribution == "uniform"
+
+    def _write_chain_setup(self, args, generator: CodeGenerator):
+        """
+        Links next_indices to --chains disjoint cycles per thread. A random order of all chunks is split into
+        chain_count segments and every segment is closed to a cycle, such that the chains of all threads together visit
+        every chunk once per repetition. chain_offsets holds the current position of every chain, kept across
+        repetitions and slices
+        """
+        threads = "omp_get_max_threads()" if args.parallelize else "1"
+        generator.add_line(f"size_t chain_count = (size_t) {args.chains} * {threads};")
+        generator.add_multiline_indented("""if (size < chain_count) {
+  printf("err: %zu chunks are too few for %zu chains\\n", size, chain_count);
+  return 1;
+}""")
+        generator.add_line("size_t* chain_offsets = (size_t*) malloc(sizeof(size_t) * chain_count);")
+        generator.add_line("size_t* chain_order = (size_t*) malloc(sizeof(size_t) * size);")
+        if args.parallelize:
+            generator.add_line("#pragma omp parallel for schedule(static)")
+        generator.add_multiline_indented("""for(size_t i = 0; i < size; i++) {
+    chain_order[i] = i;
+}""")
+        workload_generation.write_shuffle(args, generator, "size", "chain_order", 37)
+        if args.parallelize:
+            generator.add_line("#pragma omp parallel for schedule(static)")
+        generator.add_multiline_indented("""for(size_t c = 0; c < chain_count; c++) {
+    size_t first = size * c / chain_count;
+    size_t last = size * (c + 1) / chain_count;
+    for(size_t i = first; i < last; i++) {
+        next_indices[chain_order[i]] = chain_order[i + 1 < last ? i + 1 : first];
     }
-    offset = next_indices[offset];
-}
-""")
+    chain_offsets[c] = chain_order[first];
+}""")
+        generator.add_line("free(chain_order);")
+
+    def _write_chains(self, args, generator: CodeGenerator, steps: str, chains: str):
+        """
+        Writes the loop advancing --chains cursors, starting at chains[0..K), in lockstep for the given number of steps
+        in total. The steps of the chains are independent, so up to K accesses are in flight at once
+        """
+        generator.add_line(f"size_t per_chain = {steps} / {args.chains};")
+        for c in range(args.chains):
+            generator.add_line(f"size_t offset{c} = {chains}[{c}];")
+        if self.sid == "load":
+            generator.add_line("size_t index;")
+        generator.add_line("for (size_t i = 0; i < per_chain; i++) {")
+        generator.start_indent()
+        for c in range(args.chains):
+            self._write_chunk_access(args, generator, f"offset{c}", declare_index=False)
+        for c in range(args.chains):
+            generator.add_line(f"offset{c} = next_indices[offset{c}];")
+        generator.close_indent()
+        generator.add_line("}")
+        for c in range(args.chains):
+            generator.add_line(f"{chains}[{c}] = offset{c};")
+        if self.sid == "store" and args.ntStores:
+            generator.add_line("mwg_stream_fence();")
+
+    def _write_chunk_access(self, args, generator: CodeGenerator, offset: str = "offset", declare_index: bool = True):
+        if self.sid == "load" and declare_index:
+            generator.add_line("size_t index;")
+        generator.add_line("for(int j = 0; j < chunkSize; j++) {")
+        generator.start_indent()
+        if self.sid == "store":
+            generator.add_line(workload_generation.get_store_statement(args, f"data[{offset} + j]", "3.0"))
         elif self.sid == "load":
-            if args.parallelize:
-                generator.add_multiline_indented("""#pragma omp parallel firstprivate(data, next_indices)
-{
-    size_t per_thread = (size / omp_get_num_threads());
-    size_t offset = per_thread * omp_get_thread_num();
-    for (int i = 0; i < per_thread; i++) {
-        size_t index;
-        for(int j = 0; j < chunkSize; j++) {
-            index = offset + j;
-            double val;
-            __asm__ volatile (
-                "movq (%[array], %[index], 8), %[out]\\n"
-                : [out]"=r"(val)
-                : [array]"r"(data), [index]"r"(index)
-            );
-        }
-        offset = next_indices[offset];
-    }
-}
-""")
-            else:
-                generator.add_multiline_indented("""size_t offset = 0;
-for (int i = 0; i < size; i++) {
-    size_t index;
-    for(int j = 0; j < chunkSize; j++) {
-        index = offset + j;
-        double val;
-        __asm__ volatile (
-            "movq (%[array], %[index], 8), %[out]\\n"
-            : [out]"=r"(val)
-            : [array]"r"(data), [index]"r"(index)
-        );
-    }
-    offset = next_indices[offset];
-}
-""")
-        elif self.sid == "sum":
+            generator.add_multiline_indented(f"""index = {offset} + j;
+double val;
+__asm__ volatile (
+    "movq (%[array], %[index], 8), %[out]\\n"
+    : [out]"=r"(val)
+    : [array]"r"(data), [index]"r"(index)
+);""")
+        else:
+            generator.add_line(f"sum += data[{offset} + j];")
+        generator.close_indent()
+        generator.add_line("}")
+
+    def _write_stream(self, args, generator: CodeGenerator, steps: str):
+        """
+        Writes the loop accessing the offsets stored in next_indices from position offset on for the given number of
+        steps, used for skewed distributions. With --prefetch-distance, the chunk accessed that many steps later is
+        prefetched
+        """
+        generator.add_line("size_t position = offset;")
+        generator.add_line(f"for (size_t i = 0; i < {steps}; i++) {{")
+        generator.start_indent()
+        generator.add_line("offset = next_indices[position + i];")
+        if args.prefetchDistance > 0 and not (self.sid == "store" and args.ntStores):
+            generator.add_line(f"if (position + i + {args.prefetchDistance} < size) {{")
+            generator.new_intended_block(lambda: workload_generation.write_prefetch(
+                args, generator, "data", f"next_indices[position + i + {args.prefetchDistance}]", "chunkSize",
+                write=self.sid == "store"))
+            generator.add_line("}")
+        self._write_chunk_access(args, generator)
+        generator.close_indent()
+        generator.add_line("}")
+        if self.sid == "store" and args.ntStores:
+            generator.add_line("mwg_stream_fence();")
+
+    def _write_chase(self, args, generator: CodeGenerator, steps: str):
+        """
+        Writes the loop following next_indices from offset for the given number of steps. With --prefetch-distance, a
+        second cursor runs ahead on the same chain and prefetches the chunks that are accessed that many steps later
+        """
+        if args.distribution != "uniform":
+            self._write_stream(args, generator, steps)
+            return
+        if args.prefetchDistance > 0:
+            generator.add_line("size_t prefetch_offset = offset;")
+            generator.add_line(f"for (long k = 0; k < {args.prefetchDistance}; k++) {{")
+            generator.new_intended_block(lambda: generator.add_line("prefetch_offset = next_indices[prefetch_offset];"))
+            generator.add_line("}")
+        generator.add_line(f"for (size_t i = 0; i < {steps}; i++) {{")
+        generator.start_indent()
+        if args.prefetchDistance > 0:
+            if not (self.sid == "store" and args.ntStores):  # non-temporal stores bypass the cache
+                workload_generation.write_prefetch(args, generator, "data", "prefetch_offset", "chunkSize",
+                                                   write=self.sid == "store")
+            generator.add_line("prefetch_offset = next_indices[prefetch_offset];")
+        self._write_chunk_access(args, generator)
+        generator.add_line("offset = next_indices[offset];")
+        generator.close_indent()
+        generator.add_line("}")
+        if self.sid == "store" and args.ntStores:
+            generator.add_line("mwg_stream_fence();")
+
+    def write_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
+        # a slice starts the chase at the element of its first iteration, so slices follow different parts of the chain
+        steps = "size" if end is None else f"({end} - {begin})"
+        first = "" if begin == "0" else f"{begin} + "
+        if self.sid not in ["load", "store", "sum"]:
+            print("err: invalid pattern", self.sid)
+            return
+        if self.sid == "sum":
             generator.add_line("double sum = 0.0;")
-            if args.parallelize:
-                generator.add_multiline_indented("""#pragma omp parallel reduction(+:sum) firstprivate(data, next_indices)
-{
-    size_t per_thread = (size / omp_get_num_threads());
-    size_t offset = per_thread * omp_get_thread_num();
-    for (int i = 0; i < per_thread; i++) {
-        for(int j = 0; j < chunkSize; j++) {
-            sum += data[offset + j];
-        }
-        offset = next_indices[offset];
-    }
-}
-""")
+        if args.parallelize:
+            reduction = "reduction(+:sum) " if self.sid == "sum" else ""
+            generator.add_line(f"#pragma omp parallel {reduction}firstprivate(data, next_indices)")
+            generator.add_line("{")
+            generator.start_indent()
+            generator.add_line(f"size_t per_thread = ({steps} / omp_get_num_threads());")
+            if self._has_chains(args):
+                # the chains continue where the previous slice or repetition stopped
+                generator.add_line(f"size_t* thread_chains = chain_offsets + (size_t) {args.chains} * omp_get_thread_num();")
+                self._write_chains(args, generator, "per_thread", "thread_chains")
             else:
-                generator.add_multiline_indented("""size_t offset = 0;
-for (int i = 0; i < size; i++) {
-    for(int j = 0; j < chunkSize; j++) {
-        sum += data[offset + j];
-    }
-    offset = next_indices[offset];
-}
-""")
+                generator.add_line(f"size_t offset = {first}per_thread * omp_get_thread_num();")
+                self._write_chase(args, generator, "per_thread")
+            generator.close_indent()
+            generator.add_line("}")
+        elif self._has_chains(args):
+            self._write_chains(args, generator, steps, "chain_offsets")
         else:
-            print("err: invalid pattern", self.sid)
+            generator.add_line(f"size_t offset = {begin};")
+            self._write_chase(args, generator, steps)
+        if self.sid == "sum":
+            generator.add_line("result = sum; // do not optimize away loop")
+        elif self.sid == "store":
+            generator.add_line("result = data[0]; // do not optimize away the stores")
 
     def write_footer(self, args, generator: CodeGenerator):
+        if self._has_chains(args):
+            generator.add_line("free(chain_offsets);")
         args.allocator.free(args, generator, "next_indices", "size_t", "size")
         args.allocator.free(args, generator, "data", args.dataType, "dataSize")
 
+    def get_iterations(self, args) -> str:
+        return "size"
+
+    def get_accesses(self, args) -> str:
+        return "size"
+
+    def get_traffic(self, args) -> [Traffic]:
+        return [Traffic("size_t", reads=1),
+                Traffic(args.dataType, "chunkSize", reads=0 if self.sid == "store" else 1, writes=1 if self.sid == "store" else 0,
+                        non_temporal=args.ntStores)]
+
     def __repr__(self):
         return "random-" + self.sid
 
 
 class GatherPattern(AccessPattern):
-    def write_header(self, args, generator: CodeGenerator):
-        generator.include("time.h", sys=True)
-        generator.include("stdlib.h", sys=True)
-        generator.add_multiline_indented("srand(37);")
+    supports_slices = True
+
+    def write_definitions(self, args, generator: CodeGenerator):
+        workload_generation.write_random_definitions(args, generator)
+        workload_generation.write_distribution_definitions(args, generator)
+        workload_generation.write_memory_hint_definitions(args, generator)
 
+    def write_header(self, args, generator: CodeGenerator):
         generator.add_line(
-            f"long N = ((long) {args.stride}*{args.size})/sizeof({args.dataType});")  # compute number of elements in each array
+            f"long N = ((long) {workload_generation.get_parameter(args, 'stride')}*{workload_generation.get_parameter(args, 'size')})/sizeof({args.dataType});")  # compute number of elements in each array
         generator.add_line("long F = 1024;")
         generator.add_line("long NF = N * F;")
         generator.add_line(f"{args.dataType}* x;")
         generator.add_line(f"{args.dataType}* y;")
-        generator.add_line("int* idx;")
+        generator.add_line("size_t* idx;")
         args.allocator.allocate(args, generator, "y", args.dataType, "NF")
         args.allocator.allocate(args, generator, "x", args.dataType, "N")
-        args.allocator.allocate(args, generator, "idx", "int", "N")
+        args.allocator.allocate(args, generator, "idx", "size_t", "N")
         workload_generation.write_array_initialization(args, generator, "y", "NF",
                                                        utils.get_number_literal(args, 3))
 
-        if args.parallelize:
-            generator.add_line("#pragma omp parallel for shared(idx) firstprivate(N, NF)")
-        generator.add_multiline_indented(f"""
-for(long i = 0; i < N; i++) {{
-    idx[i] = (double) (rand() % NF);
-}}
-""")
+        workload_generation.write_random_indices(args, generator, "idx", "N", "NF", 37)
+
+    def _write_loop(self, args, generator: CodeGenerator, begin: str, end: str):
+        generator.add_line(f"for(long i = {begin}; i < {'N' if end is None else end}; i++) {{")
+        generator.start_indent()
+        if args.prefetchDistance > 0:
+            generator.add_line(f"if (i + {args.prefetchDistance} < N) {{")
+            generator.new_intended_block(lambda: workload_generation.write_prefetch(args, generator, "y", f"idx[i + {args.prefetchDistance}]"))
+            generator.add_line("}")
+        generator.add_line(workload_generation.get_store_statement(args, "x[i]", "y[idx[i]]"))
+        generator.close_indent()
+        generator.add_line("}")
+
+    def write_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
+        workload_generation.write_parallel_for(args, generator, lambda: self._write_loop(args, generator, begin, end),
+                                               " shared(x) firstprivate(y,idx, N)", fence=args.ntStores)
+        generator.add_line("result = x[N - 1];")
 
-    def write_body(self, args, generator: CodeGenerator):
-        if args.parallelize:
-            generator.add_line("#pragma omp parallel for shared(x) firstprivate(y,idx, N)")
-            generator.add_multiline_indented("""
-for(long i = 0; i < N; i++) {
-    x[i] = y[idx[i]];
-}
-result = x[N - 1];""")
-    
     def write_footer(self, args, generator: CodeGenerator):
         args.allocator.free(args, generator, "y", args.dataType, "NF")
         args.allocator.free(args, generator, "x", args.dataType, "N")
-        args.allocator.free(args, generator, "idx", "int", "N")
+        args.allocator.free(args, generator, "idx", "size_t", "N")
+
+    def get_iterations(self, args) -> str:
+        return "N"
+
+    def get_traffic(self, args) -> [Traffic]:
+        return [Traffic("size_t", reads=1), Traffic(args.dataType, reads=1), Traffic(args.dataType, writes=1, non_temporal=args.ntStores)]
 
     def __repr__(self):
         return "gather"
 
 
 class ScatterPattern(AccessPattern):
-    def write_header(self, args, generator: CodeGenerator):
-        generator.include("time.h", sys=True)
-        generator.include("stdlib.h", sys=True)
-        generator.add_multiline_indented("srand(37);")
+    supports_slices = True
+
+    def write_definitions(self, args, generator: CodeGenerator):
+        workload_generation.write_random_definitions(args, generator)
+        workload_generation.write_distribution_definitions(args, generator)
+        workload_generation.write_memory_hint_definitions(args, generator)
 
+    def write_header(self, args, generator: CodeGenerator):
         generator.add_line(
-            f"long N = ((long) {args.stride}*{args.size})/sizeof({args.dataType});")  # compute number of elements in each array
+            f"long N = ((long) {workload_generation.get_parameter(args, 'stride')}*{workload_generation.get_parameter(args, 'size')})/sizeof({args.dataType});")  # compute number of elements in each array
         generator.add_line("long F = 1024;")
         generator.add_line("long NF = N * F;")
 
         generator.add_line(f"{args.dataType}* x;")
         generator.add_line(f"{args.dataType}* y;")
-        generator.add_line("int* idx;")
+        generator.add_line("size_t* idx;")
         args.allocator.allocate(args, generator, "y", args.dataType, "NF")
         args.allocator.allocate(args, generator, "x", args.dataType, "N")
-        args.allocator.allocate(args, generator, "idx", "int", "N")
+        args.allocator.allocate(args, generator, "idx", "size_t", "N")
         workload_generation.write_array_initialization(args, generator, "x", "N",
                                                        utils.get_number_literal(args, 3))
-        if args.parallelize:
-            generator.add_line("#pragma omp parallel for firstprivate(N, NF) shared(idx)")
-        generator.add_multiline_indented(f"""for(long i = 0; i < N; i++) {{
-    idx[i] = (double) (rand() % NF);
-}}
-""")
+        workload_generation.write_random_indices(args, generator, "idx", "N", "NF", 37)
 
-    def write_body(self, args, generator: CodeGenerator):
-        if args.parallelize:
-            generator.add_line("#pragma omp parallel for firstprivate(x,idx,N) shared(y)")
-            generator.add_multiline_indented("""for(long i = 0; i < N; i++) {
-    y[idx[i]] = x[i];
-}
-result = y[NF - 1];""")
+    def _write_loop(self, args, generator: CodeGenerator, begin: str, end: str):
+        generator.add_line(f"for(long i = {begin}; i < {'N' if end is None else end}; i++) {{")
+        generator.start_indent()
+        if args.prefetchDistance > 0 and not args.ntStores:  # non-temporal stores bypass the cache
+            generator.add_line(f"if (i + {args.prefetchDistance} < N) {{")
+            generator.new_intended_block(lambda: workload_generation.write_prefetch(args, generator, "y", f"idx[i + {args.prefetchDistance}]", write=True))
+            generator.add_line("}")
+        generator.add_line(workload_generation.get_store_statement(args, "y[idx[i]]", "x[i]"))
+        generator.close_indent()
+        generator.add_line("}")
+
+    def write_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
+        workload_generation.write_parallel_for(args, generator, lambda: self._write_loop(args, generator, begin, end),
+                                               " firstprivate(x,idx,N) shared(y)", fence=args.ntStores)
+        generator.add_line("result = y[NF - 1];")
 
     def write_footer(self, args, generator: CodeGenerator):
         args.allocator.free(args, generator, "y", args.dataType, "NF")
         args.allocator.free(args, generator, "x", args.dataType, "N")
-        args.allocator.free(args, generator, "idx", "int", "N")
+        args.allocator.free(args, generator, "idx", "size_t", "N")
+
+    def get_iterations(self, args) -> str:
+        return "N"
+
+    def get_traffic(self, args) -> [Traffic]:
+        return [Traffic("size_t", reads=1), Traffic(args.dataType, reads=1), Traffic(args.dataType, writes=1, non_temporal=args.ntStores)]
 
     def __repr__(self):
         return "scatter"
 
 
+class MixedPattern(AccessPattern):
+    """
+    Reads and writes chunks of a single array in a fixed ratio (--read-ratio). The ratio is approximated by a fraction
+    reads/period with a period of at most MAX_MIXED_PERIOD chunks, and every iteration of the kernel loop accesses one
+    period of chunks whose reads and writes are spread evenly (Bresenham). The order of reads and writes is unrolled at
+    compile time, so the kernel does not branch per access. Chunks are visited sequentially, like the strided patterns,
+    or in a random order precomputed outside the timed region
+    """
+    supports_slices = True
+
+    def __init__(self, random: bool):
+        self.random = random
+
+    def get_ratio(self, args) -> Fraction:
+        return Fraction(args.readRatio).limit_denominator(MAX_MIXED_PERIOD)
+
+    def _get_slots(self, args) -> [bool]:
+        """
+        Returns whether each chunk of a period is read (True) or written (False)
+        """
+        ratio = self.get_ratio(args)
+        return [(s + 1) * ratio.numerator // ratio.denominator > s * ratio.numerator // ratio.denominator
+                for s in range(ratio.denominator)]
+
+    def _get_loop_bounds(self, args) -> (str, str):
+        """
+        Returns C expressions of the upper bound offset and the step between chunks, see StridedPattern
+        """
+        if args.runtimeParameters:
+            stride = workload_generation.get_parameter(args, "stride")
+            chunk_size = workload_generation.get_parameter(args, "chunkSize")
+            return f"({stride} + {chunk_size})", f"({stride} + {chunk_size} - 1)"
+        return str(args.stride + args.chunkSize), str(args.stride + args.chunkSize - 1)
+
+    def write_definitions(self, args, generator: CodeGenerator):
+        ratio = self.get_ratio(args)
+        if abs(float(ratio) - args.readRatio) > 1e-9:
+            print(f"warning: The read ratio {args.readRatio} is approximated as {ratio.numerator}/{ratio.denominator}")
+        if args.simd != "auto":
+            print(f"warning: --simd is ignored by {self}")
+        if args.prefetchDistance > 0:
+            print(f"warning: --prefetch-distance is ignored by {self}")
+        if args.ntStores and ratio == 1:
+            print(f"warning: --nt-stores has no effect for {self}, which does not store any data")
+        if self.random:
+            workload_generation.write_random_definitions(args, generator)
+            workload_generation.write_distribution_definitions(args, generator)
+        workload_generation.write_memory_hint_definitions(args, generator)
+
+    def write_header(self, args, generator: CodeGenerator):
+        ratio = self.get_ratio(args)
+        bound, step = self._get_loop_bounds(args)
+        generator.add_line(
+            f"long N = ((long) {workload_generation.get_parameter(args, 'stride')}*{workload_generation.get_parameter(args, 'size')})/sizeof({args.dataType});")  # compute number of elements of the array
+        generator.add_line(f"long chunks = ((N - {bound}) + {step} - 1) / {step};")
+        generator.add_line(f"long periods = chunks / {ratio.denominator};")
+        generator.add_line(f"{args.dataType}* A;")
+        args.allocator.allocate(args, generator, "A", args.dataType, "N")
+        workload_generation.write_array_initialization(args, generator, "A", "N", utils.get_number_literal(args, 1))
+        if self.random:
+            generator.add_line("size_t* order;")
+            args.allocator.allocate(args, generator, "order", "size_t", "chunks", silent=True)
+            if args.distribution != "uniform":
+                workload_generation.write_random_indices(args, generator, "order", "chunks", "chunks", 37)
+            else:
+                if args.parallelize:
+                    generator.add_line("#pragma omp parallel for schedule(static)")
+                generator.add_line("for (long i = 0; i < chunks; i++) {")
+                generator.new_intended_block(lambda: generator.add_line("order[i] = i;"))
+                generator.add_line("}")
+                workload_generation.write_shuffle(args, generator, "chunks", "order", 37)
+        if not args.silent:
+            generator.add_print_statement(f"Reading {ratio.numerator} and writing {ratio.denominator - ratio.numerator} of every {ratio.denominator} chunks")
+        generator.add_metric_statement("mixed.read_ratio", "%f", str(float(ratio)))
+
+    def _write_loop(self, args, generator: CodeGenerator, begin: str, end: str):
+        bound, step = self._get_loop_bounds(args)
+        chunk_size = workload_generation.get_parameter(args, "chunkSize")
+        slots = self._get_slots(args)
+        generator.add_line(f"for (long p = {begin}; p < {'periods' if end is None else end}; p++) {{")
+        generator.start_indent()
+        generator.add_line(f"long first = p * {len(slots)};")
+        generator.add_line("long base;")
+        for s, read in enumerate(slots):
+            chunk = "first" if s == 0 else f"first + {s}"
+            generator.add_line(f"base = {f'order[{chunk}]' if self.random else f'({chunk})'} * {step};")
+            generator.add_line(f"for (long j = 0; j < {chunk_size}; j++) {{")
+            if read:
+                generator.new_intended_block(lambda: generator.add_line("sum += A[base + j];"))
+            else:
+                generator.new_intended_block(lambda: generator.add_line(
+                    workload_generation.get_store_statement(args, "A[base + j]", utils.get_number_literal(args, 3))))
+            generator.add_line("}")
+        generator.close_indent()
+        generator.add_line("}")
+
+    def write_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
+        generator.add_line("double sum = 0.0;")
+        shared = "A, order" if self.random else "A"
+        workload_generation.write_parallel_for(args, generator, lambda: self._write_loop(args, generator, begin, end),
+                                               f" reduction(+:sum) firstprivate({shared})",
+                                               fence=args.ntStores and self.get_ratio(args) < 1)
+        generator.add_line("result = sum + A[0]; // do not optimize away loop")
+
+    def write_footer(self, args, generator: CodeGenerator):
+        if self.random:
+            args.allocator.free(args, generator, "order", "size_t", "chunks")
+        args.allocator.free(args, generator, "A", args.dataType, "N")
+
+    def get_iterations(self, args) -> str:
+        return "periods"
+
+    def get_traffic(self, args) -> [Traffic]:
+        ratio = self.get_ratio(args)
+        chunk_size = workload_generation.get_parameter(args, "chunkSize")
+        traffic = []
+        if ratio.numerator > 0:
+            traffic.append(Traffic(args.dataType, f"{ratio.numerator} * {chunk_size}", reads=1))
+        if ratio.numerator < ratio.denominator:
+            traffic.append(Traffic(args.dataType, f"{ratio.denominator - ratio.numerator} * {chunk_size}", writes=1,
+                                   non_temporal=args.ntStores))
+        if self.random:
+            traffic.append(Traffic("size_t", str(ratio.denominator), reads=1))
+        return traffic
+
+    def __repr__(self):
+        return "mixed-random" if self.random else "mixed"
+
+
+class LatencyPattern(AccessPattern):
+    """
+    Measures the load-to-use latency by chasing pointers through a single random cycle of cache lines (Sattolo's
+    algorithm), for working sets from 4KiB up to --size. Each load depends on the previous one, so there is at most
+    one outstanding miss
+    """
+    measures_bandwidth = False
+    line_size = 64
+    min_working_set = 4096
+    min_steps = 1 << 22
+    unroll = 16
+
+    def write_definitions(self, args, generator: CodeGenerator):
+        if args.stride != 1 or args.chunkSize != 1:
+            print("warning: The stride and chunk size parameters will be ignored for the latency pattern")
+        if args.parallelize:
+            print("warning: The latency pattern is always measured on a single thread")
+        self._write_chain_definitions(args, generator)
+
+    def _write_chain_definitions(self, args, generator: CodeGenerator):
+        """
+        Defines mwg_sattolo_chain(), which links the cache lines of a buffer into a single random cycle,
+        mwg_tsc_per_ns() and mwg_chase(), which follows a chain for a number of steps
+        """
+        workload_generation.write_random_definitions(args, generator)
+        generator.add_multiline_indented("""#if defined(__x86_64__) || defined(__i386__)
+#include <x86intrin.h>
+#define MWG_HAS_TSC 1
+#endif
+
+void mwg_sattolo_chain(char* buffer, size_t lines, size_t line_size, uint64_t seed) {
+    // Sattolo's algorithm produces a permutation that consists of a single cycle over all lines
+    mwg_rng_t rng;
+    mwg_rng_seed(&rng, seed);
+    size_t* next = (size_t*) malloc(sizeof(size_t) * lines);
+    for (size_t i = 0; i < lines; i++) {
+        next[i] = i;
+    }
+    for (size_t i = lines - 1; i > 0; i--) {
+        size_t j = mwg_rng_below(&rng, i);
+        size_t tmp = next[j];
+        next[j] = next[i];
+        next[i] = tmp;
+    }
+    for (size_t i = 0; i < lines; i++) {
+        *(char**) (buffer + i * line_size) = buffer + next[i] * line_size;
+    }
+    free(next);
+}
+
+double mwg_tsc_per_ns() {
+#ifdef MWG_HAS_TSC
+    double begin = mwg_time();
+    unsigned long long ticks = __rdtsc();
+    double elapsed;
+    while ((elapsed = mwg_time() - begin) < 0.05) {
+    }
+    return (double) (__rdtsc() - ticks) / (elapsed * 1e9);
+#else
+    return 0.0;
+#endif
+}
+""")
+        generator.add_line("char* mwg_chase(char* p, size_t steps) {")
+        generator.start_indent()
+        generator.add_line(f"for (size_t i = 0; i < steps; i += {self.unroll}) {{")
+        generator.start_indent()
+        for i in range(self.unroll):
+            generator.add_line("p = *(char**) p;")
+        generator.close_indent()
+        generator.add_line("}")
+        generator.add_line("return p;")
+        generator.close_indent()
+        generator.add_line("}")
+
+    def write_header(self, args, generator: CodeGenerator):
+        generator.add_line(f"size_t max_working_set = {workload_generation.get_parameter(args, 'size')};")
+        generator.add_line(f"size_t line_size = {self.line_size};")
+        generator.add_line("char* chain;")
+        args.allocator.allocate(args, generator, "chain", "char", "max_working_set")
+
+    def write_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
+        repetitions = workload_generation.get_parameter(args, "repetitions")
+        warmup = workload_generation.get_parameter(args, "warmup")
+        generator.add_line("double tsc_per_ns = mwg_tsc_per_ns();")
+        generator.add_line("printf(\"%16s %14s %14s\\n\", \"working set (B)\", \"latency (ns)\", \"latency (cyc)\");")
+        generator.add_line(f"for (size_t working_set = {self.min_working_set}; working_set <= max_working_set; "
+                           f"working_set = (working_set & (working_set - 1)) == 0 ? working_set + working_set / 2 : working_set / 3 * 4) {{")
+        generator.start_indent()
+        generator.add_line("size_t lines = working_set / line_size;")
+        generator.add_line("mwg_sattolo_chain(chain, lines, line_size, 37 + working_set);")
+        generator.add_line(f"size_t steps = lines * 2 > {self.min_steps} ? lines * 2 : {self.min_steps};")
+        generator.add_line(f"steps -= steps % {self.unroll};")
+        generator.add_line("char* p = chain;")
+        generator.add_line(f"for (int repetition = 0; repetition < {warmup} + 1; repetition++) {{")
+        generator.new_intended_block(lambda: generator.add_line(f"p = mwg_chase(p, lines - lines % {self.unroll});"))
+        generator.add_line("}")
+        generator.add_line("double best = 1e30;")
+        generator.add_line(f"for (int repetition = 0; repetition < {repetitions}; repetition++) {{")
+        generator.start_indent()
+        generator.add_line("double begin = mwg_time();")
+        generator.add_line("p = mwg_chase(p, steps);")
+        generator.add_line("double elapsed = mwg_time() - begin;")
+        generator.add_line("best = elapsed < best ? elapsed : best;")
+        generator.close_indent()
+        generator.add_line("}")
+        generator.add_line("double ns = best * 1e9 / steps;")
+        generator.add_line("printf(\"%16zu %14.2f %14.1f\\n\", working_set, ns, ns * tsc_per_ns);")
+        generator.add_line("printf(\"[metric] latency.%zu.ns = %.3f\\n\", working_set, ns);")
+        generator.add_line("printf(\"[metric] latency.%zu.cycles = %.3f\\n\", working_set, ns * tsc_per_ns);")
+        generator.add_line("result += (double) ((uintptr_t) p & 1); // do not optimize away the chase")
+        generator.close_indent()
+        generator.add_line("}")
+
+    def write_footer(self, args, generator: CodeGenerator):
+        args.allocator.free(args, generator, "chain", "char", "max_working_set")
+
+    def __repr__(self):
+        return "latency"
+
+
+class LoadedLatencyPattern(LatencyPattern):
+    """
+    Measures the latency under load, similar to the loaded latency test of Intel MLC: a probe thread pinned to a
+    dedicated CPU chases pointers through a random cycle over --size bytes, while the OpenMP team runs the kernel of
+    --load-pattern throttled to each fraction of --load-levels of its unthrottled bandwidth. The threads of the load
+    are kept off the CPU of the probe
+    """
+
+    def _get_levels(self, args) -> [float]:
+        # the unthrottled level is measured first, it determines the rates of the throttled levels
+        levels = set(args.loadLevels)
+        if any(0.0 < level < 1.0 for level in levels):
+            levels.add(1.0)
+        return sorted(levels, reverse=True)
+
+    def write_definitions(self, args, generator: CodeGenerator):
+        if not args.loadPattern.supports_slices or not args.loadPattern.measures_bandwidth:
+            raise AttributeError(f"Pattern {args.loadPattern} cannot be used as load of the loaded latency pattern")
+        if not args.parallelize:
+            print("warning: Without --parallelize, the load is generated by a single thread")
+        generator.include("pthread.h", sys=True)
+        generator.include("sched.h", sys=True)
+        self._write_chain_definitions(args, generator)
+        args.loadPattern.write_definitions(args, generator)
+        workload_generation.write_slice_definitions(args, generator)
+        workload_generation.write_throttle_definitions(args, generator)
+        generator.add_definition("loaded_latency", """typedef struct {
+    char* chain;
+    size_t steps;  // loads of each measurement
+    int cpu;
+    int request;  // number of the requested measurement, -1 to stop the probe
+    int done;  // number of the last completed measurement
+    double ns;  // latency per load of the last measurement
+} mwg_probe_t;
+
+// returns the CPU of the probe, by default the last CPU the process may run on
+int mwg_probe_cpu(int requested) {
+    cpu_set_t mask;
+    if (requested >= 0 || sched_getaffinity(0, sizeof(mask), &mask) != 0) {
+        return requested >= 0 ? requested : 0;
+    }
+    for (int cpu = CPU_SETSIZE - 1; cpu >= 0; cpu--) {
+        if (CPU_ISSET(cpu, &mask)) {
+            return cpu;
+        }
+    }
+    return 0;
+}
+
+// removes the CPU of the probe from the affinity of the calling thread, which is inherited by the OpenMP threads
+void mwg_exclude_cpu(int cpu) {
+    cpu_set_t mask;
+    if (sched_getaffinity(0, sizeof(mask), &mask) != 0 || CPU_COUNT(&mask) < 2 || !CPU_ISSET(cpu, &mask)) {
+        printf("warning: The load cannot be kept off CPU %d of the probe\\n", cpu);
+        return;
+    }
+    CPU_CLR(cpu, &mask);
+    sched_setaffinity(0, sizeof(mask), &mask);
+}
+
+void* mwg_probe_main(void* argument) {
+    mwg_probe_t* probe = (mwg_probe_t*) argument;
+    cpu_set_t mask;
+    CPU_ZERO(&mask);
+    CPU_SET(probe->cpu, &mask);
+    if (pthread_setaffinity_np(pthread_self(), sizeof(mask), &mask) != 0) {
+        printf("warning: Failed to pin the probe to CPU %d\\n", probe->cpu);
+    }
+    char* p = probe->chain;
+    for (int measurement = 1; ; measurement++) {
+        int request;
+        while ((request = __atomic_load_n(&probe->request, __ATOMIC_ACQUIRE)) >= 0 && request < measurement) {
+            sched_yield();
+        }
+        if (request < 0) {
+            break;
+        }
+        double begin = mwg_time();
+        p = mwg_chase(p, probe->steps);
+        probe->ns = (mwg_time() - begin) * 1e9 / probe->steps;
+        __atomic_store_n(&probe->done, measurement, __ATOMIC_RELEASE);
+    }
+    return p;
+}""")
+
+    def write_header(self, args, generator: CodeGenerator):
+        generator.add_line(f"int probe_cpu = mwg_probe_cpu({args.probeCpu});")
+        generator.add_line("mwg_exclude_cpu(probe_cpu);")
+        super().write_header(args, generator)
+        args.loadPattern.write_header(args, generator)
+
+    def _write_load(self, args, generator: CodeGenerator):
+        """
+        Runs slices of the load kernel until the probe has completed the current measurement. Slices take about one
+        throttle period, throttled levels wait for the tokens of each slice
+        """
+        load = args.loadPattern
+        bytes_per_iteration = workload_generation.get_bytes_per_iteration(args, load)
+        generator.add_line("while (__atomic_load_n(&probe.done, __ATOMIC_ACQUIRE) < level + 1) {")
+        generator.start_indent()
+        generator.add_line("long slice_end = slice_iterations < kernel_iterations - slice_begin ? slice_begin + slice_iterations : kernel_iterations;")
+        generator.add_line("if (throttled) {")
+        generator.new_intended_block(lambda: generator.add_line(f"mwg_throttle(&throttle, (double) (slice_end - slice_begin) * ({bytes_per_iteration}));"))
+        generator.add_line("}")
+        generator.add_line("double slice_time = mwg_time();")
+        load.write_body(args, generator, begin="slice_begin", end="slice_end")
+        generator.add_line(f"load_bytes += (double) (slice_end - slice_begin) * ({bytes_per_iteration});")
+        generator.add_line("if (!throttled) {")
+        generator.new_intended_block(lambda: generator.add_line(f"slice_iterations = mwg_next_slice(slice_iterations, slice_end - slice_begin, mwg_time() - slice_time, {workload_generation.THROTTLE_PERIOD}, kernel_iterations);"))
+        generator.add_line("}")
+        generator.add_line("slice_begin = slice_end == kernel_iterations ? 0 : slice_end;")
+        generator.close_indent()
+        generator.add_line("}")
+
+    def write_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
+        load = args.loadPattern
+        levels = self._get_levels(args)
+        repetitions = workload_generation.get_parameter(args, "repetitions")
+        warmup = workload_generation.get_parameter(args, "warmup")
+        generator.add_line("double tsc_per_ns = mwg_tsc_per_ns();")
+        generator.add_line("size_t lines = max_working_set / line_size;")
+        generator.add_line("mwg_sattolo_chain(chain, lines, line_size, 37);")
+        generator.add_line(f"size_t probe_steps = lines * 2 > {self.min_steps} ? lines * 2 : {self.min_steps};")
+        generator.add_line(f"probe_steps -= probe_steps % {self.unroll};")
+        generator.add_line(f"mwg_probe_t probe = {{chain, probe_steps * {repetitions}, probe_cpu, 0, 0, 0.0}};")
+        generator.add_line(f"for (int repetition = 0; repetition < {warmup}; repetition++) {{")
+        generator.new_intended_block(lambda: generator.add_line(f"mwg_chase(chain, lines - lines % {self.unroll});"))
+        generator.add_line("}")
+        generator.add_line("pthread_t probe_thread;")
+        generator.add_line("pthread_create(&probe_thread, NULL, mwg_probe_main, &probe);")
+        generator.add_line(f"double levels[] = {{{', '.join([str(level) for level in levels])}}};")
+        generator.add_line(f"long kernel_iterations = {load.get_iterations(args)};")
+        generator.add_line("long slice_iterations = 1;")
+        generator.add_line("long slice_begin = 0;")
+        generator.add_line("double peak_bandwidth = 0.0;")
+        generator.add_line(f"printf(\"Load: {load} (CPUs other than %d), probe: CPU %d\\n\", probe_cpu, probe_cpu);")
+        generator.add_line("printf(\"%8s %18s %14s %14s\\n\", \"load (%)\", \"bandwidth (GB/s)\", \"latency (ns)\", \"latency (cyc)\");")
+        generator.add_line(f"for (int level = 0; level < {len(levels)}; level++) {{")
+        generator.start_indent()
+        generator.add_line("int throttled = levels[level] < 1.0 && peak_bandwidth > 0.0;")
+        generator.add_line("double rate = levels[level] * peak_bandwidth;")
+        generator.add_line("if (throttled) {")
+        generator.new_intended_block(lambda: generator.add_line(f"slice_iterations = mwg_throttle_slice(rate, {workload_generation.THROTTLE_PERIOD}, {workload_generation.get_bytes_per_iteration(args, load)}, kernel_iterations);"))
+        generator.add_line("}")
+        generator.add_line(f"mwg_throttle_t throttle = {{rate, {workload_generation.THROTTLE_BURST} * slice_iterations * ({workload_generation.get_bytes_per_iteration(args, load)}), 0.0, mwg_time()}};")
+        generator.add_line("double load_bytes = 0.0;")
+        generator.add_line("double load_begin = mwg_time();")
+        generator.add_line("__atomic_store_n(&probe.request, level + 1, __ATOMIC_RELEASE);")
+        generator.add_line("if (levels[level] > 0.0) {")
+        generator.new_intended_block(lambda: self._write_load(args, generator))
+        generator.add_line("}")
+        generator.add_line("while (__atomic_load_n(&probe.done, __ATOMIC_ACQUIRE) < level + 1) {")
+        generator.new_intended_block(lambda: generator.add_line("sched_yield();"))
+        generator.add_line("}")
+        generator.add_line("double bandwidth = load_bytes / (mwg_time() - load_begin);")
+        generator.add_line("if (levels[level] >= 1.0 && peak_bandwidth == 0.0) {")
+        generator.new_intended_block(lambda: generator.add_line("peak_bandwidth = bandwidth;"))
+        generator.add_line("}")
+        generator.add_line("int percent = (int) (levels[level] * 100.0 + 0.5);")
+        generator.add_line("printf(\"%8d %18.3f %14.2f %14.1f\\n\", percent, bandwidth * 1e-9, probe.ns, probe.ns * tsc_per_ns);")
+        generator.add_line("printf(\"[metric] loaded_latency.%d.bandwidth = %.6f\\n\", percent, bandwidth * 1e-9);")
+        generator.add_line("printf(\"[metric] loaded_latency.%d.ns = %.3f\\n\", percent, probe.ns);")
+        generator.add_line("printf(\"[metric] loaded_latency.%d.cycles = %.3f\\n\", percent, probe.ns * tsc_per_ns);")
+        generator.close_indent()
+        generator.add_line("}")
+        generator.add_line("__atomic_store_n(&probe.request, -1, __ATOMIC_RELEASE);")
+        generator.add_line("pthread_join(probe_thread, NULL);")
+        generator.add_line("result += probe.ns;")
+
+    def write_footer(self, args, generator: CodeGenerator):
+        args.loadPattern.write_footer(args, generator)
+        super().write_footer(args, generator)
+
+    def get_compiler_flags(self) -> list:
+        return ["-pthread"]
+
+    def get_linker_flags(self) -> list:
+        return ["-pthread"]
+
+    def __repr__(self):
+        return "loaded-latency"
+
+
+class NumaMatrixPattern(LatencyPattern):
+    """
+    Characterizes every pair of a NUMA node with CPUs and a node with memory (including memory-only nodes like CXL
+    expanders) in a single binary: the threads run on the CPU node (numa_run_on_node) and the buffers of
+    --matrix-pattern and a pointer chain of --size bytes are allocated on the memory node (numa_alloc_onnode). The
+    bandwidth of the kernel and the idle latency of a single thread are printed as node-to-node matrices
+    """
+    max_nodes = 64
+
+    def _get_cell_args(self, args):
+        # the kernel of a cell allocates on the memory node of the cell
+        cell_args = copy.copy(args)
+        cell_args.allocator = allocators.NumaNodeAllocator("mem_node")
+        return cell_args
+
+    def write_definitions(self, args, generator: CodeGenerator):
+        if args.alignment is not None:
+            raise AttributeError(f"Memory alignment is not supported by the {self} pattern")
+        if not args.parallelize:
+            print(f"warning: Without --parallelize, the bandwidth of {args.matrixPattern} is measured on a single thread")
+        generator.include("numa.h", sys=True)
+        self._write_chain_definitions(args, generator)
+        args.matrixPattern.write_definitions(self._get_cell_args(args), generator)
+
+    def write_header(self, args, generator: CodeGenerator):
+        generator.add_multiline_indented(f"""if (numa_available() == -1) {{
+  printf("err: libnuma not available\\n");
+  return 1;
+}}
+int cpu_nodes[{self.max_nodes}];
+int memory_nodes[{self.max_nodes}];
+int cpu_node_count = 0;
+int memory_node_count = 0;
+struct bitmask* node_cpus = numa_allocate_cpumask();
+for (int node = 0; node <= numa_max_node() && node < {self.max_nodes}; node++) {{
+  if (!numa_bitmask_isbitset(numa_all_nodes_ptr, node)) {{
+    continue;
+  }}
+  if (numa_node_size64(node, NULL) > 0) {{
+    memory_nodes[memory_node_count++] = node;
+  }}
+  if (numa_node_to_cpus(node, node_cpus) == 0 && numa_bitmask_weight(node_cpus) > 0) {{
+    cpu_nodes[cpu_node_count++] = node;
+  }}
+}}
+numa_free_cpumask(node_cpus);
+static double matrix_bandwidth[{self.max_nodes}][{self.max_nodes}];
+static double matrix_latency[{self.max_nodes}][{self.max_nodes}];""")
+        generator.add_line(f"size_t max_working_set = {workload_generation.get_parameter(args, 'size')};")
+        generator.add_line(f"size_t line_size = {self.line_size};")
+
+    def _write_run_on_node(self, args, generator: CodeGenerator, node: str):
+        # numa_run_on_node() restricts the calling thread only, so every OpenMP thread calls it
+        if args.parallelize:
+            generator.add_line("#pragma omp parallel")
+            generator.new_intended_block(lambda: generator.add_line(f"numa_run_on_node({node});"))
+        generator.add_line(f"numa_run_on_node({node});")
+
+    def _write_bandwidth(self, args, generator: CodeGenerator):
+        """
+        Measures the best bandwidth of the kernel of --matrix-pattern over the repetitions, its buffers are allocated and
+        first-touched on the memory node
+        """
+        cell_args = self._get_cell_args(args)
+        pattern = args.matrixPattern
+        repetitions = workload_generation.get_parameter(args, "repetitions")
+        warmup = workload_generation.get_parameter(args, "warmup")
+        pattern.write_header(cell_args, generator)
+        generator.add_line("double best = 1e30;")
+        generator.add_line(f"for (int repetition = 0; repetition < {warmup} + {repetitions}; repetition++) {{")
+        generator.start_indent()
+        generator.add_line("double begin = mwg_time();")
+        pattern.write_body(cell_args, generator)
+        generator.add_line("double elapsed = mwg_time() - begin;")
+        generator.add_line(f"best = repetition >= {warmup} && elapsed < best ? elapsed : best;")
+        generator.close_indent()
+        generator.add_line("}")
+        generator.add_line(f"matrix_bandwidth[c][m] = (double) ({pattern.get_iterations(cell_args)}) * ({workload_generation.get_bytes_per_iteration(cell_args, pattern)}) / best;")
+        generator.add_line("result += (double) temp; // do not optimize away the kernel")
+        for array in pattern.get_variable_names():
+            cell_args.allocator.free(cell_args, generator, array, args.dataType, "N")
+
+    def _write_latency(self, args, generator: CodeGenerator):
+        repetitions = workload_generation.get_parameter(args, "repetitions")
+        warmup = workload_generation.get_parameter(args, "warmup")
+        generator.add_line("char* chain;")
+        self._get_cell_args(args).allocator.allocate(args, generator, "chain", "char", "max_working_set", silent=True)
+        generator.add_line("size_t lines = max_working_set / line_size;")
+        generator.add_line("mwg_sattolo_chain(chain, lines, line_size, 37);")
+        generator.add_line(f"size_t steps = lines * 2 > {self.min_steps} ? lines * 2 : {self.min_steps};")
+        generator.add_line(f"steps -= steps % {self.unroll};")
+        generator.add_line("char* p = chain;")
+        generator.add_line(f"for (int repetition = 0; repetition < {warmup} + 1; repetition++) {{")
+        generator.new_intended_block(lambda: generator.add_line(f"p = mwg_chase(p, lines - lines % {self.unroll});"))
+        generator.add_line("}")
+        generator.add_line("double best = 1e30;")
+        generator.add_line(f"for (int repetition = 0; repetition < {repetitions}; repetition++) {{")
+        generator.start_indent()
+        generator.add_line("double begin = mwg_time();")
+        generator.add_line("p = mwg_chase(p, steps);")
+        generator.add_line("double elapsed = mwg_time() - begin;")
+        generator.add_line("best = elapsed < best ? elapsed : best;")
+        generator.close_indent()
+        generator.add_line("}")
+        generator.add_line("matrix_latency[c][m] = best * 1e9 / steps;")
+        generator.add_line("result += (double) ((uintptr_t) p & 1); // do not optimize away the chase")
+        self._get_cell_args(args).allocator.free(args, generator, "chain", "char", "max_working_set")
+
+    def _write_matrix(self, generator: CodeGenerator, matrix: str, value_format: str, scale: str):
+        # rows are CPU nodes, columns memory nodes
+        generator.add_line("printf(\"%8s\", \"cpu\\\\mem\");")
+        generator.add_line("for (int m = 0; m < memory_node_count; m++) {")
+        generator.new_intended_block(lambda: generator.add_line("printf(\" %10d\", memory_nodes[m]);"))
+        generator.add_line("}")
+        generator.add_line("printf(\"\\n\");")
+        generator.add_line("for (int c = 0; c < cpu_node_count; c++) {")
+        generator.start_indent()
+        generator.add_line("printf(\"%8d\", cpu_nodes[c]);")
+        generator.add_line("for (int m = 0; m < memory_node_count; m++) {")
+        generator.new_intended_block(lambda: generator.add_line(f"printf(\" %10{value_format}\", {matrix}[c][m] * {scale});"))
+        generator.add_line("}")
+        generator.add_line("printf(\"\\n\");")
+        generator.close_indent()
+        generator.add_line("}")
+
+    def write_body(self, args, generator: CodeGenerator, begin: str = "0", end: str = None):
+        threads = "omp_get_max_threads()" if args.parallelize else "1"
+        generator.add_line("double tsc_per_ns = mwg_tsc_per_ns();")
+        generator.add_line("for (int c = 0; c < cpu_node_count; c++) {")
+        generator.start_indent()
+        generator.add_line("int cpu_node = cpu_nodes[c];")
+        self._write_run_on_node(args, generator, "cpu_node")
+        generator.add_line("for (int m = 0; m < memory_node_count; m++) {")
+        generator.start_indent()
+        generator.add_line("int mem_node = memory_nodes[m];")
+        generator.add_line("{")
+        generator.new_intended_block(lambda: self._write_bandwidth(args, generator))
+        generator.add_line("}")
+        generator.add_line("{")
+        generator.new_intended_block(lambda: self._write_latency(args, generator))
+        generator.add_line("}")
+        if not args.silent:
+            generator.add_line("printf(\"CPU node %d, memory node %d: %.3f GB/s, %.2f ns\\n\", cpu_node, mem_node, matrix_bandwidth[c][m] * 1e-9, matrix_latency[c][m]);")
+        generator.add_line("printf(\"[metric] numa_matrix.%d.%d.bandwidth = %.6f\\n\", cpu_node, mem_node, matrix_bandwidth[c][m] * 1e-9);")
+        generator.add_line("printf(\"[metric] numa_matrix.%d.%d.ns = %.3f\\n\", cpu_node, mem_node, matrix_latency[c][m]);")
+        generator.add_line("printf(\"[metric] numa_matrix.%d.%d.cycles = %.3f\\n\", cpu_node, mem_node, matrix_latency[c][m] * tsc_per_ns);")
+        generator.close_indent()
+        generator.add_line("}")
+        generator.close_indent()
+        generator.add_line("}")
+        self._write_run_on_node(args, generator, "-1")
+        generator.add_print_statement(f"Bandwidth (GB/s) of {args.matrixPattern} with %d thread(s)", threads)
+        self._write_matrix(generator, "matrix_bandwidth", ".3f", "1e-9")
+        generator.add_print_statement("Idle latency (ns)")
+        self._write_matrix(generator, "matrix_latency", ".2f", "1.0")
+
+    def write_footer(self, args, generator: CodeGenerator):
+        pass
+
+    def get_linker_flags(self) -> list:
+        return ["-lnuma"]
+
+    def __repr__(self):
+        return "numa-matrix"
+
+
 patterns = [
     StridedPattern(id="copy"),
     StridedPattern(id="scale"),
@@ -404,7 +1445,12 @@ patterns = [
     RandomAccessPattern("store"),
     RandomAccessPattern("sum"),
     GatherPattern(),
-    ScatterPattern()
+    ScatterPattern(),
+    MixedPattern(random=False),
+    MixedPattern(random=True),
+    LatencyPattern(),
+    LoadedLatencyPattern(),
+    NumaMatrixPattern()
 ]
 
 
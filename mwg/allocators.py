@@ -1,7 +1,11 @@
+import hardware
 from code_generator import CodeGenerator
 
 
 class Allocator:
+    def write_definitions(self, args, generator: CodeGenerator):
+        pass
+
     def initialize(self, args, generator: CodeGenerator):
         pass
 
@@ -11,6 +15,13 @@ class Allocator:
     def free(self, args, generator: CodeGenerator, ptr_name: str, pointer_type: str, element_count: int):
         raise NotImplementedError
 
+    def reuses(self, ptr_name: str) -> bool:
+        """
+        Whether the buffer has been allocated and initialized by an earlier phase of a workload specification, see
+        workload_spec.SharedAllocator
+        """
+        return False
+
     def get_compiler_flags(self) -> [str]:
         return []
 
@@ -99,6 +110,27 @@ class LibNumaAllocator(Allocator):
         return "libnuma"
 
 
+class NumaNodeAllocator(LibNumaAllocator):
+    """
+    Allocates on the NUMA node given by a C expression, e.g. the memory node loop variable of the numa-matrix pattern.
+    Not selectable with --allocator
+    """
+    def __init__(self, node: str):
+        """
+        :param node: C expression of the number of the node
+        """
+        self.node = node
+
+    def allocate(self, args, generator: CodeGenerator, ptr_name: str, pointer_type: str, element_count: int, silent: bool = False):
+        generator.add_line(f"{ptr_name} = ({pointer_type}*) numa_alloc_onnode(sizeof({pointer_type}) * (long) {element_count}, {self.node});")
+        generator.add_line(f"""if({ptr_name} == NULL) {{
+  printf(\"err: failed to allocate {ptr_name} on numa node %d\\n\", {self.node});
+  return 1;
+}}""")
+        if not args.silent and not silent:
+            generator.add_print_statement(f"Allocated {ptr_name} on numa node %d", self.node)
+
+
 class MemkindNVMAllocator(Allocator):
     def initialize(self, args, generator: CodeGenerator):
         generator.include("memkind.h", sys=True)
@@ -279,7 +311,371 @@ class OpenMPAllocator(Allocator):
         return "openmp"
 
 
-allocators = [StdlibAllocator(), JemallocAllocator(), MemkindNVMAllocator(), MemkindAllocator(), MemkindHBWAllocator(), LibNumaAllocator(), OpenMPAllocator()]
+# advice of madvise for each --madvise choice
+MADVISE_HINTS = {"normal": "MADV_NORMAL", "random": "MADV_RANDOM", "sequential": "MADV_SEQUENTIAL",
+                 "willneed": "MADV_WILLNEED", "hugepage": "MADV_HUGEPAGE"}
+
+
+def get_madvise_advice(args) -> str:
+    """
+    Returns a C expression of the madvise advice selected with --madvise, -1 if none
+    """
+    return "-1" if args.madvise is None else MADVISE_HINTS[args.madvise]
+
+
+class MmapAllocator(Allocator):
+    """
+    Anonymous private memory mappings using mmap. With --populate, all pages are faulted in by the allocating thread.
+    Before unmapping, the page size backing each buffer is read from /proc/self/smaps and reported
+    """
+    huge_flags = "0"
+    huge_page_size = "0"
+    transparent_huge_pages = False
+
+    def write_definitions(self, args, generator: CodeGenerator):
+        generator.include("sys/mman.h", sys=True)
+        generator.include("stdint.h", sys=True)
+        generator.include("errno.h", sys=True)
+        generator.include("string.h", sys=True)
+        generator.include("fcntl.h", sys=True)
+        generator.add_definition("mmap", """#ifndef MAP_HUGE_SHIFT
+#define MAP_HUGE_SHIFT 26
+#endif
+#ifndef MAP_HUGE_2MB
+#define MAP_HUGE_2MB (21 << MAP_HUGE_SHIFT)
+#endif
+#ifndef MAP_HUGE_1GB
+#define MAP_HUGE_1GB (30 << MAP_HUGE_SHIFT)
+#endif
+#define MWG_THP_SIZE (2UL << 20)
+
+typedef struct {
+    void* address;
+    size_t length;
+    char* path;  // backing file, removed when unmapping
+    int sync;  // whether to time msync before unmapping
+} mwg_mapping_t;
+
+// grows as needed, so that any number of buffers can be mapped at the same time
+static mwg_mapping_t* mwg_mappings = NULL;
+static size_t mwg_mapping_count = 0;
+
+// returns 0 if the table of mappings cannot grow, the mapping is not unmapped by mwg_munmap in that case
+static int mwg_register_mapping(void* address, size_t length, char* path, int sync) {
+    size_t i = 0;
+    while (i < mwg_mapping_count && mwg_mappings[i].address != NULL) {
+        i++;
+    }
+    if (i == mwg_mapping_count) {
+        size_t count = mwg_mapping_count == 0 ? 16 : 2 * mwg_mapping_count;
+        mwg_mapping_t* mappings = (mwg_mapping_t*) realloc(mwg_mappings, count * sizeof(mwg_mapping_t));
+        if (mappings == NULL) {
+            return 0;
+        }
+        memset(mappings + mwg_mapping_count, 0, (count - mwg_mapping_count) * sizeof(mwg_mapping_t));
+        mwg_mappings = mappings;
+        mwg_mapping_count = count;
+    }
+    mwg_mappings[i].address = address;
+    mwg_mappings[i].length = length;
+    mwg_mappings[i].path = path;
+    mwg_mappings[i].sync = sync;
+    return 1;
+}
+
+static size_t mwg_round_up(size_t value, size_t multiple) {
+    return (value + multiple - 1) / multiple * multiple;
+}
+
+// maps anonymous memory aligned to alignment by trimming an oversized mapping
+static void* mwg_mmap_aligned(size_t length, size_t alignment) {
+    size_t padded = length + alignment;
+    char* base = (char*) mmap(NULL, padded, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if (base == MAP_FAILED) {
+        return NULL;
+    }
+    char* aligned = (char*) (((uintptr_t) base + alignment - 1) & ~(uintptr_t) (alignment - 1));
+    if (aligned > base) {
+        munmap(base, aligned - base);
+    }
+    if (base + padded > aligned + length) {
+        munmap(aligned + length, (base + padded) - (aligned + length));
+    }
+    return aligned;
+}
+
+static void mwg_populate(char* address, size_t length) {
+#ifdef MADV_POPULATE_WRITE
+    if (madvise(address, length, MADV_POPULATE_WRITE) == 0) {
+        return;
+    }
+#endif
+    long page_size = sysconf(_SC_PAGESIZE);
+    for (size_t offset = 0; offset < length; offset += page_size) {
+        ((volatile char*) address)[offset] = 0;
+    }
+}
+
+/*
+ * Maps bytes of anonymous memory. huge_flags (MAP_HUGE_2MB or MAP_HUGE_1GB) requests explicit huge pages of
+ * huge_page_size bytes, falling back to transparent huge pages if no huge pages are reserved. With thp, the mapping is
+ * aligned to 2MiB and advised with MADV_HUGEPAGE. advice is passed to madvise unless it is negative. With populate,
+ * all pages are faulted in before returning. Mappings
+ * with regular pages end with an inaccessible guard page, which keeps the kernel from merging adjacent buffers into a
+ * single area in /proc/self/smaps
+ */
+void* mwg_mmap(const char* name, size_t bytes, int huge_flags, size_t huge_page_size, int thp, int advice, int populate) {
+    void* address = NULL;
+    size_t length = 0;
+    size_t guard = sysconf(_SC_PAGESIZE);
+    if (huge_flags != 0) {
+        length = mwg_round_up(bytes, huge_page_size);
+        address = mmap(NULL, length, PROT_READ | PROT_WRITE,
+                       MAP_PRIVATE | MAP_ANONYMOUS | MAP_HUGETLB | huge_flags | (populate ? MAP_POPULATE : 0), -1, 0);
+        if (address == MAP_FAILED) {
+            printf("warning: no %zu kB huge pages available for '%s' (%s), falling back to transparent huge pages\\n",
+                   huge_page_size >> 10, name, strerror(errno));
+            address = NULL;
+            thp = 1;
+        }
+    }
+    if (address == NULL && thp) {
+        length = mwg_round_up(bytes, MWG_THP_SIZE);
+        address = mwg_mmap_aligned(length + guard, MWG_THP_SIZE);
+        if (address != NULL) {
+            mprotect((char*) address + length, guard, PROT_NONE);
+#ifdef MADV_HUGEPAGE
+            if (madvise(address, length, MADV_HUGEPAGE) != 0) {
+                printf("warning: transparent huge pages unavailable for '%s' (%s)\\n", name, strerror(errno));
+            }
+#endif
+            if (populate) {
+                mwg_populate((char*) address, length);
+            }
+        }
+    } else if (address == NULL) {
+        length = mwg_round_up(bytes, guard);
+        address = mmap(NULL, length + guard, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS | (populate ? MAP_POPULATE : 0), -1, 0);
+        if (address == MAP_FAILED) {
+            address = NULL;
+        } else {
+            mprotect((char*) address + length, guard, PROT_NONE);
+        }
+    }
+    if (address == NULL) {
+        return NULL;
+    }
+    if (advice >= 0 && madvise(address, length, advice) != 0) {
+        printf("warning: madvise failed for '%s' (%s)\\n", name, strerror(errno));
+    }
+    if (!(huge_flags != 0 && !thp)) {
+        length += guard;
+    }
+    if (!mwg_register_mapping(address, length, NULL, 0)) {
+        printf("err: failed to register the mapping of '%s'\\n", name);
+        munmap(address, length);
+        return NULL;
+    }
+    return address;
+}
+
+/*
+ * Maps bytes of a new file in directory, which is removed again by mwg_munmap. The mapping is either shared, i.e.
+ * stores are written back to the file, or private (copy-on-write). With sync, mwg_munmap times msync(MS_SYNC)
+ */
+void* mwg_mmap_file(const char* name, const char* directory, size_t bytes, int shared, int advice, int populate, int sync) {
+    size_t length = mwg_round_up(bytes, sysconf(_SC_PAGESIZE));
+    char* path = (char*) malloc(strlen(directory) + strlen(name) + 64);
+    sprintf(path, "%s/mwg-%s-%ld", directory, name, (long) getpid());
+    int fd = open(path, O_RDWR | O_CREAT | O_TRUNC, 0600);
+    if (fd < 0) {
+        printf("err: failed to create '%s' (%s)\\n", path, strerror(errno));
+        free(path);
+        return NULL;
+    }
+    int error = ftruncate(fd, length) != 0 ? errno : 0;
+    void* address = MAP_FAILED;
+    if (error == 0) {
+        address = mmap(NULL, length, PROT_READ | PROT_WRITE, (shared ? MAP_SHARED : MAP_PRIVATE) | (populate ? MAP_POPULATE : 0), fd, 0);
+        error = address == MAP_FAILED ? errno : 0;
+    }
+    close(fd);
+    if (error != 0) {
+        printf("err: failed to map '%s' (%s)\\n", path, strerror(error));
+        unlink(path);
+        free(path);
+        return NULL;
+    }
+    if (advice >= 0 && madvise(address, length, advice) != 0) {
+        printf("warning: madvise failed for '%s' (%s)\\n", name, strerror(errno));
+    }
+    if (!mwg_register_mapping(address, length, path, sync)) {
+        printf("err: failed to register the mapping of '%s'\\n", name);
+        munmap(address, length);
+        unlink(path);
+        free(path);
+        return NULL;
+    }
+    return address;
+}
+
+// reports the page size of the mapping containing address and its share of transparent huge pages from /proc/self/smaps
+void mwg_report_page_size(const char* name, void* address, int silent) {
+    FILE* smaps = fopen("/proc/self/smaps", "r");
+    if (smaps == NULL) {
+        return;
+    }
+    char line[512];
+    int found = 0;
+    size_t page_size = 0, resident = 0, transparent = 0, value;
+    while (fgets(line, sizeof(line), smaps) != NULL) {
+        unsigned long start, end;
+        if (sscanf(line, "%lx-%lx ", &start, &end) == 2) {
+            if (found) {
+                break;
+            }
+            found = (uintptr_t) address >= start && (uintptr_t) address < end;
+        } else if (!found) {
+            continue;
+        } else if (sscanf(line, "KernelPageSize: %zu kB", &value) == 1) {
+            page_size = value;
+        } else if (sscanf(line, "Rss: %zu kB", &value) == 1 || sscanf(line, "Private_Hugetlb: %zu kB", &value) == 1
+                   || sscanf(line, "Shared_Hugetlb: %zu kB", &value) == 1) {
+            resident += value;
+        } else if (sscanf(line, "AnonHugePages: %zu kB", &value) == 1) {
+            transparent = value;
+        }
+    }
+    fclose(smaps);
+    if (!found) {
+        return;
+    }
+    if (!silent) {
+        printf("Buffer %s: page size %zu kB, %zu kB resident, %zu kB in transparent huge pages\\n", name, page_size,
+               resident, transparent);
+    }
+    printf("[metric] allocation.%s.page_size = %zu\\n", name, page_size << 10);
+    printf("[metric] allocation.%s.resident_bytes = %zu\\n", name, resident << 10);
+    printf("[metric] allocation.%s.thp_bytes = %zu\\n", name, transparent << 10);
+}
+
+void mwg_munmap(const char* name, void* address, int silent) {
+    for (size_t i = 0; i < mwg_mapping_count; i++) {
+        if (mwg_mappings[i].address == address) {
+            mwg_report_page_size(name, address, silent);
+            if (mwg_mappings[i].sync) {
+                double begin = mwg_time();
+                msync(address, mwg_mappings[i].length, MS_SYNC);
+                double elapsed = mwg_time() - begin;
+                if (!silent) {
+                    printf("Buffer %s: msync took %fs\\n", name, elapsed);
+                }
+                printf("[metric] allocation.%s.msync_time = %f\\n", name, elapsed);
+            }
+            munmap(address, mwg_mappings[i].length);
+            if (mwg_mappings[i].path != NULL) {
+                unlink(mwg_mappings[i].path);
+                free(mwg_mappings[i].path);
+            }
+            mwg_mappings[i].address = NULL;
+            return;
+        }
+    }
+}""")
+
+    def initialize(self, args, generator: CodeGenerator):
+        if args.alignment is not None and args.alignment > 4096:
+            raise AttributeError(f"Alignments larger than the page size are not supported for {self}")
+
+    def _get_mapping_call(self, args, ptr_name: str, size: str) -> str:
+        return (f"mwg_mmap(\"{ptr_name}\", {size}, {self.huge_flags}, {self.huge_page_size}, {int(self.transparent_huge_pages)}, "
+                f"{get_madvise_advice(args)}, {int(args.populate)})")
+
+    def allocate(self, args, generator: CodeGenerator, ptr_name: str, pointer_type: str, element_count: int, silent: bool = False):
+        size = f"sizeof({pointer_type}) * (size_t) {element_count}"
+        generator.add_line(f"{ptr_name} = ({pointer_type}*) {self._get_mapping_call(args, ptr_name, size)};")
+        generator.add_multiline_indented(f"""if({ptr_name} == NULL) {{
+  printf(\"err: failed to map '{ptr_name}': %s\\n\", strerror(errno));
+  return 1;
+}}""")
+        if not args.silent and not silent:
+            generator.add_print_statement(f"Mapped buffer {ptr_name} of size %ld elements using {self}", element_count)
+
+    def free(self, args, generator: CodeGenerator, ptr_name: str, pointer_type: str, element_count: int):
+        generator.add_line(f"mwg_munmap(\"{ptr_name}\", {ptr_name}, {int(args.silent)});")
+
+    def __repr__(self):
+        return "mmap"
+
+
+class FileMappingAllocator(MmapAllocator):
+    """
+    Maps each buffer to a new file in the directory given by --allocation-location (e.g. on tmpfs, ext4 or a DAX file
+    system), so accesses go through the page cache or the storage device. The files are removed when the buffers are
+    unmapped
+    """
+    def initialize(self, args, generator: CodeGenerator):
+        super().initialize(args, generator)
+        if args.allocationLocation is None:
+            raise AttributeError(f"{self} requires the directory of the backing files, for example '--allocation-location /dev/shm'")
+        if args.msync and args.mapping != "shared":
+            print("warning: --msync has no effect on private file mappings")
+
+    def _get_mapping_call(self, args, ptr_name: str, size: str) -> str:
+        directory = args.allocationLocation.replace("\\", "\\\\").replace("\"", "\\\"")
+        return (f"mwg_mmap_file(\"{ptr_name}\", \"{directory}\", {size}, {int(args.mapping == 'shared')}, "
+                f"{get_madvise_advice(args)}, {int(args.populate)}, {int(args.msync)})")
+
+    def __repr__(self):
+        return "mmap-file"
+
+
+class TransparentHugePageAllocator(MmapAllocator):
+    """
+    Anonymous mappings aligned to 2MiB and advised with madvise(MADV_HUGEPAGE), so the kernel backs them with transparent
+    huge pages if /sys/kernel/mm/transparent_hugepage/enabled is 'always' or 'madvise'
+    """
+    transparent_huge_pages = True
+
+    def __repr__(self):
+        return "mmap-thp"
+
+
+class HugeTLBAllocator(MmapAllocator):
+    """
+    Anonymous mappings with explicit huge pages (MAP_HUGETLB) from the pool reserved in
+    /sys/kernel/mm/hugepages/hugepages-<size>kB/nr_hugepages. Falls back to transparent huge pages if the pool is
+    exhausted
+    """
+    def __init__(self, name: str, huge_flags: str, huge_page_size: str, page_bytes: int):
+        """
+        :param name: page size used in the name of the allocator, e.g. '2m'
+        :param huge_flags: C expression of the page size flags of mmap
+        :param huge_page_size: C expression of the page size in bytes
+        :param page_bytes: page size in bytes
+        """
+        self.name = name
+        self.huge_flags = huge_flags
+        self.huge_page_size = huge_page_size
+        self.page_bytes = page_bytes
+
+    def initialize(self, args, generator: CodeGenerator):
+        super().initialize(args, generator)
+        if args.runtimeParameters:
+            return
+        # the pool is checked on the machine the workload is generated on, which is usually the one it runs on
+        reserved, free = hardware.discover().huge_pages.get(self.page_bytes, (0, 0))
+        if free * self.page_bytes < args.size:
+            print(f"warning: {free} of {reserved} huge pages of {self} are free on this machine, less than --size, the "
+                  f"remaining buffers fall back to transparent huge pages (see /sys/kernel/mm/hugepages)")
+
+    def __repr__(self):
+        return f"mmap-hugetlb-{self.name}"
+
+
+allocators = [StdlibAllocator(), JemallocAllocator(), MemkindNVMAllocator(), MemkindAllocator(), MemkindHBWAllocator(), LibNumaAllocator(), OpenMPAllocator(),
+              MmapAllocator(), FileMappingAllocator(), TransparentHugePageAllocator(), HugeTLBAllocator("2m", "MAP_HUGE_2MB", "(2UL << 20)", 2 ** 21),
+              HugeTLBAllocator("1g", "MAP_HUGE_1GB", "(1UL << 30)", 2 ** 30)]
 
 
 def get_registered(name):
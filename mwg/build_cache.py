@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import pathlib
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+# Makefile variables that influence the compiled binary
+_MAKEFILE_VARIABLES = ["CC", "LIB", "INC", "FLAGS", "LFLAGS"]
+_BINARY_NAME = "main.out"
+
+
+class BuildCache:
+    """
+    Content-addressed cache of compiled workloads. Binaries are keyed by a hash of the generated source, the compiler
+    related Makefile variables and the compiler version. The cache is bounded in size by evicting the least recently
+    used entries
+    """
+    def __init__(self, directory: pathlib.Path, max_size: int):
+        """
+        :param directory: folder holding the cache, may be shared between invocations
+        :param max_size: maximum size of all cached binaries in bytes
+        """
+        self.directory = pathlib.Path(directory)
+        self.max_size = max_size
+        self._compiler_versions = {}
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get_key(self, folder: pathlib.Path) -> str:
+        """
+        Computes the cache key of a generated workload
+        :param folder: workload folder containing main.c and the Makefile
+        :return: hex digest identifying the binary
+        """
+        variables = _read_makefile_variables(pathlib.Path(folder, "Makefile"))
+        digest = hashlib.sha256()
+        with open(pathlib.Path(folder, "main.c"), "rb") as f:
+            digest.update(f.read())
+        for name in _MAKEFILE_VARIABLES:
+            digest.update(f"\0{name}={variables.get(name, '')}".encode())
+        digest.update(b"\0" + self._get_compiler_version(variables.get("CC", "")).encode())
+        return digest.hexdigest()
+
+    def _get_compiler_version(self, compiler: str) -> str:
+        if compiler not in self._compiler_versions:
+            try:
+                result = subprocess.run([compiler, "--version"], capture_output=True, text=True)
+                self._compiler_versions[compiler] = result.stdout
+            except OSError:
+                self._compiler_versions[compiler] = ""
+        return self._compiler_versions[compiler]
+
+    def _get_entry(self, key: str) -> pathlib.Path:
+        return pathlib.Path(self.directory, key[:2], key)
+
+    def fetch(self, key: str, folder: pathlib.Path) -> bool:
+        """
+        Copies a cached binary into a workload folder
+        :return: whether the binary was found in the cache
+        """
+        entry = self._get_entry(key)
+        binary = pathlib.Path(entry, _BINARY_NAME)
+        if not binary.exists():
+            return False
+        shutil.copy2(binary, pathlib.Path(folder, _BINARY_NAME))
+        os.utime(pathlib.Path(folder, _BINARY_NAME))
+        os.utime(entry)  # mark as recently used
+        return True
+
+    def store(self, key: str, folder: pathlib.Path):
+        """
+        Adds the binary of a built workload to the cache and evicts least recently used entries if necessary
+        """
+        entry = self._get_entry(key)
+        if pathlib.Path(entry, _BINARY_NAME).exists():
+            os.utime(entry)
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        # populate a temporary folder and rename it, so concurrent readers never observe partial entries
+        staging = pathlib.Path(tempfile.mkdtemp(prefix=".staging-", dir=entry.parent))
+        shutil.copy2(pathlib.Path(folder, _BINARY_NAME), pathlib.Path(staging, _BINARY_NAME))
+        with open(pathlib.Path(staging, "build.json"), "w") as f:
+            json.dump({"source": str(folder), "created": time.time()}, f)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)  # stored concurrently by another process
+        self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits into its maximum size
+        """
+        entries = []
+        total = 0
+        for binary in self.directory.glob(f"*/*/{_BINARY_NAME}"):
+            size = binary.stat().st_size
+            entries.append((binary.parent.stat().st_mtime, size, binary.parent))
+            total += size
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def _read_makefile_variables(path: pathlib.Path) -> dict:
+    variables = {}
+    with open(path) as f:
+        for line in f:
+            match = re.match(r"^(\w+)\s*=\s*(.*)$", line.rstrip("\n"))
+            if match is not None:
+                variables[match.group(1)] = match.group(2).strip()
+    return variables
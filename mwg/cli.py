@@ -0,0 +1,312 @@
+import argparse
+import pathlib
+
+import allocators
+import access_patterns
+import hardware
+import instrumentation
+import simd
+import utils
+import workload_generation
+import workload_spec
+from utils import parse_size
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """
+    Creates the argument parser of the workload generator. The actions of all options are available through
+    get_option_actions()
+    :return: parser for the generator command line
+    """
+    parser = argparse.ArgumentParser(
+        prog='Memory Benchmark Generator',
+        description='Generate C/C++ workload for various memory access patterns and parameter configurations'
+    )
+    parser.add_argument("-o", "--output-folder",
+                        default="output",
+                        dest="outputFolder",
+                        metavar="<output folder>",
+                        type=str,
+                        required=False,
+                        help="Output folder the workload will be generated to")
+    parser.add_argument("-v", "--version", action="version", version='%(prog)s 1.0.1')
+    parser.add_argument("-V", "--verbose",
+                        action="store_true",
+                        dest="verbose",
+                        help="Enables verbose logging")
+    parser.add_argument("-I", "--instrumentation",
+                        choices=instrumentation.registered_instrumentation_methods.values(),
+                        default=instrumentation.NoInstrumentation(),
+                        type=instrumentation.get_registered,
+                        dest="instrumentation",
+                        help="Select instrumentation library to use")
+    parser.add_argument("--events",
+                        type=lambda x: [e.strip() for e in x.split(",") if e.strip() != ""],
+                        default=None,
+                        dest="events",
+                        metavar="<event1[,event2]..>",
+                        help="Comma-separated list of events counted by the instrumentation, set as PAPI_EVENTS in the run goal of the Makefile for --instrumentation papi (e.g. PAPI_TOT_CYC,PAPI_TOT_INS,PAPI_L3_TCM)")
+    parser.add_argument("-0", "--silent",
+                        action="store_true",
+                        dest="silent",
+                        help="Disables all std output in the generator workload")
+    parser.add_argument("-nW", "--no-wtime-measurement",
+                        action="store_false",
+                        dest="wallTimeMeasure",
+                        help="Does not measure the wall time of the execution")
+    parser.add_argument("-E", "--env", action="append",
+                        metavar="<ENV_NAME>=<ENV_VALUE>",
+                        dest="environmentVariables",
+                        help="Specify environment variables that will be added to the run goal of the Makefile, format as ENV_NAME=ENV_VALUE")
+    parser.add_argument("--idle-phase", action="store", dest="idlePhase", type=int, default=-1,
+                        metavar="<time in ms>",
+                        help="Add an idle kernel before and after the actual compute kernel. This parameter specifies the duration of this idle phase in milliseconds")
+    parser.add_argument("--sample-interval", action="store", dest="sampleInterval", default=0,
+                        type=utils.parse_and_assert(float, lambda x: x >= 0, "The sample interval must not be negative"),
+                        metavar="<time in ms>",
+                        help="Split the kernel into slices of about this duration and record the elapsed time, the bytes moved and the counters of the instrumentation after each slice. The samples are written as CSV to --timeline. 0 disables sampling (default)")
+    parser.add_argument("--timeline", action="store", dest="timeline", default="timeline.csv", type=str,
+                        metavar="<CSV file>",
+                        help="File the samples of --sample-interval are written to, relative to the working directory of the workload (default: timeline.csv). The environment variable MWG_TIMELINE takes precedence")
+    parser.add_argument("--spec", action="store", dest="spec", default=None, type=workload_spec.load_spec,
+                        metavar="<specification file>",
+                        help="Compile the phases of a JSON or YAML workload specification into one workload. Each phase runs its own pattern with its own options (e.g. size, stride, type, threads and repetitions), timing and instrumentation region, optionally followed by an idle gap, and may share buffers with other phases")
+    parser.add_argument("--sweep", action="append",
+                        metavar="<option>=<values>",
+                        dest="sweep",
+                        help="Generate one workload per point of the cartesian product of all sweep specifications. Values are a comma-separated list (e.g. stride=1,2,4) or a range start:stop[:step], where a step of *k is geometric (e.g. size=1MiB:1GiB:*2)")
+    parser.add_argument("-j", "--jobs", action="store", dest="jobs", type=int, default=None,
+                        metavar="<worker count>",
+                        help="Number of worker processes used to generate a sweep (default: number of CPUs)")
+
+    access_args = parser.add_argument_group('Memory access settings')
+    access_args.add_argument("-P", "--pattern",
+                             choices=access_patterns.patterns,
+                             default=access_patterns.get_registered("strided-copy"),
+                             type=access_patterns.get_registered,
+                             dest="pattern",
+                             help="The access pattern to generate")
+    access_args.add_argument("--load-pattern",
+                             choices=[p for p in access_patterns.patterns if p.supports_slices],
+                             default=access_patterns.get_registered("strided-triad"),
+                             type=access_patterns.get_registered,
+                             dest="loadPattern",
+                             help="Pattern generating the load of the loaded-latency pattern (default: strided-triad)")
+    access_args.add_argument("--matrix-pattern",
+                             choices=[p for p in access_patterns.patterns if isinstance(p, access_patterns.StridedPattern)],
+                             default=access_patterns.get_registered("strided-load"),
+                             type=access_patterns.get_registered,
+                             dest="matrixPattern",
+                             help="Pattern measuring the bandwidth of each pair of CPU and memory node of the numa-matrix pattern (default: strided-load)")
+    access_args.add_argument("--load-levels",
+                             default=[0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+                             type=utils.parse_and_assert(lambda x: [float(v) for v in x.split(",")],
+                                                         lambda x: len(x) > 0 and all(0.0 <= v <= 1.0 for v in x),
+                                                         "Load levels must be fractions between 0 and 1"),
+                             dest="loadLevels",
+                             metavar="<fraction1[,fraction2]..>",
+                             help="Intensities of the load of the loaded-latency pattern as fractions of its unthrottled bandwidth, 0 measures the idle latency (default: 0,0.2,0.4,0.6,0.8,1)")
+    access_args.add_argument("--probe-cpu",
+                             default=-1,
+                             type=int,
+                             dest="probeCpu",
+                             metavar="<cpu>",
+                             help="CPU the latency probe of the loaded-latency pattern is pinned to (default: the last CPU available to the process)")
+    access_args.add_argument("--read-ratio",
+                             default=0.5,
+                             type=utils.parse_and_assert(float, lambda x: 0.0 <= x <= 1.0, "The read ratio must be between 0 and 1"),
+                             dest="readRatio",
+                             metavar="<fraction>",
+                             help="Fraction of the chunks read by the mixed patterns, the other chunks are written (default: 0.5)")
+    access_args.add_argument("--distribution",
+                             choices=["uniform", "zipf", "hotspot"],
+                             default="uniform",
+                             dest="distribution",
+                             help="Distribution of the random indices of the random, gather, scatter and mixed-random patterns, precomputed before the timed region (default: uniform)")
+    access_args.add_argument("--zipf-theta",
+                             default=0.99,
+                             type=utils.parse_and_assert(float, lambda x: x > 0, "The Zipf exponent must be positive"),
+                             dest="zipfTheta",
+                             metavar="<exponent>",
+                             help="Skew of --distribution zipf, the k-th most frequent item is accessed with a probability proportional to 1/k^theta (default: 0.99)")
+    access_args.add_argument("--hot-fraction",
+                             default=0.2,
+                             type=utils.parse_and_assert(float, lambda x: 0.0 < x <= 1.0, "The hot fraction must be in (0, 1]"),
+                             dest="hotFraction",
+                             metavar="<fraction>",
+                             help="Fraction of the items in the hot set of --distribution hotspot (default: 0.2)")
+    access_args.add_argument("--hot-probability",
+                             default=0.8,
+                             type=utils.parse_and_assert(float, lambda x: 0.0 <= x <= 1.0, "The hot probability must be between 0 and 1"),
+                             dest="hotProbability",
+                             metavar="<fraction>",
+                             help="Fraction of the accesses of --distribution hotspot that go to the hot set (default: 0.8)")
+    access_args.add_argument("--chains",
+                             default=None,
+                             type=utils.parse_and_assert(int, lambda x: x >= 1, "The number of chains must be at least 1"),
+                             dest="chains",
+                             metavar="<count>",
+                             help="Number of independent pointer chains each thread of the random patterns follows in an interleaved loop, controlling the memory-level parallelism. Without this option, a thread follows a single chase through a random permutation")
+    access_args.add_argument("-S", "--size",
+                             type=hardware.parse_size,
+                             default="512MiB",
+                             dest="size",
+                             help="The size of the total memory access, in bytes (e.g. 64MiB) or relative to the memory hierarchy of this machine (L1, L2, ..., LLC or DRAM per NUMA node, optionally scaled, e.g. L2x0.5 or LLCx4)")
+    access_args.add_argument("-c", "--chunk-size",
+                             type=parse_size,
+                             default="1",
+                             dest="chunkSize",
+                             help="The chunk size of memory accesses, i.e. the number of elements accessed between a stride.")
+    access_args.add_argument("-s", "--stride",
+                             default=1,
+                             type=int,
+                             dest="stride",
+                             help="Stride (in elements) between consecutive chunks")
+    access_args.add_argument("-X", default=0, type=int, dest="arithmeticIntensity", help="Control number of floating-point operations per memory access"),
+    access_args.add_argument("-n", "--repetitions",
+                             default=1,
+                             type=utils.parse_and_assert(int, lambda x: x > 0, "The number of repetitions must be positive"),
+                             dest="repetitions",
+                             help="Number of timed repetitions of the kernel, reported as min/median/mean/max time and bandwidth")
+    access_args.add_argument("-w", "--warmup",
+                             default=0,
+                             type=utils.parse_and_assert(int, lambda x: x >= 0, "The number of warm-up repetitions must not be negative"),
+                             dest="warmup",
+                             help="Number of untimed warm-up repetitions of the kernel before the timed repetitions")
+    access_args.add_argument("--duration",
+                             default=0,
+                             type=utils.parse_and_assert(float, lambda x: x >= 0, "The duration must not be negative"),
+                             dest="duration",
+                             metavar="<time in s>",
+                             help="Repeat the timed kernel until this many seconds have passed, but at least --repetitions times. 0 disables the deadline (default)")
+    access_args.add_argument("--target-bandwidth",
+                             default=0,
+                             type=utils.parse_and_assert(float, lambda x: x >= 0, "The target bandwidth must not be negative"),
+                             dest="targetBandwidth",
+                             metavar="<GB/s>",
+                             help="Limit the bandwidth of the kernel to this rate (according to the traffic model) by pacing slices of the kernel with a token bucket. 0 disables throttling (default)")
+    access_args.add_argument("--write-allocate",
+                             action="store_true",
+                             dest="writeAllocate",
+                             help="Count write-allocate traffic, i.e. an additional read of every written element, in the reported bandwidth")
+    access_args.add_argument("--nt-stores",
+                             action="store_true",
+                             dest="ntStores",
+                             help="Write results with non-temporal (streaming) stores followed by a store fence. Written elements then do not cause write-allocate traffic")
+    access_args.add_argument("--prefetch-distance",
+                             default=0,
+                             type=utils.parse_and_assert(int, lambda x: x >= 0, "The prefetch distance must not be negative"),
+                             dest="prefetchDistance",
+                             metavar="<iterations>",
+                             help="Issue software prefetches for the data accessed this many kernel iterations ahead (chunks for strided and random patterns, elements for gather/scatter). 0 disables prefetching (default)")
+    access_args.add_argument("--prefetch-hint",
+                             choices=list(workload_generation.PREFETCH_HINTS),
+                             default="t0",
+                             dest="prefetchHint",
+                             help="Locality hint of software prefetches: t0 (all cache levels, default), t1, t2 or nta (non-temporal)")
+    access_args.add_argument("-T", "--type",
+                             choices=["float", "double", "int"],
+                             default="double",
+                             type=str,
+                             dest="dataType",
+                             help="Select the data type for all operations")
+
+    allocation_args = parser.add_argument_group("Allocation options")
+    allocation_args.add_argument("-A", "--allocator",
+                                 choices=allocators.allocators,
+                                 default=allocators.get_registered("stdlib"),
+                                 type=allocators.get_registered,
+                                 dest="allocator",
+                                 help="Allocator used to allocate buffer")
+    allocation_args.add_argument("-L", "--allocation-location",
+                                 type=str,
+                                 required=False,
+                                 dest="allocationLocation",
+                                 metavar="<allocation location>",
+                                 help="Depending on --allocator, the allocation location can be specified. For --allocator memekind, a memkind (e.g. MEMKIND_REGULAR) can be specified. For --allocator libnuma, the id of the NUMA node is used.")
+    allocation_args.add_argument("-a", "--alignment",
+                                 default=None,
+                                 type=utils.parse_and_assert(int, lambda x: x % 8 == 0 and x > 0),
+                                 dest="alignment",
+                                 help="Optional, memory alignment (multiple of 8)")
+
+    allocation_args.add_argument("--populate",
+                                 action="store_true",
+                                 dest="populate",
+                                 help="Pre-fault all pages of mmap-based allocators at allocation time (MAP_POPULATE)")
+    allocation_args.add_argument("--mapping",
+                                 choices=["shared", "private"],
+                                 default="shared",
+                                 dest="mapping",
+                                 help="Whether file mappings of --allocator mmap-file are shared (MAP_SHARED, default) or private copy-on-write mappings (MAP_PRIVATE)")
+    allocation_args.add_argument("--madvise",
+                                 choices=list(allocators.MADVISE_HINTS),
+                                 default=None,
+                                 dest="madvise",
+                                 help="Access pattern advice given to the kernel for mmap-based allocators (madvise)")
+    allocation_args.add_argument("--msync",
+                                 action="store_true",
+                                 dest="msync",
+                                 help="Time writing back shared file mappings of --allocator mmap-file with msync(MS_SYNC) before unmapping")
+
+    parallelization_args = parser.add_argument_group("Parallelization options")
+    parallelization_args.add_argument("-p", "--parallelize",
+                                      action="store_true",
+                                      required=False,
+                                      dest="parallelize",
+                                      help="Whether to parallelize the access using OpenMP")
+    parallelization_args.add_argument("-t", "--threads", action="store", type=int, dest="threads", default=None,
+                                      metavar="<thread count>",
+                                      help="Number of OpenMP threads, added as OMP_NUM_THREADS to the run goal of the Makefile")
+    parallelization_args.add_argument("-nF", "--disable-first-touch",
+                                      action="store_false",
+                                      dest="firstTouch",
+                                      help="Disables first touch initialization")
+    parallelization_args.add_argument("--placement",
+                                      choices=workload_generation.PLACEMENTS,
+                                      default=None,
+                                      dest="placement",
+                                      help="Pin the OpenMP threads in the generated code: compact fills the NUMA nodes one after another, scatter distributes consecutive threads round-robin over the nodes, per-node splits the threads into equal groups per node and binds the partition of each group to its node. Buffers are first-touched with the static schedule of the kernels")
+    parallelization_args.add_argument("--membind", action="store", type=str, dest="membind", metavar="<node1[,node2]..>", help="Bind allocations to a comma-seperated list of numa nodes")
+    parallelization_args.add_argument("--cpunodebind", action="store", type=str, dest="cpunodebind", metavar="<node1[,node2]..>", help="Bind allocations to CPUs of speciofied NUMA nodes")
+
+    compiler_args = parser.add_argument_group("Compiler options")
+    compiler_args.add_argument("-nM", "--no-make-file",
+                               action="store_false",
+                               required=False,
+                               dest="createMakeFile",
+                               help="Whether to generate a default make file")
+    compiler_args.add_argument("--simd",
+                               choices=simd.simd_modes,
+                               default="auto",
+                               dest="simd",
+                               help="Kernel implementation of the strided patterns: auto leaves vectorization to the compiler, scalar disables it, sse/avx2/avx512 use intrinsics with a fixed vector width and fall back to scalar at runtime if unsupported by the CPU")
+    compiler_args.add_argument("--runtime-parameters",
+                               action="store_true",
+                               dest="runtimeParameters",
+                               help="Read size, stride, chunk size, repetitions, warm-up and thread count at runtime from --<name>=<value> arguments or MWG_<NAME> environment variables instead of compiling them into the workload. The given values are used as defaults")
+    compiler_args.add_argument("-O", "--optimizationLevel",
+                               type=str,
+                               default="2",
+                               dest="optimizationLevel",
+                               choices=["0", "1", "2", "3"],
+                               help="Sets the optimization level for the compiler")
+    compiler_args.add_argument("--native",
+                               action="store_true",
+                               required=False,
+                               dest="native",
+                               help="Enabled native compilation in the Makefile (i.e., -march=native)")
+    compiler_args.add_argument("--compiler", dest="compiler", action="store", type=str, help="Name of the compiler executable (default: gcc)", default="gcc")
+    compiler_args.add_argument("--include-path", dest="includePath", action="append", type=pathlib.Path, help="Add a location to search for headers")
+    compiler_args.add_argument("--library-path", dest="libraryPath", action="append", type=pathlib.Path, help="Add a location to search for libraries")
+    parser.option_actions = {option: action for action in parser._actions for option in action.option_strings}
+    return parser
+
+
+def get_option_actions(parser: argparse.ArgumentParser) -> dict:
+    """
+    Maps every option string of a parser to its action, e.g. both -S and --size to the action of the size
+    :param parser: parser created by create_parser()
+    :return: dictionary of option strings to argparse actions
+    """
+    return parser.option_actions
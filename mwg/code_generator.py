@@ -17,6 +17,7 @@ class CodeGenerator:
         self.includes = includes
 
         self._builder = StringBuilder()
+        self._definitions = set()
 
     def new_intended_block(self, runnable):
         """
@@ -62,6 +63,24 @@ class CodeGenerator:
         self._builder.Add(content)
         self._builder.Add("\n")
 
+    def add_code(self, code: str):
+        """
+        Appends code generated by another generator without changing its indention
+        :param code: generated code
+        """
+        self._builder.Add(code)
+
+    def add_definition(self, key: str, content: str):
+        """
+        Adds a multiline definition (e.g. a helper function) unless a definition with the same key has been added before
+        :param key: unique name of the definition
+        :param content: Multiple content, separated by line feed
+        """
+        if key in self._definitions:
+            return
+        self._definitions.add(key)
+        self.add_multiline_indented(content)
+
     def add_multiline_indented(self, content):
         """
         Adds a multline-string to the buffer. Each line is indented
@@ -81,6 +100,15 @@ class CodeGenerator:
             d = ", " + d
         self.add_line(f"printf(\"{content}\\n\"{d});")
 
+    def add_metric_statement(self, name: str, value_format: str, value: str):
+        """
+        Adds a print statement that prints a machine-readable metric as '[metric] <name> = <value>'
+        :param name: name of the metric
+        :param value_format: printf format of the value (e.g. %.6f)
+        :param value: C expression of the value
+        """
+        self.add_line(f"printf(\"[metric] {name} = {value_format}\\n\", {value});")
+
     def get_code(self):
         """
         Returns the current code buffer as a string
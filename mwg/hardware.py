@@ -0,0 +1,208 @@
+import argparse
+import functools
+import math
+import pathlib
+import re
+
+from utils import parse_size as parse_byte_size
+
+# symbolic sizes, e.g. L2x0.5, LLCx4 or DRAM
+_SYMBOLIC_SIZE = re.compile(r"^(L[1-9]|LLC|DRAM)(?:x(\d+(?:\.\d*)?|\.\d+))?$", re.IGNORECASE)
+# sweep value expanding to one footprint per level of the memory hierarchy, see get_hierarchy_sizes()
+HIERARCHY = "hierarchy"
+# the footprint of the DRAM point of the hierarchy is this multiple of the last level cache
+DRAM_FACTOR = 8
+# resolved sizes are rounded down to a multiple of this granularity (a base page)
+_GRANULARITY = 4096
+
+
+class Cache:
+    """
+    Data or unified cache of the first CPU as described in /sys/devices/system/cpu/cpu0/cache/index<i>
+    """
+    def __init__(self, level: int, size: int, line_size: int, ways: int, cpus: str):
+        """
+        :param level: level of the cache, 1 for L1
+        :param size: capacity of one instance of the cache in bytes
+        :param line_size: cache line size in bytes
+        :param ways: associativity, 0 if unknown
+        :param cpus: list of the CPUs sharing the instance, e.g. '0-7'
+        """
+        self.level = level
+        self.size = size
+        self.line_size = line_size
+        self.ways = ways
+        self.cpus = cpus
+
+    def __repr__(self):
+        return f"L{self.level}"
+
+
+class Node:
+    """
+    NUMA node as described in /sys/devices/system/node/node<i>
+    """
+    def __init__(self, id: int, memory: int, cpus: str):
+        """
+        :param id: number of the node
+        :param memory: total memory of the node in bytes
+        :param cpus: list of the CPUs of the node, e.g. '0-7', empty for memory-only nodes
+        """
+        self.id = id
+        self.memory = memory
+        self.cpus = cpus
+
+    def __repr__(self):
+        return f"node{self.id}"
+
+
+class Topology:
+    """
+    Memory hierarchy of the machine the generator runs on
+    """
+    def __init__(self, caches: list, nodes: list, huge_pages: dict):
+        """
+        :param caches: data and unified caches ordered by level
+        :param nodes: NUMA nodes, a single node without NUMA support
+        :param huge_pages: huge page sizes in bytes mapped to (reserved, free) page counts
+        """
+        self.caches = caches
+        self.nodes = nodes
+        self.huge_pages = huge_pages
+
+    def get_level(self, name: str) -> int:
+        """
+        Returns the capacity of a level of the hierarchy: Ln and LLC are the size of one instance of the cache, DRAM is
+        the memory of the smallest NUMA node
+        :param name: L1, L2, ..., LLC or DRAM
+        :return: capacity in bytes
+        """
+        name = name.upper()
+        if name == "DRAM":
+            if len(self.nodes) == 0:
+                raise ValueError("The memory size of the NUMA nodes cannot be read from /sys/devices/system/node")
+            return min(n.memory for n in self.nodes)
+        if len(self.caches) == 0:
+            raise ValueError("No caches found in /sys/devices/system/cpu/cpu0/cache")
+        if name == "LLC":
+            return self.caches[-1].size
+        for cache in self.caches:
+            if repr(cache) == name:
+                return cache.size
+        raise ValueError(f"This machine has no {name} cache, available are {', '.join(repr(c) for c in self.caches)} and LLC")
+
+
+def _read(path: pathlib.Path, default: str = None) -> str:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return default
+
+
+def _read_caches(root: pathlib.Path) -> list:
+    caches = {}
+    for index in sorted(pathlib.Path(root, "devices/system/cpu/cpu0/cache").glob("index*")):
+        if _read(index / "type") not in ["Data", "Unified"] or _read(index / "size") is None:
+            continue
+        level = int(_read(index / "level"))
+        caches[level] = Cache(level, parse_byte_size(_read(index / "size") + "iB"),
+                              int(_read(index / "coherency_line_size", "64")),
+                              int(_read(index / "ways_of_associativity", "0")),
+                              _read(index / "shared_cpu_list", "0"))
+    return [caches[level] for level in sorted(caches)]
+
+
+def _read_nodes(root: pathlib.Path) -> list:
+    nodes = []
+    for node in pathlib.Path(root, "devices/system/node").glob("node[0-9]*"):
+        match = re.search(r"MemTotal:\s+(\d+) kB", _read(node / "meminfo", ""))
+        if match is not None:
+            nodes.append(Node(int(node.name[4:]), int(match.group(1)) * 1024, _read(node / "cpulist", "")))
+    if len(nodes) == 0:
+        # kernels without NUMA support only describe the memory of the whole machine
+        match = re.search(r"MemTotal:\s+(\d+) kB", _read(pathlib.Path("/proc/meminfo"), ""))
+        if match is not None:
+            nodes.append(Node(0, int(match.group(1)) * 1024, ""))
+    return sorted(nodes, key=lambda n: n.id)
+
+
+def _read_huge_pages(root: pathlib.Path) -> dict:
+    huge_pages = {}
+    for pool in pathlib.Path(root, "kernel/mm/hugepages").glob("hugepages-*kB"):
+        size = int(pool.name[len("hugepages-"):-len("kB")]) * 1024
+        huge_pages[size] = (int(_read(pool / "nr_hugepages", "0")), int(_read(pool / "free_hugepages", "0")))
+    return huge_pages
+
+
+@functools.lru_cache(maxsize=None)
+def discover(root: str = "/sys") -> Topology:
+    """
+    Reads the caches of the first CPU, the NUMA nodes and the huge page pools from sysfs
+    :param root: mount point of sysfs
+    :return: topology of the machine
+    """
+    root = pathlib.Path(root)
+    return Topology(_read_caches(root), _read_nodes(root), _read_huge_pages(root))
+
+
+def _round(size: float) -> int:
+    return int(size) if size < _GRANULARITY else int(size) // _GRANULARITY * _GRANULARITY
+
+
+def parse_size(size) -> int:
+    """
+    Parses a byte size (see utils.parse_size) or a symbolic size <level>[x<factor>] relative to a level of the memory
+    hierarchy of this machine (see Topology.get_level()), e.g. L2x0.5 or LLCx4
+    :param size: formatted or symbolic size
+    :return: number of bytes
+    """
+    match = _SYMBOLIC_SIZE.match(str(size).strip())
+    if match is None:
+        return parse_byte_size(size)
+    factor = float(match.group(2)) if match.group(2) is not None else 1.0
+    try:
+        return _round(discover().get_level(match.group(1)) * factor)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def get_hierarchy_sizes(topology: Topology) -> list:
+    """
+    Returns one footprint per level of the memory hierarchy that lands well inside the level and well outside the
+    levels above it: half of L1, the geometric mean of the capacities of adjacent cache levels and DRAM_FACTOR times
+    the last level cache (at most half of the smallest NUMA node)
+    :return: list of (level, bytes) tuples ordered by size
+    """
+    sizes = []
+    previous = None
+    for cache in topology.caches:
+        inside = cache.size / 2 if previous is None else math.sqrt(previous * cache.size)
+        sizes.append((repr(cache), _round(inside)))
+        previous = cache.size
+    if previous is not None:
+        dram = previous * DRAM_FACTOR
+        if len(topology.nodes) > 0:
+            dram = min(dram, topology.get_level("DRAM") / 2)
+        sizes.append(("DRAM", _round(dram)))
+    return sizes
+
+
+def _format_size(size: int) -> str:
+    for unit, factor in [("GiB", 2 ** 30), ("MiB", 2 ** 20), ("KiB", 2 ** 10)]:
+        if size >= factor:
+            return f"{size / factor:.4g}{unit}"
+    return f"{size}B"
+
+
+def main(argv: list):
+    """
+    Prints the discovered topology and the footprints of a hierarchy sweep
+    """
+    topology = discover(argv[0] if len(argv) > 0 else "/sys")
+    for cache in topology.caches:
+        print(f"{cache!r:<5} {_format_size(cache.size):>10}  line {cache.line_size}B, {cache.ways}-way, shared by CPUs {cache.cpus}")
+    for node in topology.nodes:
+        print(f"{node!r:<5} {_format_size(node.memory):>10}  CPUs {node.cpus or '-'}")
+    for page_size, (reserved, free) in sorted(topology.huge_pages.items()):
+        print(f"huge pages of {_format_size(page_size)}: {reserved} reserved, {free} free")
+    print(f"{HIERARCHY}: " + ", ".join(f"{level} {_format_size(size)}" for level, size in get_hierarchy_sizes(topology)))
@@ -1,20 +1,66 @@
+import glob
+import json
+import os
+import re
+
 from code_generator import CodeGenerator
 
+# memory controller events counting 64 byte transfers from or to DRAM (CAS commands of Intel integrated memory controllers)
+_MEMORY_CONTROLLER_EVENT = re.compile(r"CAS_COUNT", re.IGNORECASE)
+_MEMORY_CONTROLLER_BYTES_PER_EVENT = 64
+
+
+def write_on_all_threads(args, generator: CodeGenerator, statements: list):
+    """
+    Writes statements that are executed by every OpenMP thread if --parallelize is set, otherwise by the main thread.
+    The threads of consecutive parallel regions are reused and stay pinned, so per-thread counters started in one
+    parallel region cover the parallel regions of the kernel until they are stopped in another one
+    """
+    if not args.parallelize:
+        for statement in statements:
+            generator.add_line(statement)
+        return
+    generator.include("omp.h", sys=True)
+    generator.add_line("#pragma omp parallel")
+    generator.add_line("{")
+    generator.start_indent()
+    for statement in statements:
+        generator.add_line(statement)
+    generator.close_indent()
+    generator.add_line("}")
+
 
 class NoInstrumentation:
-    def initialize(self, generator: CodeGenerator):
+    def write_definitions(self, args, generator: CodeGenerator):
+        pass
+
+    def initialize(self, args, generator: CodeGenerator):
         pass
 
-    def start_region(self, generator: CodeGenerator, region_name: str):
+    def start_region(self, args, generator: CodeGenerator, region_name: str):
         pass
 
-    def read_region(self, generator: CodeGenerator, region_name: str):
+    def read_region(self, args, generator: CodeGenerator, region_name: str):
         pass
 
-    def end_region(self, generator: CodeGenerator, region_name: str):
+    def end_region(self, args, generator: CodeGenerator, region_name: str):
         pass
 
-    def finalize(self, generator: CodeGenerator):
+    def finalize(self, args, generator: CodeGenerator):
+        pass
+
+    def get_timeline_counters(self, args) -> list:
+        """
+        Names of the counters recorded in each sample of the timeline (see --sample-interval)
+        """
+        return []
+
+    def write_timeline_counters(self, args, generator: CodeGenerator, values: str):
+        """
+        Writes code storing the current values of the counters of get_timeline_counters(), summed over all threads
+        and counted from the initialization of the instrumentation, in a double array
+        :param values: name of the array
+        """
         pass
 
     def get_compiler_flags(self) -> list:
@@ -23,53 +69,198 @@ class NoInstrumentation:
     def get_linker_flags(self) -> list:
         return []
 
+    def get_run_environment(self, output_dir: str) -> dict:
+        """
+        Environment variables required when running the workload
+        :param output_dir: folder the instrumentation output of the run should be written to
+        :return: dictionary of environment variables
+        """
+        return {}
+
+    def parse_output(self, output_dir: str, stdout: str) -> dict:
+        """
+        Collects the counters written by the instrumentation during a run
+        :param output_dir: folder passed to get_run_environment() for this run
+        :param stdout: standard output of the run
+        :return: flat dictionary of counter names to values
+        """
+        return {}
+
+    def get_exec_environment(self, args) -> list:
+        """
+        Environment variables of the run goal of the generated Makefile
+        :return: list of <name>=<value> strings
+        """
+        if args.events is not None:
+            print(f"warning: --events is not supported by instrumentation '{self}' and will be ignored")
+        return []
+
+    def get_derived_metrics(self, record: dict) -> dict:
+        """
+        Computes metrics derived from the counters of a run, e.g. instructions per cycle
+        :param record: result record of the run containing the printed metrics and the counters of parse_output()
+        :return: flat dictionary of metric names to values
+        """
+        return {}
+
     def __repr__(self):
         return "none"
 
 
 class PAPIInstrumentation(NoInstrumentation):
     """
-    Instrumentation using the PAPI High-Level API
+    Instrumentation using the PAPI High-Level API. The high-level API keeps separate event sets per thread, so with
+    --parallelize every thread begins, reads and ends the regions and stops the API
     """
-    def initialize(self, generator: CodeGenerator):
+    def initialize(self, args, generator: CodeGenerator):
         generator.include("papi.h", sys=False)
         generator.include("stdio.h", sys=True)
 
-    def start_region(self, generator: CodeGenerator, region_name: str):
-        generator.add_line(f"if(PAPI_hl_region_begin(\"{region_name}\") != PAPI_OK) {{ printf(\"Failed to begin PAPI region {region_name}\\n\"); }}")
+    def start_region(self, args, generator: CodeGenerator, region_name: str):
+        write_on_all_threads(args, generator, [f"if(PAPI_hl_region_begin(\"{region_name}\") != PAPI_OK) {{ printf(\"Failed to begin PAPI region {region_name}\\n\"); }}"])
 
-    def read_region(self, generator: CodeGenerator, region_name: str):
-        generator.add_line(f"if(PAPI_hl_read(\"{region_name}\") != PAPI_OK) {{ printf(\"Failed to read PAPI region {region_name}\\n\"); }}")
+    def read_region(self, args, generator: CodeGenerator, region_name: str):
+        write_on_all_threads(args, generator, [f"if(PAPI_hl_read(\"{region_name}\") != PAPI_OK) {{ printf(\"Failed to read PAPI region {region_name}\\n\"); }}"])
 
-    def end_region(self, generator: CodeGenerator, region_name: str):
-        generator.add_line(f"if(PAPI_hl_region_end(\"{region_name}\") != PAPI_OK) {{ printf(\"Failed to end PAPI region {region_name}\\n\"); }}")
+    def end_region(self, args, generator: CodeGenerator, region_name: str):
+        write_on_all_threads(args, generator, [f"if(PAPI_hl_region_end(\"{region_name}\") != PAPI_OK) {{ printf(\"Failed to end PAPI region {region_name}\\n\"); }}"])
 
-    def finalize(self, generator: CodeGenerator):
-        generator.add_line("if(PAPI_hl_stop() != PAPI_OK) { printf(\"Failed to stop PAPI hl API\"); }")
+    def finalize(self, args, generator: CodeGenerator):
+        write_on_all_threads(args, generator, ["if(PAPI_hl_stop() != PAPI_OK) { printf(\"Failed to stop PAPI hl API\"); }"])
 
     def get_linker_flags(self) -> list:
         return ["-lpapi"]
 
+    def get_run_environment(self, output_dir: str) -> dict:
+        return {"PAPI_OUTPUT_DIRECTORY": output_dir}
+
+    def get_exec_environment(self, args) -> list:
+        if args.events is None:
+            return []
+        return [f"PAPI_EVENTS=\"{','.join(args.events)}\""]
+
+    def get_derived_metrics(self, record: dict) -> dict:
+        return get_derived_metrics(record, "papi", cycles=["PAPI_TOT_CYC", "cycles"], instructions=["PAPI_TOT_INS"],
+                                   misses=["PAPI_L1_DCM", "PAPI_L2_TCM", "PAPI_L3_TCM", "PAPI_TLB_DM"])
+
+    def parse_output(self, output_dir: str, stdout: str) -> dict:
+        """
+        Sums the counters of each region over all threads of all ranks in the papi_hl_output folder. Memory controller
+        events count for the whole socket, so their maximum over all threads is used instead
+        """
+        counters = {}
+        threads_per_region = {}
+        for path in glob.glob(os.path.join(output_dir, "papi_hl_output", "*.json")):
+            with open(path) as f:
+                report = json.load(f)
+            threads = report.get("threads", [])
+            threads = threads.values() if isinstance(threads, dict) else threads
+            for thread in threads:
+                for region_name, values in _get_papi_regions(thread):
+                    threads_per_region[region_name] = threads_per_region.get(region_name, 0) + 1
+                    for name, value in values.items():
+                        if name in ["name", "parent_region_id"]:
+                            continue
+                        try:
+                            value = float(value)
+                        except (TypeError, ValueError):
+                            continue
+                        key = f"papi.{region_name}.{name}"
+                        if _MEMORY_CONTROLLER_EVENT.search(name):
+                            counters[key] = max(counters.get(key, 0.0), value)
+                        else:
+                            counters[key] = counters.get(key, 0.0) + value
+        for region_name, threads in threads_per_region.items():
+            counters[f"papi.{region_name}.threads"] = threads
+        return counters
+
     def __repr__(self):
         return "papi"
 
 
+def _get_first(record: dict, keys: list):
+    for key in keys:
+        if key in record:
+            return record[key]
+    return None
+
+
+def get_derived_metrics(record: dict, prefix: str, cycles: list, instructions: list, misses: list) -> dict:
+    """
+    Computes instructions per cycle, misses per KB moved by the kernel and the DRAM bandwidth measured by memory
+    controller events for each region with counters, i.e. main or the phases of --spec and the idle kernels
+    :param record: result record containing counters named <prefix>.<region>.<counter> and the printed metrics
+    :param prefix: prefix of the counters of the instrumentation, e.g. 'papi'
+    :param cycles: names of cycle counters, the first one present is used
+    :param instructions: names of instruction counters, the first one present is used
+    :param misses: names of miss counters, reported per KB (10^3 bytes) moved by regions with a traffic model
+    :return: flat dictionary of derived metrics named <prefix>.<region>.<metric>
+    """
+    derived = {}
+    regions = []
+    for key in record:
+        if key.startswith(f"{prefix}.") and key.count(".") >= 2 and key.split(".")[1] not in regions:
+            regions.append(key.split(".")[1])
+    for region in regions:
+        # a region covers all timed repetitions, <region>.bytes is the traffic of a single repetition
+        kilobytes = record.get(f"{region}.bytes", 0) * record.get(f"{region}.repetitions", 1) / 1e3
+        counters = {k[len(f"{prefix}.{region}."):]: v for k, v in record.items()
+                    if k.startswith(f"{prefix}.{region}.") and isinstance(v, (int, float))}
+        if len(counters) == 0:
+            continue
+        cycle_count = _get_first(counters, cycles)
+        instruction_count = _get_first(counters, instructions)
+        if cycle_count and instruction_count is not None:
+            derived[f"{prefix}.{region}.ipc"] = instruction_count / cycle_count
+        if kilobytes > 0:
+            for name in misses:
+                if name in counters:
+                    derived[f"{prefix}.{region}.{name.lower()}_per_kb"] = counters[name] / kilobytes
+        memory_events = sum(v for k, v in counters.items() if _MEMORY_CONTROLLER_EVENT.search(k))
+        if "real_time_nsec" in counters:
+            seconds = counters["real_time_nsec"] / counters.get("threads", 1) * 1e-9
+        else:
+            seconds = record.get(f"{region}.time")
+        if memory_events > 0 and seconds:
+            derived[f"{prefix}.{region}.memory_bytes"] = memory_events * _MEMORY_CONTROLLER_BYTES_PER_EVENT
+            derived[f"{prefix}.{region}.memory_bandwidth"] = memory_events * _MEMORY_CONTROLLER_BYTES_PER_EVENT / seconds * 1e-9
+    return derived
+
+
+def _get_papi_regions(thread: dict):
+    """
+    Yields (region name, counters) of a thread entry of the PAPI high-level output. Regions are either stored as a list
+    of {name: counters} objects or as a dictionary of region ids to counters containing a 'name' entry
+    """
+    regions = thread.get("regions", [])
+    if isinstance(regions, dict):
+        for region in regions.values():
+            yield region.get("name", "unknown"), region
+    else:
+        for region in regions:
+            for region_name, values in region.items():
+                yield region_name, values
+
+
 
 class LikwidInstrumentation(NoInstrumentation):
     """
-    Instrumentation using the LIKWID marker api
+    Instrumentation using the LIKWID marker api. With --parallelize, every thread is initialized with
+    likwid_markerThreadInit() and starts and stops the regions, so counters are attributed to all threads
     """
-    def initialize(self, generator: CodeGenerator):
+    def initialize(self, args, generator: CodeGenerator):
         generator.include("likwid-marker.h", sys=True)
-        generator.add_line("likwid_markerInit();")  # TODO: Maybe threaded init here
+        generator.add_line("likwid_markerInit();")
+        if args.parallelize:
+            write_on_all_threads(args, generator, ["likwid_markerThreadInit();"])
 
-    def start_region(self, generator: CodeGenerator, region_name: str):
-        generator.add_line(f"likwid_markerStartRegion(\"{region_name}\");")
+    def start_region(self, args, generator: CodeGenerator, region_name: str):
+        write_on_all_threads(args, generator, [f"likwid_markerStartRegion(\"{region_name}\");"])
 
-    def end_region(self, generator: CodeGenerator, region_name: str):
-        generator.add_line(f"likwid_markerStopRegion(\"{region_name}\");")
+    def end_region(self, args, generator: CodeGenerator, region_name: str):
+        write_on_all_threads(args, generator, [f"likwid_markerStopRegion(\"{region_name}\");"])
 
-    def finalize(self, generator: CodeGenerator):
+    def finalize(self, args, generator: CodeGenerator):
         generator.add_line("likwid_markerClose();")
 
     def get_compiler_flags(self) -> list:
@@ -82,11 +273,253 @@ class LikwidInstrumentation(NoInstrumentation):
         return "likwid"
 
 
-registered_instrumentation_methods = {"papi": PAPIInstrumentation(), "likwid": LikwidInstrumentation()}
+class PerfInstrumentation(NoInstrumentation):
+    """
+    Instrumentation using perf_event_open directly, without any library. Every thread opens one group of counters for
+    itself, which is read at the begin and end of each region. Counts are scaled by the fraction of time the group was
+    scheduled on the PMU (multiplexing), summed over all threads and printed as '[metric] perf.<region>.<event>'
+    """
+    events = ["cycles", "instructions", "cache_references", "cache_misses", "dtlb_load_misses", "page_faults"]
+
+    def _get_thread(self, args) -> str:
+        return "omp_get_thread_num()" if args.parallelize else "0"
+
+    def write_definitions(self, args, generator: CodeGenerator):
+        generator.include("linux/perf_event.h", sys=True)
+        generator.include("sys/ioctl.h", sys=True)
+        generator.include("sys/syscall.h", sys=True)
+        generator.include("stdint.h", sys=True)
+        generator.add_definition("perf", """#define MWG_PERF_EVENTS 6
+#define MWG_PERF_MAX_THREADS 1024
+#define MWG_PERF_MAX_REGIONS 16
+
+static const char* mwg_perf_event_names[MWG_PERF_EVENTS] = {
+    "cycles", "instructions", "cache_references", "cache_misses", "dtlb_load_misses", "page_faults"
+};
+static const uint32_t mwg_perf_event_types[MWG_PERF_EVENTS] = {
+    PERF_TYPE_HARDWARE, PERF_TYPE_HARDWARE, PERF_TYPE_HARDWARE, PERF_TYPE_HARDWARE, PERF_TYPE_HW_CACHE, PERF_TYPE_SOFTWARE
+};
+static const uint64_t mwg_perf_event_configs[MWG_PERF_EVENTS] = {
+    PERF_COUNT_HW_CPU_CYCLES, PERF_COUNT_HW_INSTRUCTIONS, PERF_COUNT_HW_CACHE_REFERENCES, PERF_COUNT_HW_CACHE_MISSES,
+    PERF_COUNT_HW_CACHE_DTLB | (PERF_COUNT_HW_CACHE_OP_READ << 8) | (PERF_COUNT_HW_CACHE_RESULT_MISS << 16),
+    PERF_COUNT_SW_PAGE_FAULTS
+};
+
+typedef struct {
+    int initialized;
+    int leader;  // file descriptor of the group leader, -1 if no event could be opened
+    int fds[MWG_PERF_EVENTS];
+    int positions[MWG_PERF_EVENTS];  // index of each event in the group, -1 if unavailable
+    uint64_t begin[MWG_PERF_MAX_REGIONS][MWG_PERF_EVENTS + 2];  // time enabled, time running and counts at region begin
+    double counts[MWG_PERF_MAX_REGIONS][MWG_PERF_EVENTS];  // scaled counts of all completed region instances
+    uint64_t enabled[MWG_PERF_MAX_REGIONS];
+    uint64_t running[MWG_PERF_MAX_REGIONS];
+} mwg_perf_thread_t;
+
+static mwg_perf_thread_t mwg_perf_threads[MWG_PERF_MAX_THREADS];
+static const char* mwg_perf_regions[MWG_PERF_MAX_REGIONS];
+static int mwg_perf_region_count = 0;
+
+// opens the counter group of the calling thread
+void mwg_perf_thread_init(int thread) {
+    if (thread >= MWG_PERF_MAX_THREADS || mwg_perf_threads[thread].initialized) {
+        return;
+    }
+    mwg_perf_thread_t* t = &mwg_perf_threads[thread];
+    t->initialized = 1;
+    t->leader = -1;
+    int events = 0;
+    for (int e = 0; e < MWG_PERF_EVENTS; e++) {
+        struct perf_event_attr attr;
+        memset(&attr, 0, sizeof(attr));
+        attr.size = sizeof(attr);
+        attr.type = mwg_perf_event_types[e];
+        attr.config = mwg_perf_event_configs[e];
+        attr.disabled = t->leader == -1;
+        attr.exclude_kernel = 1;
+        attr.exclude_hv = 1;
+        attr.read_format = PERF_FORMAT_GROUP | PERF_FORMAT_TOTAL_TIME_ENABLED | PERF_FORMAT_TOTAL_TIME_RUNNING;
+        t->fds[e] = (int) syscall(SYS_perf_event_open, &attr, 0, -1, t->leader, 0);
+        t->positions[e] = -1;
+        if (t->fds[e] < 0) {
+            if (thread == 0) {
+                printf("warning: perf event %s unavailable (%s)\\n", mwg_perf_event_names[e], strerror(errno));
+            }
+            continue;
+        }
+        if (t->leader == -1) {
+            t->leader = t->fds[e];
+        }
+        t->positions[e] = events++;
+    }
+    if (t->leader == -1) {
+        if (thread == 0) {
+            printf("warning: no perf events available, check /proc/sys/kernel/perf_event_paranoid\\n");
+        }
+        return;
+    }
+    ioctl(t->leader, PERF_EVENT_IOC_RESET, PERF_IOC_FLAG_GROUP);
+    ioctl(t->leader, PERF_EVENT_IOC_ENABLE, PERF_IOC_FLAG_GROUP);
+}
+
+// reads time enabled, time running and the counts of the group of a thread
+static int mwg_perf_read(mwg_perf_thread_t* t, uint64_t* values) {
+    uint64_t buffer[3 + MWG_PERF_EVENTS];  // number of events, time enabled, time running, counts
+    if (t->leader < 0 || read(t->leader, buffer, sizeof(buffer)) < (ssize_t) (3 * sizeof(uint64_t))) {
+        return 0;
+    }
+    for (uint64_t i = 0; i < 2 + buffer[0] && i < MWG_PERF_EVENTS + 2; i++) {
+        values[i] = buffer[1 + i];
+    }
+    return 1;
+}
+
+static int mwg_perf_region(const char* name) {
+    int region = -1;
+#ifdef _OPENMP
+#pragma omp critical(mwg_perf)
+#endif
+    {
+        for (int r = 0; r < mwg_perf_region_count && region == -1; r++) {
+            if (strcmp(mwg_perf_regions[r], name) == 0) {
+                region = r;
+            }
+        }
+        if (region == -1 && mwg_perf_region_count < MWG_PERF_MAX_REGIONS) {
+            region = mwg_perf_region_count;
+            mwg_perf_regions[mwg_perf_region_count++] = name;
+        }
+    }
+    return region;
+}
+
+void mwg_perf_start(const char* name, int thread) {
+    mwg_perf_thread_init(thread);
+    int region = mwg_perf_region(name);
+    if (region >= 0 && thread < MWG_PERF_MAX_THREADS) {
+        mwg_perf_read(&mwg_perf_threads[thread], mwg_perf_threads[thread].begin[region]);
+    }
+}
+
+void mwg_perf_stop(const char* name, int thread) {
+    int region = mwg_perf_region(name);
+    uint64_t end[MWG_PERF_EVENTS + 2];
+    if (region < 0 || thread >= MWG_PERF_MAX_THREADS || !mwg_perf_read(&mwg_perf_threads[thread], end)) {
+        return;
+    }
+    mwg_perf_thread_t* t = &mwg_perf_threads[thread];
+    uint64_t enabled = end[0] - t->begin[region][0];
+    uint64_t running = end[1] - t->begin[region][1];
+    t->enabled[region] += enabled;
+    t->running[region] += running;
+    for (int e = 0; e < MWG_PERF_EVENTS; e++) {
+        int p = t->positions[e];
+        if (p >= 0 && running > 0) {
+            // extrapolate counts of multiplexed groups to the whole time the region was enabled
+            t->counts[region][e] += (double) (end[2 + p] - t->begin[region][2 + p]) * enabled / running;
+        }
+    }
+}
+
+// stores the counts since the initialization of the counters, summed over all threads, in values
+void mwg_perf_sample(double* values) {
+    for (int e = 0; e < MWG_PERF_EVENTS; e++) {
+        values[e] = 0.0;
+    }
+    for (int thread = 0; thread < MWG_PERF_MAX_THREADS; thread++) {
+        mwg_perf_thread_t* t = &mwg_perf_threads[thread];
+        uint64_t current[MWG_PERF_EVENTS + 2];
+        if (!t->initialized || !mwg_perf_read(t, current) || current[1] == 0) {
+            continue;
+        }
+        for (int e = 0; e < MWG_PERF_EVENTS; e++) {
+            if (t->positions[e] >= 0) {
+                values[e] += (double) current[2 + t->positions[e]] * current[0] / current[1];
+            }
+        }
+    }
+}
+
+// prints the counts of every region summed over all threads and closes the counters
+void mwg_perf_report(int silent) {
+    for (int r = 0; r < mwg_perf_region_count; r++) {
+        double counts[MWG_PERF_EVENTS] = {0};
+        int available[MWG_PERF_EVENTS] = {0};
+        uint64_t enabled = 0, running = 0;
+        int threads = 0;
+        for (int thread = 0; thread < MWG_PERF_MAX_THREADS; thread++) {
+            mwg_perf_thread_t* t = &mwg_perf_threads[thread];
+            if (!t->initialized || t->leader < 0 || t->enabled[r] == 0) {
+                continue;
+            }
+            threads++;
+            enabled += t->enabled[r];
+            running += t->running[r];
+            for (int e = 0; e < MWG_PERF_EVENTS; e++) {
+                counts[e] += t->counts[r][e];
+                available[e] |= t->positions[e] >= 0;
+            }
+        }
+        if (threads == 0) {
+            continue;
+        }
+        if (!silent) {
+            printf("perf counters of region %s (%d threads, counted %.1f%% of the time):\\n", mwg_perf_regions[r],
+                   threads, enabled > 0 ? 100.0 * running / enabled : 0.0);
+        }
+        for (int e = 0; e < MWG_PERF_EVENTS; e++) {
+            if (!available[e]) {
+                continue;
+            }
+            if (!silent) {
+                printf("  %-20s %20.0f\\n", mwg_perf_event_names[e], counts[e]);
+            }
+            printf("[metric] perf.%s.%s = %.0f\\n", mwg_perf_regions[r], mwg_perf_event_names[e], counts[e]);
+        }
+        printf("[metric] perf.%s.threads = %d\\n", mwg_perf_regions[r], threads);
+        printf("[metric] perf.%s.running_fraction = %.4f\\n", mwg_perf_regions[r], enabled > 0 ? (double) running / enabled : 0.0);
+    }
+    for (int thread = 0; thread < MWG_PERF_MAX_THREADS; thread++) {
+        for (int e = 0; mwg_perf_threads[thread].initialized && e < MWG_PERF_EVENTS; e++) {
+            if (mwg_perf_threads[thread].fds[e] >= 0) {
+                close(mwg_perf_threads[thread].fds[e]);
+            }
+        }
+    }
+}""")
+
+    def initialize(self, args, generator: CodeGenerator):
+        write_on_all_threads(args, generator, [f"mwg_perf_thread_init({self._get_thread(args)});"])
+
+    def start_region(self, args, generator: CodeGenerator, region_name: str):
+        write_on_all_threads(args, generator, [f"mwg_perf_start(\"{region_name}\", {self._get_thread(args)});"])
+
+    def end_region(self, args, generator: CodeGenerator, region_name: str):
+        write_on_all_threads(args, generator, [f"mwg_perf_stop(\"{region_name}\", {self._get_thread(args)});"])
+
+    def finalize(self, args, generator: CodeGenerator):
+        generator.add_line(f"mwg_perf_report({int(args.silent)});")
+
+    def get_timeline_counters(self, args) -> list:
+        return self.events
+
+    def write_timeline_counters(self, args, generator: CodeGenerator, values: str):
+        generator.add_line(f"mwg_perf_sample({values});")
+
+    def get_derived_metrics(self, record: dict) -> dict:
+        return get_derived_metrics(record, "perf", cycles=["cycles"], instructions=["instructions"],
+                                   misses=["cache_misses", "dtlb_load_misses", "page_faults"])
+
+    def __repr__(self):
+        return "perf"
+
+
+registered_instrumentation_methods = {"papi": PAPIInstrumentation(), "likwid": LikwidInstrumentation(),
+                                      "perf": PerfInstrumentation()}
 
 
 def get_registered(name):
-    if name is None:
+    if name is None or name.lower() == "none":
         return NoInstrumentation()
     if name.lower() in registered_instrumentation_methods:
         return registered_instrumentation_methods[name.lower()]
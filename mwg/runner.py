@@ -0,0 +1,248 @@
+import argparse
+import csv
+import json
+import os
+import pathlib
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import instrumentation
+import sweep
+import workload_writer
+from build_cache import BuildCache
+from utils import parse_size
+
+# metrics printed by every generated workload
+_STDOUT_METRICS = {
+    "time": re.compile(r"^Computation took: ([-+0-9.eE]+)s\s*$"),
+    "result": re.compile(r"^Result: (\S+)\s*$"),
+}
+# machine-readable metrics, printed as '[metric] <name> = <value>'
+_METRIC_LINE = re.compile(r"^\[metric\] (\S+) = (\S+)\s*$")
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """
+    Creates the argument parser of the run subcommand
+    :return: parser for the run command line
+    """
+    parser = argparse.ArgumentParser(
+        prog='Memory Benchmark Generator run',
+        description='Builds and runs generated workloads and collects their results'
+    )
+    parser.add_argument("folder",
+                        metavar="<workload folder>",
+                        type=pathlib.Path,
+                        help="Folder of a generated workload or of a sweep (containing index.json)")
+    parser.add_argument("-n", "--repetitions",
+                        default=1,
+                        type=int,
+                        dest="repetitions",
+                        help="Number of runs of each workload")
+    parser.add_argument("-r", "--results",
+                        default="results.jsonl",
+                        type=pathlib.Path,
+                        dest="results",
+                        metavar="<results file>",
+                        help="File the results are appended to, one record per run. The format (CSV or JSON lines) is derived from the extension (.csv or .jsonl)")
+    parser.add_argument("--cache-dir", default=os.environ.get("MWG_CACHE_DIR"), type=pathlib.Path, dest="cacheDir",
+                        metavar="<cache folder>",
+                        help="Reuse binaries of identical workloads from a build cache in this folder (default: $MWG_CACHE_DIR, disabled if unset)")
+    parser.add_argument("--cache-size", default="4GiB", type=parse_size, dest="cacheSize",
+                        help="Maximum size of the build cache, least recently used binaries are evicted (default: 4GiB)")
+    parser.add_argument("--make", default="make", dest="make", type=str, help="Name of the make executable (default: make)")
+    parser.add_argument("--timeout", default=None, type=float, dest="timeout", metavar="<time in s>",
+                        help="Abort a run after the given number of seconds")
+    parser.add_argument("-V", "--verbose", action="store_true", dest="verbose", help="Print the output of each run")
+    return parser
+
+
+def get_workloads(folder: pathlib.Path) -> list:
+    """
+    Returns the workloads to run, i.e. the folder itself or all points listed in a sweep manifest
+    :param folder: folder of a workload or of a sweep
+    :return: list of (workload folder, runtime arguments, configuration) tuples
+    """
+    manifest = pathlib.Path(folder, sweep.MANIFEST_NAME)
+    if manifest.exists():
+        with open(manifest) as f:
+            return [(pathlib.Path(folder, w["folder"]), w.get("arguments", []), w["configuration"])
+                    for w in json.load(f)["workloads"]]
+    if not pathlib.Path(folder, "Makefile").exists():
+        raise AttributeError(f"'{folder}' contains neither a Makefile nor a sweep index")
+    return [(folder, [], read_configuration(folder))]
+
+
+def read_configuration(folder: pathlib.Path) -> dict:
+    path = pathlib.Path(folder, workload_writer.CONFIGURATION_NAME)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def parse_stdout(stdout: str) -> dict:
+    """
+    Extracts the metrics printed by a generated workload
+    :param stdout: standard output of the workload
+    :return: dictionary of metric names to values
+    """
+    metrics = {}
+    for line in stdout.splitlines():
+        line = line.strip()
+        match = _METRIC_LINE.match(line)
+        if match is not None:
+            metrics[match.group(1)] = _to_number(match.group(2))
+            continue
+        for name, pattern in _STDOUT_METRICS.items():
+            match = pattern.match(line)
+            if match is not None:
+                metrics[name] = _to_number(match.group(1))
+    return metrics
+
+
+def _to_number(value: str):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def build(args, folder: pathlib.Path, cache: BuildCache = None):
+    """
+    Builds a workload, reusing the binary from the build cache if available
+    """
+    key = None
+    if cache is not None:
+        key = cache.get_key(folder)
+        if cache.fetch(key, folder):
+            if args.verbose:
+                print(f"Using cached binary {key[:12]} for '{folder}'")
+            return
+    result = subprocess.run([args.make, "-s", "-C", str(folder), "all"], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to build '{folder}':\n{result.stdout}{result.stderr}")
+    if cache is not None:
+        cache.store(key, folder)
+
+
+def run_once(args, folder: pathlib.Path, config: dict, arguments: list) -> dict:
+    """
+    Runs a built workload once using the run goal of its Makefile
+    :param arguments: runtime arguments passed to the workload binary
+    :return: record of the run containing configuration, timings and counters
+    """
+    method = instrumentation.get_registered(config.get("instrumentation"))
+    with tempfile.TemporaryDirectory(prefix="mwg-run-") as output_dir:
+        env = dict(os.environ)
+        env.update(method.get_run_environment(output_dir))
+        started = time.time()
+        timeline = None
+        if config.get("sampleInterval", 0) > 0:
+            # keep the timeline of every run next to the workload
+            timeline = pathlib.Path(folder, f"timeline-{int(started * 1000)}.csv").resolve()
+            env["MWG_TIMELINE"] = str(timeline)
+        result, timed_out = _run_make(args, [args.make, "-s", "--no-print-directory", "-C", str(folder), "run",
+                                             "ARGS=" + " ".join(arguments)], env)
+        if args.verbose:
+            print(result.stdout, end="")
+        record = {"folder": str(folder), "timestamp": started, "exit_code": result.returncode, "timed_out": timed_out}
+        record.update(config)
+        if timeline is not None:
+            # the configured path is overridden by MWG_TIMELINE, so the record points at the file of this run
+            record["timeline"] = str(timeline)
+        record.update(parse_stdout(result.stdout))
+        record.update(method.parse_output(output_dir, result.stdout))
+        record.update(method.get_derived_metrics(record))
+    if timed_out:
+        print(f"warning: run of '{folder}' was aborted after {args.timeout}s")
+    elif result.returncode != 0:
+        print(f"warning: run of '{folder}' exited with code {result.returncode}:\n{result.stderr}")
+    return record
+
+
+def _run_make(args, command: list, env: dict) -> (subprocess.CompletedProcess, bool):
+    """
+    Runs make in its own process group, so a run exceeding --timeout is killed together with the workload it started
+    :return: tuple of the completed process, containing the output up to the timeout, and whether the run timed out
+    """
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env,
+                          start_new_session=True) as process:
+        try:
+            stdout, stderr = process.communicate(timeout=args.timeout)
+            timed_out = False
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            stdout, stderr = process.communicate()
+            timed_out = True
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr), timed_out
+
+
+def append_results(path: pathlib.Path, records: list):
+    """
+    Appends records to a JSON lines or CSV file. The header of a CSV file is extended if records contain new fields
+    :param path: results file
+    :param records: list of dictionaries
+    """
+    if path.suffix.lower() != ".csv":
+        with open(path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        return
+
+    rows = []
+    fields = []
+    if path.exists():
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            fields = list(reader.fieldnames or [])
+            rows = list(reader)
+    for record in records:
+        for key in record:
+            if key not in fields:
+                fields.append(key)
+    rows.extend([{k: json.dumps(v) if isinstance(v, (dict, list)) else v for k, v in r.items()} for r in records])
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: list):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    try:
+        workloads = get_workloads(args.folder)
+    except AttributeError as e:
+        parser.error(str(e))
+    cache = None if args.cacheDir is None else BuildCache(args.cacheDir, args.cacheSize)
+    built = set()
+    failed = []
+    for i, (folder, arguments, config) in enumerate(workloads):
+        if folder in failed:
+            continue
+        try:
+            if folder not in built:
+                print(f"[{i + 1}/{len(workloads)}] Building '{folder}'")
+                build(args, folder, cache)
+                built.add(folder)
+            print(f"[{i + 1}/{len(workloads)}] Running '{folder}' {' '.join(arguments)}")
+            records = []
+            for repetition in range(args.repetitions):
+                record = run_once(args, folder, config, arguments)
+                record["repetition"] = repetition
+                records.append(record)
+        except (RuntimeError, AttributeError) as e:
+            # e.g. a compiler error or an instrumentation that is not available, the other workloads are still run
+            print(f"error: {e}")
+            failed.append(folder)
+            continue
+        append_results(args.results, records)
+    print(f"Results have been appended to '{args.results}'")
+    if len(failed) > 0:
+        print(f"{len(failed)} workload(s) could not be run: {', '.join(str(f) for f in failed)}")
+        sys.exit(1)
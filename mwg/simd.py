@@ -0,0 +1,96 @@
+class InstructionSet:
+    """
+    x86 SIMD instruction set used to generate kernels with explicit intrinsics and a fixed vector width
+    """
+    def __init__(self, name: str, register_bits: int, prefix: str, target: str, cpu_feature: str):
+        """
+        :param name: name used on the command line
+        :param register_bits: width of a vector register in bits
+        :param prefix: prefix of the intrinsics (e.g. _mm256)
+        :param target: gcc/clang target attribute enabling the instruction set for a single function
+        :param cpu_feature: feature name checked with __builtin_cpu_supports at runtime
+        """
+        self.name = name
+        self.register_bits = register_bits
+        self.prefix = prefix
+        self.target = target
+        self.cpu_feature = cpu_feature
+
+    def get_vector_width(self, data_type: str) -> int:
+        """
+        Returns the number of elements of a vector register
+        """
+        return self.register_bits // (8 * _get_type_size(data_type))
+
+    def vector_type(self, data_type: str) -> str:
+        suffix = {"double": "d", "float": "", "int": "i"}[data_type]
+        return f"__m{self.register_bits}{suffix}"
+
+    def _suffix(self, data_type: str) -> str:
+        return {"double": "pd", "float": "ps", "int": "epi32"}[data_type]
+
+    def load(self, data_type: str, address: str) -> str:
+        if data_type == "int":
+            return f"{self.prefix}_loadu_si{self.register_bits}((const void*) ({address}))"
+        return f"{self.prefix}_loadu_{self._suffix(data_type)}({address})"
+
+    def store(self, data_type: str, address: str, value: str) -> str:
+        if data_type == "int":
+            return f"{self.prefix}_storeu_si{self.register_bits}((void*) ({address}), {value});"
+        return f"{self.prefix}_storeu_{self._suffix(data_type)}({address}, {value});"
+
+    def stream(self, data_type: str, address: str, value: str) -> str:
+        """
+        Returns a non-temporal store of a vector, the address has to be aligned to the register width
+        """
+        if data_type == "int":
+            return f"{self.prefix}_stream_si{self.register_bits}(({self.vector_type(data_type)}*) ({address}), {value});"
+        return f"{self.prefix}_stream_{self._suffix(data_type)}({address}, {value});"
+
+    def get_register_bytes(self) -> int:
+        return self.register_bits // 8
+
+    def add(self, data_type: str, a: str, b: str) -> str:
+        return f"{self.prefix}_add_{self._suffix(data_type)}({a}, {b})"
+
+    def mul(self, data_type: str, a: str, b: str) -> str:
+        if data_type == "int":
+            return f"{self.prefix}_mullo_epi32({a}, {b})"
+        return f"{self.prefix}_mul_{self._suffix(data_type)}({a}, {b})"
+
+    def set1(self, data_type: str, value: str) -> str:
+        return f"{self.prefix}_set1_{self._suffix(data_type)}({value})"
+
+    def setzero(self, data_type: str) -> str:
+        if data_type == "int":
+            return f"{self.prefix}_setzero_si{self.register_bits}()"
+        return f"{self.prefix}_setzero_{self._suffix(data_type)}()"
+
+    def get_function_attribute(self) -> str:
+        return f"__attribute__((target(\"{self.target}\")))"
+
+    def __repr__(self):
+        return self.name
+
+
+def _get_type_size(data_type: str) -> int:
+    return {"double": 8, "float": 4, "int": 4}[data_type]
+
+
+# sorted from widest to narrowest
+instruction_sets = [
+    InstructionSet("avx512", 512, "_mm512", "avx512f", "avx512f"),
+    InstructionSet("avx2", 256, "_mm256", "avx2", "avx2"),
+    InstructionSet("sse", 128, "_mm", "sse4.1", "sse4.1"),
+]
+
+# 'auto' leaves vectorization to the compiler, 'scalar' disables it
+simd_modes = ["auto", "scalar"] + [repr(s) for s in reversed(instruction_sets)]
+
+
+def get_registered(name):
+    name = name.lower()
+    for instruction_set in instruction_sets:
+        if repr(instruction_set) == name:
+            return instruction_set
+    return None
@@ -0,0 +1,204 @@
+import argparse
+import itertools
+import json
+import math
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+import cli
+import hardware
+import workload_generation
+import workload_spec
+import workload_writer
+
+MANIFEST_NAME = "index.json"
+# relative tolerance of the upper bound of sweep ranges, so rounding errors of fractional steps do not drop it
+_TOLERANCE = 1e-9
+
+# per-process state of the sweep workers, loaded once by _initialize_worker
+_parser = None
+_env = None
+
+
+def _expand_range(spec: str, parse=hardware.parse_size) -> list:
+    """
+    Expands a range of the form start:stop[:step] to a list of values. The step may be prefixed with '*' to generate a
+    geometric series. Bounds and steps are parsed like the values of the swept option, so sizes may use size suffixes
+    or symbolic sizes (e.g. 4KiB:1GiB:*4 or L1:LLCx4:*2) and options of type float may use fractional bounds and steps
+    (e.g. 0:1:0.25)
+    :param spec: range specification
+    :param parse: argparse type of the swept option
+    :return: list of values as strings
+    """
+    parts = spec.split(":")
+    if len(parts) not in [2, 3]:
+        raise AttributeError(f"Malformed sweep range '{spec}', expected start:stop[:step]")
+    step = parts[2] if len(parts) == 3 else "1"
+    try:
+        start, stop = parse(parts[0]), parse(parts[1])
+        factor = float(step[1:]) if step.startswith("*") else None
+        increment = parse(step) if factor is None else None
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        raise AttributeError(f"Malformed sweep range '{spec}': {e}")
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in [start, stop, increment or 1]):
+        raise AttributeError(f"Sweep range '{spec}' requires an option with numeric values")
+    integral = all(isinstance(v, int) for v in [start, stop, increment or 1])
+    values = []
+    if factor is not None:
+        if factor <= 1:
+            raise AttributeError(f"Geometric step of sweep range '{spec}' must be greater than 1")
+        value = float(start)
+        while value <= stop * (1 + _TOLERANCE):
+            values.append(value)
+            value *= factor
+    else:
+        if increment <= 0:
+            raise AttributeError(f"Step of sweep range '{spec}' must be positive")
+        count = int(math.floor((stop - start) / increment + _TOLERANCE)) + 1
+        values = [start + i * increment for i in range(max(count, 0))]
+    if integral:
+        return [str(int(v)) for v in values]
+    return [repr(round(v, 12)) for v in values]
+
+
+def parse_sweep_spec(spec: str, parser: argparse.ArgumentParser) -> (str, list):
+    """
+    Parses a single sweep specification of the form <option>=<values>. The value 'hierarchy' expands to one footprint
+    per level of the memory hierarchy of this machine (see hardware.get_hierarchy_sizes())
+    :param spec: sweep specification, e.g. 'stride=1,2,4', 'size=1MiB:64MiB:*2' or 'size=hierarchy'
+    :param parser: parser of the generator, used to validate the option name
+    :return: tuple of the option string and the list of values
+    """
+    if "=" not in spec:
+        raise AttributeError(f"Malformed sweep specification '{spec}', expected <option>=<values>")
+    name, values = spec.split("=", 1)
+    name = name.strip().lstrip("-")
+    option = "--" + name
+    if option not in cli.get_option_actions(parser):
+        raise AttributeError(f"Unknown sweep option '{name}'")
+    parse = cli.get_option_actions(parser)[option].type or str
+    expanded = []
+    for value in values.split(","):
+        value = value.strip()
+        if value.lower() == hardware.HIERARCHY:
+            expanded.extend(str(size) for _, size in hardware.get_hierarchy_sizes(hardware.discover()))
+        elif ":" in value:
+            expanded.extend(_expand_range(value, parse))
+        elif value != "":
+            expanded.append(value)
+    if len(expanded) == 0:
+        raise AttributeError(f"Sweep option '{name}' has no values")
+    return option, expanded
+
+
+def expand_sweep(specs: list, parser: argparse.ArgumentParser) -> list:
+    """
+    Expands all sweep specifications to the cartesian product of their values
+    :param specs: list of sweep specifications
+    :param parser: parser of the generator
+    :return: list of dictionaries mapping option strings to values, one per sweep point
+    """
+    options = [parse_sweep_spec(spec, parser) for spec in specs]
+    return [dict(zip([o for o, _ in options], point)) for point in itertools.product(*[v for _, v in options])]
+
+
+def get_point_arguments(base_argv: list, point: dict, parser: argparse.ArgumentParser) -> list:
+    """
+    Appends the options of a sweep point to the base command line. Later options override earlier ones, boolean flags
+    are enabled for 'true' and omitted for 'false'
+    :param base_argv: command line of the sweep invocation
+    :param point: option strings mapped to values
+    :param parser: parser of the generator
+    :return: command line of the sweep point
+    """
+    argv = list(base_argv)
+    for option, value in point.items():
+        if cli.get_option_actions(parser)[option].nargs == 0:
+            if value.lower() in ["1", "true", "yes", "on"]:
+                argv.append(option)
+        else:
+            argv.extend([option, value])
+    return argv
+
+
+def _initialize_worker():
+    global _parser, _env
+    _parser = cli.create_parser()
+    _env = workload_writer.load_templates()
+
+
+def _generate_point(folder: str, argv: list):
+    args = _parser.parse_args(argv + ["-o", folder])
+    args.phases = workload_spec.get_phases(args, _parser)
+    workload_writer.write_workload(args, _env, pathlib.Path(folder), quiet=True)
+
+
+def get_runtime_arguments(point: dict, parser: argparse.ArgumentParser) -> list:
+    """
+    Returns the options of a sweep point that are passed at runtime, i.e. of parameters in
+    workload_generation.RUNTIME_PARAMETERS
+    :param point: option strings mapped to values
+    :param parser: parser of the generator
+    :return: list of --<name>=<value> arguments of the workload binary
+    """
+    arguments = []
+    for option, value in point.items():
+        dest = cli.get_option_actions(parser)[option].dest
+        if dest in workload_generation.RUNTIME_PARAMETERS:
+            arguments.append(f"--{workload_generation.RUNTIME_PARAMETERS[dest]}={hardware.parse_size(value)}")
+    return arguments
+
+
+def _get_compile_time_key(args, point: dict, parser: argparse.ArgumentParser) -> tuple:
+    return tuple(sorted((option, value) for option, value in point.items()
+                        if not args.runtimeParameters
+                        or cli.get_option_actions(parser)[option].dest not in workload_generation.RUNTIME_PARAMETERS))
+
+
+def run_sweep(args, argv: list):
+    """
+    Generates one workload per sweep point into numbered subfolders of the output folder using a pool of worker
+    processes and writes a manifest mapping each subfolder to its configuration. With --runtime-parameters, points
+    that only differ in runtime parameters share a single workload and are distinguished by their runtime arguments
+    :param args: parsed arguments of the sweep invocation
+    :param argv: command line of the sweep invocation
+    """
+    parser = cli.create_parser()
+    points = expand_sweep(args.sweep, parser)
+    point_argv = [get_point_arguments(argv, point, parser) for point in points]
+    # invalid values are reported as usage errors before any workload is generated
+    point_args = [parser.parse_args(argv) for argv in point_argv]
+    for point_arg in point_args:
+        try:
+            workload_spec.get_phases(point_arg, parser)
+        except AttributeError as e:
+            parser.error(str(e))
+    output_folder = pathlib.Path(args.outputFolder)
+    output_folder.mkdir(parents=True, exist_ok=True)
+
+    point_arguments = [get_runtime_arguments(point, parser) if args.runtimeParameters else [] for point in points]
+    # points with identical compile-time options share a workload
+    groups = {}
+    point_groups = []
+    for point in points:
+        key = _get_compile_time_key(args, point, parser)
+        point_groups.append(groups.setdefault(key, len(groups)))
+    print(f"Generating {len(groups)} workloads for {len(points)} sweep points...")
+
+    width = max(5, len(str(len(groups) - 1)))
+    folders = [str(i).zfill(width) for i in range(len(groups))]
+    group_argv = [point_argv[point_groups.index(i)] for i in range(len(groups))]
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_initialize_worker) as executor:
+        list(executor.map(_generate_point, [str(pathlib.Path(output_folder, f)) for f in folders], group_argv))
+
+    manifest = {"workloads": []}
+    for point, point_arg, arguments, group in zip(points, point_args, point_arguments, point_groups):
+        manifest["workloads"].append({
+            "folder": folders[group],
+            "arguments": arguments,
+            "parameters": {option.lstrip("-"): value for option, value in point.items()},
+            "configuration": workload_writer.get_configuration(point_arg)
+        })
+    with open(pathlib.Path(output_folder, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"{len(groups)} workloads have been written to '{output_folder}', index: '{output_folder}/{MANIFEST_NAME}'")
@@ -1,3 +1,4 @@
+import argparse
 import functools
 import re
 import json
@@ -6,27 +7,52 @@ from io import StringIO
 
 def parse_size(size):
     """
-    Parse a formatted byte size string (e.g. 4.1GiB) and returns the number of bytes
+    Parse a formatted byte size string (e.g. 4.1GiB) and returns the number of bytes. Binary units (KiB, MiB, ...) are
+    powers of 1024, decimal units (kB, MB, ...) powers of 1000
     :param size: formatted size
     :return: number of bytes
     """
-    units = {"": 1, "b": 1, "kb": 2 ** 10, "mb": 2 ** 20, "gb": 2 ** 30, "tb": 2 ** 40,
-             "kib": 10 ** 3, "mib": 10 ** 6, "gib": 10 ** 9, "tib": 10 ** 12}
-    matcher = re.match(r'(\d+)([a-zA-Z]{1,3})?', str(size).strip())
+    units = {"": 1, "b": 1, "kb": 10 ** 3, "mb": 10 ** 6, "gb": 10 ** 9, "tb": 10 ** 12,
+             "kib": 2 ** 10, "mib": 2 ** 20, "gib": 2 ** 30, "tib": 2 ** 40}
+    matcher = re.fullmatch(r'(\d+(?:\.\d*)?|\.\d+)\s*([a-zA-Z]{1,3})?', str(size).strip())
+    if matcher is None:
+        raise argparse.ArgumentTypeError(f"Malformed size '{size}'")
     number = float(matcher.group(1))
     unit = matcher.group(2)
     if unit is None:
         return int(number)
     unit = unit.lower()
     if unit not in units:
-        raise AttributeError("Malformed size " + size)
+        raise argparse.ArgumentTypeError(f"Malformed size '{size}'")
     return int(number * units[unit])
 
 
+def write_if_changed(path, content: str) -> bool:
+    """
+    Writes a file only if its content differs, so that unchanged files keep their modification time
+    :param path: path of the file
+    :param content: new content of the file
+    :return: whether the file has been written
+    """
+    try:
+        with open(path) as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, "w") as f:
+        f.write(content)
+    return True
+
+
 def __parse_and_assert(val, parser, assertion, error_message):
-    if assertion(parser(val)):
-        return
-    raise AttributeError(error_message)
+    try:
+        parsed = parser(val)
+    except (TypeError, ValueError):
+        raise argparse.ArgumentTypeError(f"Malformed value '{val}'")
+    if assertion(parsed):
+        return parsed
+    raise argparse.ArgumentTypeError(error_message)
 
 
 def parse_and_assert(parser, assertion, error_message="Assertion failed"):
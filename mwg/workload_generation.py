@@ -1,18 +1,337 @@
 from code_generator import CodeGenerator
+import workload_spec
 
+# parameters that can be passed to the workload at runtime (argument dest -> command line name)
+RUNTIME_PARAMETERS = {"size": "size", "stride": "stride", "chunkSize": "chunk-size", "repetitions": "repetitions",
+                      "warmup": "warmup", "threads": "threads"}
+# chunk sizes of the strided kernels that are specialized at compile time when the chunk size is a runtime parameter
+SPECIALIZED_CHUNK_SIZES = [1, 2, 3]
+# locality argument of __builtin_prefetch for each --prefetch-hint
+PREFETCH_HINTS = {"t0": 3, "t1": 2, "t2": 1, "nta": 0}
+CACHE_LINE_SIZE = 64
+# duration of the traffic of one slice of a kernel throttled by --target-bandwidth in seconds
+THROTTLE_PERIOD = 0.001
+# number of slices whose tokens a throttled kernel may save up, compensating for oversleeping
+THROTTLE_BURST = 2
+# thread placements of --placement, in the order of their ids in mwg_place_threads()
+PLACEMENTS = ["compact", "scatter", "per-node"]
 
-def write_idle_kernel(args, generator: CodeGenerator, region_name: str):
-    args.instrumentation.start_region(generator, region_name=region_name)
-    generator.add_line(f"msleep({args.idlePhase});")
-    args.instrumentation.end_region(generator, region_name=region_name)
+
+def write_random_definitions(args, generator: CodeGenerator):
+    """
+    Defines a fast pseudo random number generator (xoshiro256**, seeded by splitmix64) with one state per thread, an
+    unbiased bounded sampler for 64-bit ranges and a (parallel) shuffle of index arrays
+    """
+    generator.include("stdint.h", sys=True)
+    if args.parallelize:
+        generator.include("omp.h", sys=True)
+    generator.add_definition("random", """typedef struct {
+    uint64_t s[4];
+} mwg_rng_t;
+
+uint64_t mwg_splitmix64(uint64_t* state) {
+    uint64_t z = (*state += 0x9E3779B97F4A7C15ULL);
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+    return z ^ (z >> 31);
+}
+
+void mwg_rng_seed(mwg_rng_t* rng, uint64_t seed) {
+    for (int i = 0; i < 4; i++) {
+        rng->s[i] = mwg_splitmix64(&seed);
+    }
+}
+
+static inline uint64_t mwg_rotl(uint64_t x, int k) {
+    return (x << k) | (x >> (64 - k));
+}
+
+static inline uint64_t mwg_rng_next(mwg_rng_t* rng) {
+    uint64_t* s = rng->s;
+    uint64_t result = mwg_rotl(s[1] * 5, 7) * 9;
+    uint64_t t = s[1] << 17;
+    s[2] ^= s[0];
+    s[3] ^= s[1];
+    s[1] ^= s[2];
+    s[0] ^= s[3];
+    s[2] ^= t;
+    s[3] = mwg_rotl(s[3], 45);
+    return result;
+}
+
+// uniform random number in [0, bound) without modulo bias (Lemire's multiply-shift method)
+static inline uint64_t mwg_rng_below(mwg_rng_t* rng, uint64_t bound) {
+    unsigned __int128 m = (unsigned __int128) mwg_rng_next(rng) * bound;
+    uint64_t low = (uint64_t) m;
+    if (low < bound) {
+        uint64_t threshold = -bound % bound;
+        while (low < threshold) {
+            m = (unsigned __int128) mwg_rng_next(rng) * bound;
+            low = (uint64_t) m;
+        }
+    }
+    return (uint64_t) (m >> 64);
+}
+
+// uniform random number in [0, 1)
+static inline double mwg_rng_uniform(mwg_rng_t* rng) {
+    return (mwg_rng_next(rng) >> 11) * 0x1.0p-53;
+}
+
+void mwg_shuffle(size_t n, size_t* a, uint64_t seed) {
+    mwg_rng_t rng;
+    mwg_rng_seed(&rng, seed);
+    for (size_t i = n - 1; i > 0; i--) {
+        size_t j = mwg_rng_below(&rng, i + 1);
+        size_t tmp = a[j];
+        a[j] = a[i];
+        a[i] = tmp;
+    }
+}
+""")
+    if args.parallelize:
+        generator.add_definition("parallel_shuffle", """// Parallel uniform shuffle (Sanders, 1998): every thread distributes its block to random buckets, then every
+// thread shuffles one bucket. The bucket of each element is drawn twice from the same stream (count and scatter)
+void mwg_parallel_shuffle(size_t n, size_t* a, uint64_t seed) {
+    int max_threads = omp_get_max_threads();
+    size_t* tmp = (size_t*) malloc(sizeof(size_t) * n);
+    size_t* offsets = (size_t*) calloc((size_t) max_threads * max_threads, sizeof(size_t));
+    size_t* bucket_start = (size_t*) calloc((size_t) max_threads + 1, sizeof(size_t));
+    #pragma omp parallel num_threads(max_threads)
+    {
+        int threads = omp_get_num_threads();
+        int t = omp_get_thread_num();
+        size_t begin = n / threads * t + (t < n % threads ? t : n % threads);
+        size_t end = begin + n / threads + (t < n % threads ? 1 : 0);
+        mwg_rng_t rng;
+        mwg_rng_seed(&rng, seed + 0x9E3779B97F4A7C15ULL * (t + 1));
+        for (size_t i = begin; i < end; i++) {
+            offsets[(size_t) t * threads + mwg_rng_below(&rng, threads)]++;
+        }
+        #pragma omp barrier
+        #pragma omp single
+        {
+            size_t position = 0;
+            for (int b = 0; b < threads; b++) {
+                bucket_start[b] = position;
+                for (int u = 0; u < threads; u++) {
+                    size_t count = offsets[(size_t) u * threads + b];
+                    offsets[(size_t) u * threads + b] = position;
+                    position += count;
+                }
+            }
+            bucket_start[threads] = position;
+        }
+        mwg_rng_seed(&rng, seed + 0x9E3779B97F4A7C15ULL * (t + 1));
+        for (size_t i = begin; i < end; i++) {
+            tmp[offsets[(size_t) t * threads + mwg_rng_below(&rng, threads)]++] = a[i];
+        }
+        #pragma omp barrier
+        mwg_rng_seed(&rng, ~seed + t);
+        size_t* bucket = tmp + bucket_start[t];
+        size_t bucket_size = bucket_start[t + 1] - bucket_start[t];
+        for (size_t i = bucket_size; i > 1; i--) {
+            size_t j = mwg_rng_below(&rng, i);
+            size_t swap = bucket[j];
+            bucket[j] = bucket[i - 1];
+            bucket[i - 1] = swap;
+        }
+        #pragma omp barrier
+        #pragma omp for schedule(static)
+        for (size_t i = 0; i < n; i++) {
+            a[i] = tmp[i];
+        }
+    }
+    free(bucket_start);
+    free(offsets);
+    free(tmp);
+}
+""")
+
+
+def write_distribution_definitions(args, generator: CodeGenerator):
+    """
+    Defines the sampler of the skewed --distribution used by write_random_indices(), nothing for uniform indices.
+    Zipf samples are drawn by rejection-inversion (Hoermann and Derflinger, 1996), an inverse-CDF method with constant
+    setup and expected time per sample, for any number of items. The ranks of both distributions are scattered over the
+    index range by a multiplicative bijection, so hot items do not share cache lines and pages. Requires
+    write_random_definitions()
+    """
+    if args.distribution == "uniform":
+        return
+    generator.include("math.h", sys=True)
+    generator.add_definition("distribution_scatter", """static uint64_t mwg_gcd(uint64_t a, uint64_t b) {
+    while (b != 0) {
+        uint64_t t = a % b;
+        a = b;
+        b = t;
+    }
+    return a;
+}
+
+// multiplier of the bijection k -> k * m mod n, which scatters consecutive ranks over [0, n)
+static uint64_t mwg_scatter_multiplier(uint64_t n) {
+    uint64_t m = (0x9E3779B97F4A7C15ULL % n) | 1;
+    while (n > 1 && mwg_gcd(m, n) != 1) {
+        m += 2;
+    }
+    return m;
+}
+
+static inline uint64_t mwg_scatter(uint64_t k, uint64_t m, uint64_t n) {
+    return (uint64_t) (((unsigned __int128) k * m) % n);
+}""")
+    if args.distribution == "zipf":
+        generator.add_definition("distribution", """typedef struct {
+    uint64_t n;
+    uint64_t multiplier;
+    double exponent;
+    double h_integral_x1;
+    double h_integral_n;
+    double s;
+} mwg_distribution_t;
+
+// log1p(x) / x and expm1(x) / x, accurate for small x
+static double mwg_zipf_helper1(double x) {
+    return fabs(x) > 1e-8 ? log1p(x) / x : 1.0 - x * (0.5 - x * (1.0 / 3.0 - 0.25 * x));
+}
+
+static double mwg_zipf_helper2(double x) {
+    return fabs(x) > 1e-8 ? expm1(x) / x : 1.0 + x * 0.5 * (1.0 + x / 3.0 * (1.0 + 0.25 * x));
+}
+
+static double mwg_zipf_h(const mwg_distribution_t* d, double x) {
+    return exp(-d->exponent * log(x));
+}
+
+static double mwg_zipf_h_integral(const mwg_distribution_t* d, double x) {
+    double log_x = log(x);
+    return mwg_zipf_helper2((1.0 - d->exponent) * log_x) * log_x;
+}
+
+static double mwg_zipf_h_integral_inverse(const mwg_distribution_t* d, double x) {
+    double t = x * (1.0 - d->exponent);
+    return exp(mwg_zipf_helper1(t < -1.0 ? -1.0 : t) * x);
+}
+
+// Zipf distribution over n items with the given exponent (--zipf-theta), i.e. P(rank k) ~ 1 / k^exponent
+void mwg_distribution_init(mwg_distribution_t* d, uint64_t n, double exponent) {
+    d->n = n;
+    d->multiplier = mwg_scatter_multiplier(n);
+    d->exponent = exponent;
+    d->h_integral_x1 = mwg_zipf_h_integral(d, 1.5) - 1.0;
+    d->h_integral_n = mwg_zipf_h_integral(d, n + 0.5);
+    d->s = 2.0 - mwg_zipf_h_integral_inverse(d, mwg_zipf_h_integral(d, 2.5) - mwg_zipf_h(d, 2.0));
+}
+
+static inline uint64_t mwg_distribution_sample(const mwg_distribution_t* d, mwg_rng_t* rng) {
+    while (1) {
+        double u = d->h_integral_n + mwg_rng_uniform(rng) * (d->h_integral_x1 - d->h_integral_n);
+        double x = mwg_zipf_h_integral_inverse(d, u);
+        uint64_t k = (uint64_t) (x + 0.5);
+        k = k < 1 ? 1 : (k > d->n ? d->n : k);
+        if (k - x <= d->s || u >= mwg_zipf_h_integral(d, k + 0.5) - mwg_zipf_h(d, k)) {
+            return mwg_scatter(k - 1, d->multiplier, d->n);
+        }
+    }
+}""")
+    elif args.distribution == "hotspot":
+        generator.add_definition("distribution", """typedef struct {
+    uint64_t n;
+    uint64_t multiplier;
+    uint64_t hot;
+    double hot_probability;
+} mwg_distribution_t;
+
+// hot_probability (--hot-probability) of the samples are uniform over the hot set of hot_fraction (--hot-fraction) of
+// the n items, the others are uniform over the remaining items
+void mwg_distribution_init(mwg_distribution_t* d, uint64_t n, double hot_fraction, double hot_probability) {
+    d->n = n;
+    d->multiplier = mwg_scatter_multiplier(n);
+    d->hot_probability = hot_probability;
+    d->hot = (uint64_t) (hot_fraction * n);
+    d->hot = d->hot < 1 ? 1 : (d->hot > n ? n : d->hot);
+}
+
+static inline uint64_t mwg_distribution_sample(const mwg_distribution_t* d, mwg_rng_t* rng) {
+    uint64_t k;
+    if (d->hot == d->n) {
+        k = mwg_rng_below(rng, d->n);
+    } else if (mwg_rng_uniform(rng) < d->hot_probability) {
+        k = mwg_rng_below(rng, d->hot);
+    } else {
+        k = d->hot + mwg_rng_below(rng, d->n - d->hot);
+    }
+    return mwg_scatter(k, d->multiplier, d->n);
+}""")
+
+
+def write_shuffle(args, generator: CodeGenerator, n: str, array: str, seed: int):
+    """
+    Writes a uniform random shuffle of an index array, in parallel if the workload is parallelized. Requires
+    write_random_definitions() in the definitions of the pattern
+    """
+    generator.add_line(f"{'mwg_parallel_shuffle' if args.parallelize else 'mwg_shuffle'}({n}, {array}, {seed});")
+
+
+def get_parameter(args, name: str) -> str:
+    """
+    Returns a C expression of a workload parameter, i.e. a literal of its value or, if --runtime-parameters is
+    enabled, the variable holding the value passed at runtime
+    :param args: parsed arguments
+    :param name: argument dest of the parameter (see RUNTIME_PARAMETERS)
+    :return: C expression
+    """
+    if args.runtimeParameters and name in RUNTIME_PARAMETERS:
+        return get_parameter_variable(name)
+    value = getattr(args, name)
+    return str(0 if value is None else value)
+
+
+def get_parameter_variable(name: str) -> str:
+    return "param_" + RUNTIME_PARAMETERS[name].replace("-", "_")
+
+
+def _write_runtime_parameters(args, generator: CodeGenerator):
+    for name, option in RUNTIME_PARAMETERS.items():
+        default = getattr(args, name)
+        default = 0 if default is None else default
+        generator.add_line(f"long {get_parameter_variable(name)} = mwg_parameter(argc, argv, \"{option}\", {default}L);")
+    if args.parallelize:
+        generator.add_line(f"if ({get_parameter_variable('threads')} > 0) {{")
+        generator.new_intended_block(lambda: generator.add_line(f"omp_set_num_threads({get_parameter_variable('threads')});"))
+        generator.add_line("}")
+    if not args.silent:
+        generator.add_print_statement(
+            "Parameters: " + ", ".join([f"{option}=%ld" for option in RUNTIME_PARAMETERS.values()]),
+            *[get_parameter_variable(name) for name in RUNTIME_PARAMETERS])
+
+
+def write_idle_kernel(args, generator: CodeGenerator, region_name: str, duration: int = None):
+    """
+    Writes an idle kernel sleeping for duration milliseconds, --idle-phase if None
+    """
+    args.instrumentation.start_region(args, generator, region_name=region_name)
+    generator.add_line(f"msleep({args.idlePhase if duration is None else duration});")
+    args.instrumentation.end_region(args, generator, region_name=region_name)
 
 
 def generate_code(args) -> dict:
     output = {}
-    includes = ["<time.h>", "<errno.h>", "<stdio.h>", "<unistd.h>"]  # default imports
+    includes = ["<time.h>", "<errno.h>", "<stdio.h>", "<stdlib.h>", "<string.h>", "<unistd.h>"]  # default imports
 
     header_generator = CodeGenerator(includes=includes)
-    args.pattern.write_definitions(args, header_generator)
+    for kernel_args in get_distinct_kernel_args(args, lambda a: a.allocator):
+        kernel_args.allocator.write_definitions(kernel_args, header_generator)
+    args.instrumentation.write_definitions(args, header_generator)
+    for kernel_args in get_distinct_kernel_args(args, lambda a: a.pattern):
+        kernel_args.pattern.write_definitions(kernel_args, header_generator)
+    for kernel_args in get_kernel_args(args):
+        if _is_sampled(kernel_args):
+            write_timeline_definitions(kernel_args, header_generator)
+        if _is_throttled(kernel_args):
+            write_throttle_definitions(kernel_args, header_generator)
+    write_placement_definitions(args, header_generator)
     output["HEADER"] = header_generator.get_code()
 
     init_generator = CodeGenerator(includes=includes)
@@ -20,7 +339,10 @@ def generate_code(args) -> dict:
     output["BODY_initialization"] = init_generator.get_code()
 
     body_generator = CodeGenerator(includes=includes)
-    _write_main_body(args, generator=body_generator)
+    if args.phases is None:
+        _write_main_body(args, generator=body_generator)
+    else:
+        _write_phases(args, generator=body_generator)
     output["BODY_kernel"] = body_generator.get_code()
 
     finalization_generator = CodeGenerator(includes=includes)
@@ -31,12 +353,191 @@ def generate_code(args) -> dict:
     return output
 
 
+def get_kernel_args(args) -> list:
+    """
+    Returns the arguments of every kernel of the workload, i.e. of all phases of --spec or the arguments themselves
+    """
+    return [args] if args.phases is None else [phase.args for phase in args.phases]
+
+
+def get_distinct_kernel_args(args, component) -> list:
+    """
+    Returns the arguments of the first kernel using each distinct component, whose definitions are only written once
+    :param component: function returning the component of the arguments of a kernel, e.g. its pattern or allocator
+    """
+    distinct = {}
+    for kernel_args in get_kernel_args(args):
+        distinct.setdefault(repr(component(kernel_args)), kernel_args)
+    return list(distinct.values())
+
+
+def write_conditional_block(generator: CodeGenerator, condition: str, writer):
+    """
+    Writes an if block whose body is generated by writer, omitting the block if writer does not generate any code
+    :param generator: target generator
+    :param condition: C condition of the if statement
+    :param writer: function taking a generator and writing the body
+    """
+    body_generator = CodeGenerator(includes=generator.includes, ident_level=generator.indent_level + generator.indention_step_spaces)
+    writer(body_generator)
+    body = body_generator.get_code()
+    if body == "":
+        return
+    generator.add_line(f"if ({condition}) {{")
+    generator.add_code(body)
+    generator.add_line("}")
+
+
+def write_random_indices(args, generator: CodeGenerator, array: str, count: str, bound: str, seed: int):
+    """
+    Fills an index array with random indices in [0, bound) of --distribution using one random number generator per
+    thread. Skewed distributions require write_distribution_definitions()
+    """
+    skewed = args.distribution != "uniform"
+    if skewed:
+        generator.add_line("mwg_distribution_t distribution;")
+        parameters = [args.zipfTheta] if args.distribution == "zipf" else [args.hotFraction, args.hotProbability]
+        generator.add_line(f"mwg_distribution_init(&distribution, {bound}, {', '.join(str(p) for p in parameters)});")
+    if args.parallelize:
+        generator.add_line("#pragma omp parallel")
+        generator.add_line("{")
+        generator.start_indent()
+        generator.add_line("mwg_rng_t rng;")
+        generator.add_line(f"mwg_rng_seed(&rng, {seed} + omp_get_thread_num());")
+        generator.add_line("#pragma omp for schedule(static)")
+    else:
+        generator.add_line("{")
+        generator.start_indent()
+        generator.add_line("mwg_rng_t rng;")
+        generator.add_line(f"mwg_rng_seed(&rng, {seed});")
+    generator.add_line(f"for (size_t i = 0; i < {count}; i++) {{")
+    sample = "mwg_distribution_sample(&distribution, &rng)" if skewed else f"mwg_rng_below(&rng, {bound})"
+    generator.new_intended_block(lambda: generator.add_line(f"{array}[i] = {sample};"))
+    generator.add_line("}")
+    generator.close_indent()
+    generator.add_line("}")
+
+
+def write_memory_hint_definitions(args, generator: CodeGenerator):
+    """
+    Defines software prefetch macros taking the locality (see PREFETCH_HINTS) and mwg_stream(), a non-temporal store of
+    a single element that bypasses the caches and therefore avoids write-allocate traffic. Non-temporal stores are
+    weakly ordered and have to be completed by mwg_stream_fence(). Nothing is written unless --nt-stores or
+    --prefetch-distance is set
+    """
+    if not args.ntStores and args.prefetchDistance == 0:
+        return
+    stream_store = {
+        "double": """long long bits;
+    memcpy(&bits, &value, sizeof(bits));
+    _mm_stream_si64((long long*) address, bits);""",
+        "float": """int bits;
+    memcpy(&bits, &value, sizeof(bits));
+    _mm_stream_si32((int*) address, bits);""",
+        "int": "_mm_stream_si32(address, value);"
+    }[args.dataType]
+    generator.add_definition("memory_hints", f"""#define MWG_PREFETCH(address, locality) __builtin_prefetch((address), 0, (locality))
+#define MWG_PREFETCHW(address, locality) __builtin_prefetch((address), 1, (locality))
+#if defined(__x86_64__)
+#include <immintrin.h>
+#define mwg_stream_fence() _mm_sfence()
+#else
+#define mwg_stream_fence() __atomic_thread_fence(__ATOMIC_SEQ_CST)
+#endif
+
+static inline void mwg_stream({args.dataType}* address, {args.dataType} value) {{
+#if defined(__x86_64__)
+    {stream_store}
+#elif defined(__clang__)
+    __builtin_nontemporal_store(value, address);
+#else
+    *address = value;
+#endif
+}}""")
+
+
+def get_store_statement(args, target: str, value: str) -> str:
+    """
+    Returns a C statement assigning value to target, using a non-temporal store if --nt-stores is set
+    :param target: lvalue of the data type, e.g. 'B[i]'
+    """
+    if args.ntStores:
+        return f"mwg_stream(&{target}, {value});"
+    return f"{target} = {value};"
+
+
+def write_prefetch(args, generator: CodeGenerator, array: str, index: str, elements: str = "1", write: bool = False):
+    """
+    Writes software prefetches of all cache lines holding `elements` elements of array starting at index, with the
+    locality of --prefetch-hint
+    :param elements: C expression of the number of elements
+    :param write: whether the elements are about to be written (prefetch with intent to write)
+    """
+    macro = "MWG_PREFETCHW" if write else "MWG_PREFETCH"
+    locality = PREFETCH_HINTS[args.prefetchHint]
+    if elements == "1":
+        generator.add_line(f"{macro}(&{array}[{index}], {locality});")
+        return
+    generator.add_line(f"for (long p = 0; p < {elements}; p += {CACHE_LINE_SIZE} / sizeof(*{array})) {{")
+    generator.new_intended_block(lambda: generator.add_line(f"{macro}(&{array}[{index} + p], {locality});"))
+    generator.add_line("}")
+
+
+def write_parallel_for(args, generator: CodeGenerator, writer, parallel_clauses: str = "", for_clauses: str = "",
+                       fence: bool = False):
+    """
+    Writes a loop that is work-shared among OpenMP threads if --parallelize is set. If fence is set, every thread
+    completes its non-temporal stores after the loop
+    :param writer: function writing the loop
+    :param parallel_clauses: clauses of the parallel region, e.g. ' firstprivate(A)'
+    :param for_clauses: clauses of the work-sharing loop, e.g. ' lastprivate(temp)'
+    """
+    if _is_placed(args):
+        for_clauses += " schedule(static)"  # the schedule of the first touch, see write_array_initialization()
+    if not args.parallelize:
+        writer()
+        if fence:
+            generator.add_line("mwg_stream_fence();")
+    elif not fence:
+        generator.add_line(f"#pragma omp parallel for{parallel_clauses}{for_clauses}")
+        writer()
+    else:
+        generator.add_line(f"#pragma omp parallel{parallel_clauses}")
+        generator.add_line("{")
+        generator.start_indent()
+        generator.add_line(f"#pragma omp for{for_clauses}")
+        writer()
+        generator.add_line("mwg_stream_fence();")
+        generator.close_indent()
+        generator.add_line("}")
+
+
 def write_array_initialization(args, generator, pointer_name: str, element_count: str, value: str):
-    if args.parallelize and args.firstTouch:
+    if args.allocator.reuses(pointer_name):
+        return  # keep the content written by earlier phases
+    bind = _is_placed(args) and args.placement == "per-node"
+    if bind:
+        # the partitions are bound before the first touch, which may be disabled
+        generator.add_line("#pragma omp parallel")
+        generator.add_line("{")
+        generator.start_indent()
+        generator.add_line(f"mwg_bind_partition({pointer_name}, sizeof(*{pointer_name}) * ({element_count}), omp_get_thread_num(), omp_get_num_threads());")
+        if args.firstTouch:
+            generator.add_line("#pragma omp for schedule(static)")
+        else:
+            generator.add_line("#pragma omp barrier")
+            generator.add_line("#pragma omp master")
+    elif _is_placed(args) and args.firstTouch:
+        # every thread touches the partition it accesses in the kernels, which use the same static schedule
+        generator.add_line("#pragma omp parallel for schedule(static)")
+    elif args.parallelize and args.firstTouch:
         generator.add_line("#pragma omp parallel for")
-    generator.add_line(f"for (int i = 0; i < {element_count}; i++) {{")
+    generator.add_line(f"for (long i = 0; i < {element_count}; i++) {{")
     generator.new_intended_block(lambda: generator.add_line(f"{pointer_name}[i] = {value};"))
     generator.add_line("}")
+    if bind:
+        generator.close_indent()
+        generator.add_line("}")
     if not args.silent:
         generator.add_print_statement(f"Initialization of {pointer_name} completed")
 
@@ -44,42 +545,540 @@ def write_array_initialization(args, generator, pointer_name: str, element_count
 def _write_initialization(args, generator):
     if args.parallelize:
         generator.include("omp.h", sys=True)
+    if args.runtimeParameters:
+        _write_runtime_parameters(args, generator)
+    if args.parallelize:
         generator.add_line("printf(\"Using OpenMP parallel implementation with %d threads\\n\", omp_get_max_threads());")
+    write_thread_placement(args, generator)
     if not args.silent:
         generator.include("stdio.h", sys=True)
 
-    args.allocator.initialize(args, generator)
-    args.instrumentation.initialize(generator)
+    for kernel_args in get_distinct_kernel_args(args, lambda a: a.allocator):
+        kernel_args.allocator.initialize(kernel_args, generator)
+    args.instrumentation.initialize(args, generator)
 
     if args.idlePhase > 0:
         write_idle_kernel(args, generator=generator, region_name="idle_start")
-    args.pattern.write_header(args, generator)
+    if args.phases is None:
+        args.pattern.write_header(args, generator)
+    else:
+        workload_spec.write_shared_buffer_declarations(args.phases, generator)
+
+
+def get_bytes_per_iteration(args, pattern=None) -> str:
+    """
+    Returns a C expression of the number of bytes moved by one iteration of the kernel loop of a pattern
+    :param pattern: access pattern, the selected pattern if None
+    """
+    pattern = args.pattern if pattern is None else pattern
+    return " + ".join([t.get_bytes(args.writeAllocate) for t in pattern.get_traffic(args)])
+
+
+def get_bytes_moved(args) -> str:
+    """
+    Returns a C expression of the number of bytes moved by the kernel of the selected pattern
+    """
+    return f"(double) ({args.pattern.get_iterations(args)}) * ({get_bytes_per_iteration(args)})"
+
+
+def _is_sampled(args) -> bool:
+    return args.sampleInterval > 0 and args.pattern.measures_bandwidth and args.pattern.supports_slices
+
+
+def _is_throttled(args) -> bool:
+    return args.targetBandwidth > 0 and args.pattern.measures_bandwidth and args.pattern.supports_slices
+
+
+def _is_sliced(args) -> bool:
+    return _is_sampled(args) or _is_throttled(args)
+
+
+def write_slice_definitions(args, generator: CodeGenerator):
+    """
+    Defines mwg_next_slice(), which sizes the slices of a kernel executed in parts (see AccessPattern.write_body())
+    """
+    generator.add_definition("slices", """// number of iterations of the next slice, such that it takes about interval seconds at the rate of the last slice
+long mwg_next_slice(long slice, long done, double elapsed, double interval, long limit) {
+    double next = elapsed > 0.0 ? interval * done / elapsed : 4.0 * slice;
+    next = next > 4.0 * slice ? 4.0 * slice : next;  // grow slowly, the first slices are dominated by overheads
+    return next < 1.0 ? 1 : (next > limit ? limit : (long) next);
+}""")
+
+
+def write_timeline_definitions(args, generator: CodeGenerator):
+    """
+    Defines the timeline of --sample-interval: samples of the elapsed time, the bytes moved and the counters of the
+    instrumentation are collected in memory and written as CSV after the kernel
+    """
+    write_slice_definitions(args, generator)
+    generator.add_definition("timeline", """typedef struct {
+    size_t count;
+    size_t capacity;
+    int counters;
+    double* rows;  // time, repetition, bytes moved and counter values of each sample, the first row is the baseline
+} mwg_timeline_t;
+
+void mwg_timeline_add(mwg_timeline_t* timeline, double time, int repetition, double bytes, const double* counters) {
+    size_t width = 3 + timeline->counters;
+    if (timeline->count == timeline->capacity) {
+        timeline->capacity = timeline->capacity == 0 ? 1024 : 2 * timeline->capacity;
+        timeline->rows = (double*) realloc(timeline->rows, sizeof(double) * width * timeline->capacity);
+    }
+    double* row = timeline->rows + timeline->count++ * width;
+    row[0] = time;
+    row[1] = repetition;
+    row[2] = bytes;
+    for (int c = 0; c < timeline->counters; c++) {
+        row[3 + c] = counters[c];
+    }
+}
+
+// writes one line per sample with the bandwidth and counter increments since the previous sample. The name of the
+// phase of a workload specification, if any, is appended to the file name
+void mwg_timeline_write(mwg_timeline_t* timeline, const char* path, const char* phase, const char** names, int warmup, int silent) {
+    if (getenv("MWG_TIMELINE") != NULL) {
+        path = getenv("MWG_TIMELINE");
+    }
+    char phase_path[4096];
+    if (phase != NULL) {
+        const char* extension = strrchr(path, '.');
+        extension = extension == NULL || strchr(extension, '/') != NULL ? path + strlen(path) : extension;
+        snprintf(phase_path, sizeof(phase_path), "%.*s-%s%s", (int) (extension - path), path, phase, extension);
+        path = phase_path;
+    }
+    FILE* file = fopen(path, "w");
+    if (file == NULL) {
+        printf("warning: Failed to write timeline to '%s' (%s)\\n", path, strerror(errno));
+        free(timeline->rows);
+        return;
+    }
+    fprintf(file, "time,interval,repetition,timed,bytes,bandwidth");
+    for (int c = 0; c < timeline->counters; c++) {
+        fprintf(file, ",%s", names[c]);
+    }
+    fprintf(file, "\\n");
+    size_t width = 3 + timeline->counters;
+    for (size_t i = 1; i < timeline->count; i++) {
+        const double* row = timeline->rows + i * width;
+        const double* previous = row - width;
+        double interval = row[0] - previous[0];
+        double bytes = row[2] - previous[2];
+        fprintf(file, "%.6f,%.6f,%d,%d,%.0f,%.6f", row[0], interval, (int) row[1], (int) row[1] >= warmup, row[2],
+                interval > 0.0 ? bytes / interval * 1e-9 : 0.0);
+        for (int c = 0; c < timeline->counters; c++) {
+            fprintf(file, ",%.0f", row[3 + c] - previous[3 + c]);
+        }
+        fprintf(file, "\\n");
+    }
+    fclose(file);
+    if (!silent) {
+        printf("Timeline of %zu samples has been written to '%s'\\n", timeline->count - 1, path);
+    }
+    printf("[metric] timeline.samples = %zu\\n", timeline->count - 1);
+    free(timeline->rows);
+}""")
+
+
+def _is_placed(args) -> bool:
+    # patterns without a traffic model (latency, loaded-latency) manage their threads themselves
+    return args.parallelize and args.placement is not None and (args.phases is not None or args.pattern.measures_bandwidth)
+
+
+def write_placement_definitions(args, generator: CodeGenerator):
+    """
+    Defines the thread placement of --placement. The NUMA node of each CPU is read from sysfs at runtime, so the
+    workload needs no NUMA library. Threads are pinned to CPUs of the affinity mask the process started with (e.g.
+    restricted by --cpunodebind), per-node additionally binds the static partition of each thread to its node
+    """
+    if args.placement is not None and not args.parallelize:
+        print("warning: --placement is ignored without --parallelize")
+    elif args.placement is not None and not _is_placed(args):
+        print(f"warning: --placement is not supported by pattern {args.pattern} and will be ignored")
+    if not _is_placed(args):
+        return
+    generator.include("sched.h", sys=True)
+    generator.include("dirent.h", sys=True)
+    generator.include("stdint.h", sys=True)
+    generator.include("omp.h", sys=True)
+    generator.add_definition("placement", """static int mwg_thread_cpus[CPU_SETSIZE];
+static int mwg_thread_nodes[CPU_SETSIZE];
+
+// returns the NUMA node of a CPU from the node<n> link in its sysfs directory, 0 without NUMA support
+static int mwg_cpu_node(int cpu) {
+    char path[64];
+    snprintf(path, sizeof(path), "/sys/devices/system/cpu/cpu%d", cpu);
+    DIR* dir = opendir(path);
+    int node = 0;
+    if (dir == NULL) {
+        return node;
+    }
+    struct dirent* entry;
+    while ((entry = readdir(dir)) != NULL) {
+        if (strncmp(entry->d_name, "node", 4) == 0 && entry->d_name[4] >= '0' && entry->d_name[4] <= '9') {
+            node = atoi(entry->d_name + 4);
+            break;
+        }
+    }
+    closedir(dir);
+    return node;
+}
+
+// pins OpenMP thread t to a CPU of the initial affinity mask, placement is the index of --placement: compact (0) fills
+// the nodes one after another, scatter (1) assigns consecutive threads round-robin to the nodes and per-node (2) splits
+// the threads into equal groups of consecutive threads, one per node
+static void mwg_place_threads(int placement, int silent) {
+    static cpu_set_t allowed;  // affinity before the first placement, which restricts the calling thread to one CPU
+    static int initialized = 0;
+    if (!initialized) {
+        sched_getaffinity(0, sizeof(allowed), &allowed);
+        initialized = 1;
+    }
+    static int cpus[CPU_SETSIZE];
+    static int nodes[CPU_SETSIZE];
+    int count = 0;
+    for (int cpu = 0; cpu < CPU_SETSIZE; cpu++) {
+        if (CPU_ISSET(cpu, &allowed)) {
+            // insert ordered by node and CPU
+            int node = mwg_cpu_node(cpu);
+            int i = count++;
+            for (; i > 0 && nodes[i - 1] > node; i--) {
+                cpus[i] = cpus[i - 1];
+                nodes[i] = nodes[i - 1];
+            }
+            cpus[i] = cpu;
+            nodes[i] = node;
+        }
+    }
+    // CPUs of the k-th node are cpus[node_first[k]..node_first[k] + node_count[k])
+    static int node_first[CPU_SETSIZE];
+    static int node_count[CPU_SETSIZE];
+    int node_total = 0;
+    for (int i = 0; i < count; i++) {
+        if (i == 0 || nodes[i] != nodes[i - 1]) {
+            node_first[node_total] = i;
+            node_count[node_total++] = 0;
+        }
+        node_count[node_total - 1]++;
+    }
+    int threads = omp_get_max_threads();
+    for (int t = 0; t < threads && t < CPU_SETSIZE; t++) {
+        int index = t % count;
+        if (placement == 1) {
+            int k = t % node_total;
+            index = node_first[k] + (t / node_total) % node_count[k];
+        } else if (placement == 2) {
+            int k = (int) ((long) t * node_total / threads);
+            int first = (int) (((long) k * threads + node_total - 1) / node_total);
+            index = node_first[k] + (t - first) % node_count[k];
+        }
+        mwg_thread_cpus[t] = cpus[index];
+        mwg_thread_nodes[t] = nodes[index];
+    }
+    #pragma omp parallel
+    {
+        int t = omp_get_thread_num();
+        if (t < CPU_SETSIZE) {
+            cpu_set_t mask;
+            CPU_ZERO(&mask);
+            CPU_SET(mwg_thread_cpus[t], &mask);
+            if (sched_setaffinity(0, sizeof(mask), &mask) != 0) {
+                printf("warning: failed to pin thread %d to CPU %d: %s\\n", t, mwg_thread_cpus[t], strerror(errno));
+            }
+        }
+    }
+    if (!silent) {
+        printf("Thread placement (thread:CPU/node):");
+        for (int t = 0; t < threads && t < CPU_SETSIZE; t++) {
+            printf(" %d:%d/%d", t, mwg_thread_cpus[t], mwg_thread_nodes[t]);
+        }
+        printf("\\n");
+    }
+}""")
+    if args.placement == "per-node":
+        generator.include("sys/syscall.h", sys=True)
+        generator.add_definition("placement_binding", """#ifndef MPOL_BIND
+#define MPOL_BIND 2
+#endif
+#ifndef MPOL_MF_MOVE
+#define MPOL_MF_MOVE (1 << 1)
+#endif
+
+// binds the pages of the static partition of thread t of a buffer to the node the thread is pinned to. Pages the
+// partition covers only partially stay unbound: they are shared with the neighboring partition or, at the ends of the
+// buffer, with other allocations
+static void mwg_bind_partition(void* buffer, size_t bytes, int t, int threads) {
+    static int failed = 0;
+    uintptr_t page = (uintptr_t) sysconf(_SC_PAGESIZE);
+    uintptr_t begin = ((uintptr_t) buffer + bytes * t / threads + page - 1) / page * page;
+    uintptr_t end = ((uintptr_t) buffer + bytes * (t + 1) / threads) / page * page;
+    if (t >= CPU_SETSIZE || end <= begin) {
+        return;
+    }
+    unsigned long mask[CPU_SETSIZE / (8 * sizeof(unsigned long))] = {0};
+    int node = mwg_thread_nodes[t];
+    mask[node / (8 * sizeof(unsigned long))] |= 1UL << (node % (8 * sizeof(unsigned long)));
+    if (syscall(SYS_mbind, (void*) begin, end - begin, MPOL_BIND, mask, (unsigned long) CPU_SETSIZE, MPOL_MF_MOVE) != 0 && !failed) {
+        failed = 1;
+        printf("warning: failed to bind buffer partitions to NUMA nodes: %s\\n", strerror(errno));
+    }
+}""")
+
+
+def write_thread_placement(args, generator: CodeGenerator):
+    """
+    Pins the threads of the next parallel regions (see write_placement_definitions()), must follow every change of the
+    thread count
+    """
+    if _is_placed(args):
+        generator.add_line(f"mwg_place_threads({PLACEMENTS.index(args.placement)}, {int(args.silent)});")
 
 
-def _write_main_body(args, generator):
-    args.instrumentation.start_region(generator, region_name="main")
+def write_throttle_definitions(args, generator: CodeGenerator):
+    """
+    Defines a token bucket limiting the average bandwidth of the kernel (--target-bandwidth). Tokens are bytes that
+    accumulate at the target rate up to the traffic of THROTTLE_BURST slices, every slice waits for the tokens of its traffic
+    """
+    generator.add_definition("throttle", """typedef struct {
+    double rate;  // bytes per second
+    double burst;
+    double tokens;
+    double last;
+} mwg_throttle_t;
+
+void mwg_throttle(mwg_throttle_t* bucket, double bytes) {
+    double now = mwg_time();
+    bucket->tokens += (now - bucket->last) * bucket->rate;
+    bucket->tokens = bucket->tokens > bucket->burst ? bucket->burst : bucket->tokens;
+    bucket->last = now;
+    if (bucket->tokens < bytes) {
+        double wait = (bytes - bucket->tokens) / bucket->rate;
+        struct timespec duration;
+        duration.tv_sec = (time_t) wait;
+        duration.tv_nsec = (long) ((wait - (double) duration.tv_sec) * 1e9);
+        nanosleep(&duration, NULL);
+        now = mwg_time();
+        bucket->tokens += (now - bucket->last) * bucket->rate;
+        bucket->last = now;
+    }
+    bucket->tokens -= bytes;
+}
+
+// number of iterations moving the bytes of one period at the given rate
+long mwg_throttle_slice(double rate, double period, double bytes_per_iteration, long limit) {
+    double iterations = rate * period / bytes_per_iteration;
+    return iterations < 1.0 ? 1 : (iterations > limit ? limit : (long) iterations);
+}""")
+
+
+def _write_slice_setup(args, generator: CodeGenerator):
+    generator.add_line(f"long kernel_iterations = {args.pattern.get_iterations(args)};")
+    if _is_throttled(args):
+        rate = args.targetBandwidth * 1e9
+        generator.add_line(f"long slice_iterations = mwg_throttle_slice({rate}, {THROTTLE_PERIOD}, {get_bytes_per_iteration(args)}, kernel_iterations);")
+        generator.add_line(f"mwg_throttle_t throttle = {{{rate}, {THROTTLE_BURST} * slice_iterations * ({get_bytes_per_iteration(args)}), 0.0, mwg_time()}};")
+    else:
+        generator.add_line("long slice_iterations = 1;")
+    if _is_sampled(args):
+        counters = args.instrumentation.get_timeline_counters(args)
+        generator.add_line(f"const char* timeline_counters[] = {{{', '.join([f'{chr(34)}{c}{chr(34)}' for c in counters] + ['NULL'])}}};")
+        generator.add_line(f"double sample_counters[{len(counters) + 1}] = {{0}};")
+        generator.add_line(f"mwg_timeline_t timeline = {{0, 0, {len(counters)}, NULL}};")
+        generator.add_line("double sample_bytes = 0.0;")
+        args.instrumentation.write_timeline_counters(args, generator, "sample_counters")
+        generator.add_line("double timeline_start = mwg_time();")
+        if _is_throttled(args):
+            generator.add_line("double sample_last = 0.0;")
+        generator.add_line("mwg_timeline_add(&timeline, 0.0, 0, 0.0, sample_counters);")
+
+
+def _write_sample(args, generator: CodeGenerator, region: str):
+    warmup = get_parameter(args, "warmup")
+    write_conditional_block(generator, f"repetition >= {warmup}",
+                            lambda g: args.instrumentation.read_region(args, g, region_name=region))
+    args.instrumentation.write_timeline_counters(args, generator, "sample_counters")
+    generator.add_line("mwg_timeline_add(&timeline, sample_time - timeline_start, repetition, sample_bytes, sample_counters);")
+    if _is_throttled(args):
+        generator.add_line("sample_last = sample_time - timeline_start;")
+
+
+def _write_sliced_kernel(args, generator: CodeGenerator, region: str):
+    """
+    Writes the kernel as a sequence of slices. With --sample-interval, a sample of the timeline is taken after each
+    slice and the slices are sized to take about the sample interval. With --target-bandwidth, every slice moves the
+    bytes of one throttle period and waits for the tokens of its traffic before it starts, samples are then only taken
+    once the sample interval has passed
+    """
+    bytes_per_iteration = get_bytes_per_iteration(args)
+    interval = args.sampleInterval * 1e-3
+    generator.add_line("for (long slice_begin = 0; slice_begin < kernel_iterations;) {")
+    generator.start_indent()
+    generator.add_line("long slice_end = slice_iterations < kernel_iterations - slice_begin ? slice_begin + slice_iterations : kernel_iterations;")
+    if _is_throttled(args):
+        generator.add_line(f"mwg_throttle(&throttle, (double) (slice_end - slice_begin) * ({bytes_per_iteration}));")
+    if _is_sampled(args) and not _is_throttled(args):
+        generator.add_line("double slice_time = mwg_time();")
+    args.pattern.write_body(args=args, generator=generator, begin="slice_begin", end="slice_end")
+    if _is_sampled(args):
+        generator.add_line("double sample_time = mwg_time();")
+        generator.add_line(f"sample_bytes += (double) (slice_end - slice_begin) * ({bytes_per_iteration});")
+        if _is_throttled(args):
+            generator.add_line(f"if (sample_time - timeline_start - sample_last >= {interval}) {{")
+            generator.new_intended_block(lambda: _write_sample(args, generator, region))
+            generator.add_line("}")
+        else:
+            _write_sample(args, generator, region)
+            generator.add_line(f"slice_iterations = mwg_next_slice(slice_iterations, slice_end - slice_begin, sample_time - slice_time, {interval}, kernel_iterations);")
+    generator.add_line("slice_begin = slice_end;")
+    generator.close_indent()
+    generator.add_line("}")
+
+
+def _write_main_body(args, generator, region: str = "main"):
+    """
+    Writes the timed repetitions of the kernel, reported as instrumentation region and metrics named region
+    """
+    if args.sampleInterval > 0 and not _is_sampled(args):
+        print(f"warning: --sample-interval is not supported by pattern {args.pattern} and will be ignored")
+    if args.targetBandwidth > 0 and not _is_throttled(args):
+        print(f"warning: --target-bandwidth is not supported by pattern {args.pattern} and will be ignored")
+    if not args.pattern.measures_bandwidth:
+        if args.duration > 0:
+            print(f"warning: --duration is not supported by pattern {args.pattern} and will be ignored")
+        _write_unmeasured_body(args, generator)
+        return
+    repetitions = get_parameter(args, "repetitions")
+    warmup = get_parameter(args, "warmup")
+    # with --duration, the number of timed repetitions is only known at runtime
+    timed_repetitions = "timed_repetitions" if args.duration > 0 else repetitions
     generator.add_line("double result = 0.0;")
     if args.wallTimeMeasure:
-        if args.parallelize:
-            generator.add_line("double begin = omp_get_wtime();")
+        if args.duration > 0:
+            generator.add_line(f"int times_capacity = {repetitions};")
+            generator.add_line("double* times = (double*) malloc(sizeof(double) * times_capacity);")
         else:
-            generator.include("time.h", sys=True)
-            generator.add_line("time_t begin = time(NULL);")
+            generator.add_line(f"double times[{repetitions}];")
+    if _is_sliced(args):
+        _write_slice_setup(args, generator)
+    if args.duration > 0:
+        generator.add_line("int timed_repetitions = 0;")
+        generator.add_line("double deadline = 0.0;")
+        generator.add_line(f"for (int repetition = 0; repetition < {warmup} + {repetitions} || mwg_time() < deadline; repetition++) {{")
+    else:
+        generator.add_line(f"for (int repetition = 0; repetition < {warmup} + {repetitions}; repetition++) {{")
+    generator.start_indent()
+    write_conditional_block(generator, f"repetition == {warmup}",
+                            lambda g: args.instrumentation.start_region(args, g, region_name=region))
+    if args.duration > 0:
+        generator.add_line(f"if (repetition == {warmup}) {{")
+        generator.new_intended_block(lambda: generator.add_line(f"deadline = mwg_time() + {args.duration};"))
+        generator.add_line("}")
+    if args.wallTimeMeasure:
+        generator.add_line("double begin = mwg_time();")
 
-    args.pattern.write_body(args=args, generator=generator)
+    if _is_sliced(args):
+        _write_sliced_kernel(args, generator, region)
+    else:
+        args.pattern.write_body(args=args, generator=generator)
 
     if args.wallTimeMeasure:
-        generator.add_line("double time_spent = omp_get_wtime() - begin;" if args.parallelize else "double time_spent = (double)(time(NULL) - begin);")
-    args.instrumentation.end_region(generator, region_name="main")
+        generator.add_line("double elapsed = mwg_time() - begin;")
+        generator.add_line(f"if (repetition >= {warmup}) {{")
+        generator.start_indent()
+        if args.duration > 0:
+            generator.add_line("if (timed_repetitions == times_capacity) {")
+            generator.start_indent()
+            generator.add_line("times_capacity *= 2;")
+            generator.add_line("times = (double*) realloc(times, sizeof(double) * times_capacity);")
+            generator.close_indent()
+            generator.add_line("}")
+            generator.add_line("times[timed_repetitions++] = elapsed;")
+        else:
+            generator.add_line(f"times[repetition - {warmup}] = elapsed;")
+        generator.close_indent()
+        generator.add_line("}")
+    elif args.duration > 0:
+        generator.add_line(f"if (repetition >= {warmup}) {{")
+        generator.new_intended_block(lambda: generator.add_line("timed_repetitions++;"))
+        generator.add_line("}")
+    generator.close_indent()
+    generator.add_line("}")
+    args.instrumentation.end_region(args, generator, region_name=region)
+    if _is_sampled(args):
+        phase = "NULL" if args.spec is None else f"\"{region}\""
+        generator.add_line(f"mwg_timeline_write(&timeline, \"{args.timeline}\", {phase}, timeline_counters, {warmup}, {int(args.silent)});")
+    if args.wallTimeMeasure:
+        generator.add_line("double time_spent = 0.0;")
+        generator.add_line(f"for (int repetition = 0; repetition < {timed_repetitions}; repetition++) {{")
+        generator.new_intended_block(lambda: generator.add_line("time_spent += times[repetition];"))
+        generator.add_line("}")
+        if not args.silent:
+            generator.add_line("printf(\"Computation took: %.9fs\\n\", time_spent);")
+        generator.add_line(f"double bytes_moved = {get_bytes_moved(args)};")
+        generator.add_line(f"mwg_report_statistics(\"{region}\", times, {timed_repetitions}, bytes_moved, {int(args.silent)});")
+        accesses = args.pattern.get_accesses(args)
+        if accesses is not None:
+            generator.add_metric_statement(f"{region}.accesses_per_second", "%.0f",
+                                           f"(double) ({accesses}) * {timed_repetitions} / time_spent")
+        if args.duration > 0:
+            generator.add_line("free(times);")
+    elif args.duration > 0:
+        generator.add_metric_statement(f"{region}.repetitions", "%d", "timed_repetitions")
+    if _is_throttled(args):
+        generator.add_metric_statement(f"{region}.target_bandwidth", "%.6f", str(args.targetBandwidth))
+    generator.add_print_statement("Result: %f", "result")
+    if not args.silent:
+        generator.add_print_statement("Workload has been completed. Cleaning up...")
+
+
+def _write_unmeasured_body(args, generator):
+    # patterns without a traffic model time and repeat their kernels themselves
+    generator.add_line("double result = 0.0;")
+    args.instrumentation.start_region(args, generator, region_name="main")
+    if args.wallTimeMeasure:
+        generator.add_line("double begin = mwg_time();")
+    args.pattern.write_body(args=args, generator=generator)
+    if args.wallTimeMeasure:
+        generator.add_line("double time_spent = mwg_time() - begin;")
+    args.instrumentation.end_region(args, generator, region_name="main")
     if args.wallTimeMeasure and not args.silent:
-        generator.add_line("printf(\"Computation took: %.3fs\\n\", time_spent);")
+        generator.add_line("printf(\"Computation took: %.9fs\\n\", time_spent);")
     generator.add_print_statement("Result: %f", "result")
     if not args.silent:
         generator.add_print_statement("Workload has been completed. Cleaning up...")
 
 
+def _write_phases(args, generator):
+    """
+    Writes the phases of --spec one after another, each in a block of its own with its buffers, repetitions, timing and
+    instrumentation region, followed by its idle gap
+    """
+    # the thread count of phases without one is restored to the default of the workload
+    set_threads = args.parallelize and any(phase.args.threads != args.threads for phase in args.phases)
+    if set_threads:
+        generator.add_line("int default_threads = omp_get_max_threads();")
+    for phase in args.phases:
+        generator.add_line(f"// Phase {phase.name}")
+        generator.add_line("{")
+        generator.start_indent()
+        if not args.silent:
+            generator.add_print_statement(f"Phase {phase.name}: {phase.args.pattern}")
+        if set_threads:
+            generator.add_line(f"omp_set_num_threads({'default_threads' if phase.args.threads is None else phase.args.threads});")
+            write_thread_placement(phase.args, generator)
+        phase.args.pattern.write_header(phase.args, generator)
+        _write_main_body(phase.args, generator, region=phase.name)
+        phase.args.pattern.write_footer(phase.args, generator)
+        generator.close_indent()
+        generator.add_line("}")
+        if phase.idle > 0:
+            write_idle_kernel(phase.args, generator, region_name=f"{phase.name}_idle", duration=phase.idle)
+
+
 def _write_finalization(args, generator):
-    args.pattern.write_footer(args, generator)
-    args.instrumentation.finalize(generator)
+    if args.phases is None:
+        args.pattern.write_footer(args, generator)
+    else:
+        workload_spec.write_shared_buffer_cleanup(args.phases, generator)
     if args.idlePhase > 0:
         write_idle_kernel(args, generator=generator, region_name="idle_end")
+    args.instrumentation.finalize(args, generator)
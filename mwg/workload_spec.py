@@ -0,0 +1,250 @@
+import argparse
+import copy
+import json
+import pathlib
+import re
+
+import cli
+from allocators import Allocator
+from code_generator import CodeGenerator
+
+# options of the generator that can be set per phase, named like the long command line option without dashes
+PHASE_OPTIONS = ["pattern", "size", "stride", "chunk-size", "type", "threads", "repetitions", "warmup", "duration",
+                 "target-bandwidth", "write-allocate", "chains", "zipf-theta", "hot-fraction", "hot-probability",
+                 "prefetch-hint"]
+# keys of a phase that are not options of the generator
+_PHASE_KEYS = ["name", "idle", "buffers"]
+# phase and buffer names are used as C identifiers and in metric names
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# regions of the idle kernels around all phases, see workload_generation.write_idle_kernel()
+_RESERVED_NAMES = ["idle_start", "idle_end"]
+
+
+class Phase:
+    """
+    Phase of a workload specification: a kernel with its own arguments, buffers and timing, optionally followed by an
+    idle gap
+    """
+    def __init__(self, name: str, args, idle: int, buffers: dict):
+        """
+        :param name: name of the phase, used as its instrumentation region and metric prefix
+        :param args: arguments of the kernel of the phase, the arguments of the generator with the phase options applied
+        :param idle: duration of the idle gap after the phase in milliseconds, 0 for none
+        :param buffers: buffer variables of the pattern mapped to the names of the shared buffers they use
+        """
+        self.name = name
+        self.args = args
+        self.idle = idle
+        self.buffers = buffers
+
+    def __repr__(self):
+        return self.name
+
+
+class SharedAllocator(Allocator):
+    """
+    Wraps the allocator of a phase such that selected buffers are shared between phases. The first phase using a shared
+    buffer allocates it with the wrapped allocator, later phases reuse the memory and its content (see
+    Allocator.reuses()). Shared buffers are freed after the last phase by write_shared_buffer_cleanup()
+    """
+    def __init__(self, allocator: Allocator, phase: str, buffers: dict, owned: list):
+        """
+        :param allocator: allocator of unshared buffers and of the shared buffers allocated by this phase
+        :param phase: name of the phase
+        :param buffers: buffer variables of the pattern mapped to the names of the shared buffers they use
+        :param owned: names of the shared buffers allocated by this phase
+        """
+        self.allocator = allocator
+        self.phase = phase
+        self.buffers = buffers
+        self.owned = owned
+        self.allocated = set()
+
+    def write_definitions(self, args, generator: CodeGenerator):
+        self.allocator.write_definitions(args, generator)
+
+    def initialize(self, args, generator: CodeGenerator):
+        self.allocator.initialize(args, generator)
+
+    def allocate(self, args, generator: CodeGenerator, ptr_name: str, pointer_type: str, element_count: int, silent: bool = False):
+        if ptr_name not in self.buffers:
+            self.allocator.allocate(args, generator, ptr_name, pointer_type, element_count, silent)
+            return
+        self.allocated.add(ptr_name)
+        shared = get_shared_buffer_variable(self.buffers[ptr_name])
+        size = f"sizeof({pointer_type}) * (size_t) ({element_count})"
+        if self.buffers[ptr_name] in self.owned:
+            self.allocator.allocate(args, generator, ptr_name, pointer_type, element_count, silent)
+            generator.add_line(f"{shared} = {ptr_name};")
+            generator.add_line(f"{shared}_bytes = {size};")
+            return
+        generator.add_multiline_indented(f"""if ({size} > {shared}_bytes) {{
+  printf(\"err: shared buffer {self.buffers[ptr_name]} of %zu bytes is too small for {ptr_name} of phase {self.phase} (%zu bytes)\\n\", {shared}_bytes, {size});
+  return 1;
+}}""")
+        generator.add_line(f"{ptr_name} = ({pointer_type}*) {shared};")
+        if not args.silent and not silent:
+            generator.add_print_statement(f"Reusing shared buffer {self.buffers[ptr_name]} as {ptr_name}")
+
+    def free(self, args, generator: CodeGenerator, ptr_name: str, pointer_type: str, element_count: int):
+        if ptr_name not in self.buffers:
+            self.allocator.free(args, generator, ptr_name, pointer_type, element_count)
+
+    def reuses(self, ptr_name: str) -> bool:
+        return ptr_name in self.buffers and self.buffers[ptr_name] not in self.owned
+
+    def get_compiler_flags(self) -> [str]:
+        return self.allocator.get_compiler_flags()
+
+    def get_linker_flags(self) -> [str]:
+        return self.allocator.get_linker_flags()
+
+    def __repr__(self):
+        return repr(self.allocator)
+
+
+def get_shared_buffer_variable(name: str) -> str:
+    return "shared_" + name
+
+
+def load_spec(path: str) -> list:
+    """
+    Loads a workload specification, a JSON or (if PyYAML is installed) YAML file containing a list of phases, either at
+    the top level or as 'phases'. Every phase is a dictionary of options (see PHASE_OPTIONS) and the keys name, idle
+    (gap after the phase in ms) and buffers (buffer variables of the pattern mapped to names of shared buffers)
+    :param path: path of the specification
+    :return: list of phases, each with a name
+    """
+    path = pathlib.Path(path)
+    try:
+        with open(path) as f:
+            if path.suffix.lower() in [".yaml", ".yml"]:
+                try:
+                    import yaml
+                except ImportError:
+                    raise argparse.ArgumentTypeError(f"Reading '{path}' requires PyYAML (pip install pyyaml), use a JSON specification otherwise")
+                try:
+                    spec = yaml.safe_load(f)
+                except yaml.YAMLError as e:
+                    raise argparse.ArgumentTypeError(f"Malformed specification '{path}': {e}")
+            else:
+                spec = json.load(f)
+    except OSError as e:
+        raise argparse.ArgumentTypeError(f"Cannot read specification '{path}': {e.strerror}")
+    except ValueError as e:  # JSON syntax and encoding errors
+        raise argparse.ArgumentTypeError(f"Malformed specification '{path}': {e}")
+    phases = spec.get("phases") if isinstance(spec, dict) else spec
+    if not isinstance(phases, list) or len(phases) == 0:
+        raise argparse.ArgumentTypeError(f"'{path}' does not contain a list of phases")
+    names = set()
+    for i, phase in enumerate(phases):
+        if not isinstance(phase, dict):
+            raise argparse.ArgumentTypeError(f"Phase {i} of '{path}' is not a dictionary of options")
+        unknown = [key for key in phase if key not in PHASE_OPTIONS + _PHASE_KEYS]
+        if len(unknown) > 0:
+            raise argparse.ArgumentTypeError(f"Unknown key(s) {', '.join(unknown)} in phase {i} of '{path}', supported are {', '.join(PHASE_OPTIONS + _PHASE_KEYS)}")
+        phase["name"] = str(phase.get("name", f"phase{i}"))
+        if not _IDENTIFIER.match(phase["name"]) or phase["name"] in _RESERVED_NAMES:
+            raise argparse.ArgumentTypeError(f"Invalid phase name '{phase['name']}', names must be C identifiers other than {', '.join(_RESERVED_NAMES)}")
+        if phase["name"] in names:
+            raise argparse.ArgumentTypeError(f"Duplicate phase name '{phase['name']}' in '{path}'")
+        names.add(phase["name"])
+        buffers = phase.get("buffers", {})
+        if not isinstance(buffers, dict) or not all(_IDENTIFIER.match(str(k)) and _IDENTIFIER.match(str(v)) for k, v in buffers.items()):
+            raise argparse.ArgumentTypeError(f"Buffers of phase {phase['name']} must map buffer variables to shared buffer names")
+    return phases
+
+
+def _apply_option(parser: argparse.ArgumentParser, args, option: str, value, phase: str):
+    action = cli.get_option_actions(parser).get("--" + option)
+    if action is None:
+        raise AttributeError(f"Unknown option '{option}' in phase {phase}")
+    if action.nargs == 0:
+        enabled = value if isinstance(value, bool) else str(value).lower() in ["1", "true", "yes", "on"]
+        setattr(args, action.dest, action.const if enabled else action.default)
+        return
+    try:
+        parsed = action.type(str(value)) if action.type is not None else str(value)
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        raise AttributeError(f"Invalid value '{value}' of {option} in phase {phase}: {e}")
+    if parsed is None or (action.choices is not None and parsed not in action.choices):
+        raise AttributeError(f"Invalid value '{value}' of {option} in phase {phase}")
+    setattr(args, action.dest, parsed)
+
+
+def get_phases(args, parser: argparse.ArgumentParser):
+    """
+    Derives the arguments of every phase of --spec from the arguments of the generator
+    :param args: parsed arguments of the generator
+    :param parser: parser of the generator, used to convert and validate the phase options
+    :return: list of phases or None if no specification is given
+    """
+    if args.spec is None:
+        return None
+    if args.runtimeParameters:
+        raise AttributeError("--runtime-parameters is not supported with --spec, the parameters of each phase are compiled into the workload")
+    phases = []
+    owners = {}
+    for spec in args.spec:
+        for key in spec:
+            if key not in PHASE_OPTIONS + _PHASE_KEYS:
+                raise AttributeError(f"Unknown option '{key}' in phase {spec['name']}, supported are {', '.join(PHASE_OPTIONS + _PHASE_KEYS)}")
+        phase_args = copy.copy(args)
+        phase_args.phases = None
+        for option in PHASE_OPTIONS:
+            if option in spec:
+                _apply_option(parser, phase_args, option, spec[option], spec["name"])
+        if not phase_args.pattern.measures_bandwidth:
+            raise AttributeError(f"Pattern {phase_args.pattern} of phase {spec['name']} cannot be used in a workload specification")
+        if "threads" in spec and not args.parallelize:
+            print(f"warning: The thread count of phase {spec['name']} is ignored without --parallelize")
+        buffers = {str(k): str(v) for k, v in spec.get("buffers", {}).items()}
+        owned = []
+        for name in buffers.values():
+            if name not in owners:
+                owners[name] = spec["name"]
+                owned.append(name)
+        if len(buffers) > 0:
+            phase_args.allocator = SharedAllocator(args.allocator, spec["name"], buffers, owned)
+        phase = Phase(spec["name"], phase_args, int(spec.get("idle", 0)), buffers)
+        check_shared_buffers(phase)
+        phases.append(phase)
+    # kernels with explicit SIMD, non-temporal stores or prefetches are specialized for a single data type
+    if args.simd != "auto" or args.ntStores or args.prefetchDistance > 0:
+        data_types = {p.args.dataType for p in phases}
+        if len(data_types) > 1:
+            raise AttributeError(f"All phases must use the same data type with --simd {args.simd}, --nt-stores or --prefetch-distance, found {', '.join(sorted(data_types))}")
+    return phases
+
+
+def get_shared_buffers(phases: list) -> list:
+    """
+    Returns the shared buffers of a workload specification with the arguments of the phase allocating them
+    :return: list of (buffer name, arguments of the allocating phase) tuples in order of allocation
+    """
+    return [(name, p.args) for p in phases if isinstance(p.args.allocator, SharedAllocator) for name in p.args.allocator.owned]
+
+
+def write_shared_buffer_declarations(phases: list, generator: CodeGenerator):
+    for name, _ in get_shared_buffers(phases):
+        generator.add_line(f"void* {get_shared_buffer_variable(name)} = NULL;")
+        generator.add_line(f"size_t {get_shared_buffer_variable(name)}_bytes = 0;")
+
+
+def write_shared_buffer_cleanup(phases: list, generator: CodeGenerator):
+    for name, phase_args in get_shared_buffers(phases):
+        variable = get_shared_buffer_variable(name)
+        phase_args.allocator.allocator.free(phase_args, generator, variable, "char", f"{variable}_bytes")
+
+
+def check_shared_buffers(phase: Phase):
+    """
+    Fails if a buffer variable of the phase is not allocated by its pattern. The buffers of a pattern are known once its
+    header has been written, so the header is written to a scratch generator
+    """
+    if not isinstance(phase.args.allocator, SharedAllocator):
+        return
+    phase.args.pattern.write_header(phase.args, CodeGenerator([]))
+    unknown = [b for b in phase.buffers if b not in phase.args.allocator.allocated]
+    if len(unknown) > 0:
+        raise AttributeError(f"Pattern {phase.args.pattern} of phase {phase.name} has no buffer(s) {', '.join(unknown)}")
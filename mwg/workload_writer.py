@@ -0,0 +1,123 @@
+import json
+import os
+import pathlib
+from itertools import chain
+
+from jinja2 import Environment, FileSystemLoader
+
+import utils
+import workload_generation
+
+CONFIGURATION_NAME = "config.json"
+
+# arguments that do not influence the generated workload and are therefore not part of its configuration
+_NON_CONFIGURATION_ARGS = ["verbose", "silent", "wallTimeMeasure", "createMakeFile", "includePath",
+                           "libraryPath", "outputFolder", "sweep", "jobs", "phases"]
+
+
+def load_templates() -> Environment:
+    """
+    Loads the Jinja environment containing the templates of main.c and the Makefile
+    :return: template environment
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return Environment(loader=FileSystemLoader(os.path.join(base_dir, "templates")))
+
+
+def get_configuration(args) -> dict:
+    """
+    Returns the configuration of a workload, i.e. all arguments that influence the generated code
+    :param args: parsed arguments
+    :return: JSON-serializable dictionary of the configuration
+    """
+    config_args = dict(vars(args))
+    for to_remove in _NON_CONFIGURATION_ARGS:
+        if to_remove in config_args:
+            config_args.pop(to_remove)
+    return json.loads(json.dumps(config_args, cls=utils.CustomEncoder))
+
+
+def get_makefile_vars(args) -> dict:
+    """
+    Computes the variables of the Makefile template
+    :param args: parsed arguments
+    :return: dictionary of template variables
+    """
+    flags = []
+    linkerFlags = []
+    flags.append("-lm")
+    flags.append("-m64")
+    linkerFlags.append("-lm")
+    if args.parallelize:
+        flags.append("-fopenmp")
+        linkerFlags.append("-fopenmp")
+
+    allocator_args = workload_generation.get_distinct_kernel_args(args, lambda a: a.allocator)
+    pattern_args = workload_generation.get_distinct_kernel_args(args, lambda a: a.pattern)
+    for x in chain(*[a.allocator.get_compiler_flags() for a in allocator_args], args.instrumentation.get_compiler_flags(),
+                   *[a.pattern.get_compiler_flags() for a in pattern_args]):
+        flags.append(x)
+    for x in chain(*[a.allocator.get_linker_flags() for a in allocator_args], args.instrumentation.get_linker_flags(),
+                   *[a.pattern.get_linker_flags() for a in pattern_args]):
+        linkerFlags.append(x)
+
+    flags.append("-O" + args.optimizationLevel)
+    if args.native:
+        flags.append("-march=native")
+
+    execPrefix = []
+    if args.libraryPath is not None:
+        for libPath in args.libraryPath:
+            execPrefix.append(f"LD_LIBRARY_PATH={libPath}:${{LD_LIBRARY_PATH}}")
+    if args.threads is not None:
+        execPrefix.append(f"OMP_NUM_THREADS={args.threads}")
+    execPrefix.extend(args.instrumentation.get_exec_environment(args))
+    if args.environmentVariables is not None:
+        for env in args.environmentVariables:
+            execPrefix.append(env)
+    execPrefix = " ".join(execPrefix)
+    if len(execPrefix) > 0:
+        execPrefix = execPrefix + " "
+
+    if (args.membind is not None and args.membind != "") or (args.cpunodebind is not None and args.cpunodebind != ""):
+        execPrefix = execPrefix + "numactl "
+        if args.membind is not None and args.membind != "":
+            execPrefix = execPrefix + "-m " + args.membind + " "
+        if args.cpunodebind is not None and args.cpunodebind != "":
+            execPrefix = execPrefix + "-N " + args.cpunodebind + " "
+
+    return {
+        "FLAGS": " ".join(flags),
+        "COMPILER": args.compiler,
+        "LINKER_FLAGS": " ".join(linkerFlags),
+        "LIBRARY_PATH": "" if args.libraryPath is None else " ".join(["-L" + str(s) for s in args.libraryPath]),
+        "INCLUDE_PATH": "" if args.includePath is None else " ".join(["-I" + str(s) for s in args.includePath]),
+        "EXEC_PREFIX": execPrefix
+    }
+
+
+def write_workload(args, env: Environment, output_folder: pathlib.Path, quiet: bool = False):
+    """
+    Generates main.c and, if enabled, the Makefile of a single workload configuration
+    :param args: parsed arguments
+    :param env: template environment, see load_templates()
+    :param output_folder: folder the workload will be written to
+    :param quiet: Whether to suppress progress messages
+    """
+    output_folder.mkdir(parents=True, exist_ok=True)
+    if not quiet:
+        print("Generating benchmark...")
+    template = env.get_template("main.c.j2")
+    generatedVars = workload_generation.generate_code(args)
+    utils.write_if_changed(pathlib.Path(output_folder, "main.c"), template.render(generatedVars))
+    utils.write_if_changed(pathlib.Path(output_folder, CONFIGURATION_NAME), json.dumps(get_configuration(args), indent=2))
+    if not quiet:
+        print("Benchmark has been written to '" + str(output_folder) + "/main.c'")
+
+    if args.createMakeFile:
+        template = env.get_template("Makefile.j2")
+        if not quiet:
+            print("Generating Makefile")
+        utils.write_if_changed(pathlib.Path(output_folder, "Makefile"), template.render(get_makefile_vars(args)))
+        if not quiet:
+            print("Makefile has been written to '" + str(output_folder) + "/Makefile'")
@@ -0,0 +1,94 @@
+import pathlib
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+# the modules of the generator import each other by name, as when running mwg/main.py
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "mwg"))
+
+import cli  # noqa: E402
+from code_generator import CodeGenerator  # noqa: E402
+import workload_generation  # noqa: E402
+import workload_spec  # noqa: E402
+import workload_writer  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return cli.create_parser()
+
+
+@pytest.fixture(scope="session")
+def generate(parser):
+    """
+    Returns a function generating the main.c of a workload from a generator command line
+    """
+    env = workload_writer.load_templates()
+
+    def generate(argv):
+        args = parser.parse_args(list(argv))
+        args.phases = workload_spec.get_phases(args, parser)
+        return env.get_template("main.c.j2").render(workload_generation.generate_code(args))
+    return generate
+
+
+@pytest.fixture(scope="session")
+def get_definitions(parser):
+    """
+    Returns a function writing the definitions of the given functions, e.g. workload_generation.write_random_definitions,
+    for a generator command line into a C translation unit
+    """
+    def get_definitions(argv, *writers):
+        args = parser.parse_args(list(argv))
+        generator = CodeGenerator(includes=["<stdio.h>", "<stdlib.h>", "<string.h>", "<time.h>", "<unistd.h>"])
+        for writer in writers:
+            writer(args, generator)
+        return "#define _GNU_SOURCE\n" + "".join(f"#include {include}\n" for include in generator.includes) + \
+            generator.get_code()
+    return get_definitions
+
+
+@pytest.fixture
+def run_workload(parser, tmp_path):
+    """
+    Returns a function generating a workload from a generator command line into a temporary folder, building it with
+    its Makefile and running it. The function returns the standard output of the run. Skips the test if gcc or make
+    are not installed
+    """
+    if shutil.which("gcc") is None or shutil.which("make") is None:
+        pytest.skip("gcc and make are required to build workloads")
+    env = workload_writer.load_templates()
+
+    def run_workload(argv):
+        folder = tmp_path / "workload"
+        args = parser.parse_args(list(argv) + ["-o", str(folder)])
+        args.phases = workload_spec.get_phases(args, parser)
+        workload_writer.write_workload(args, env, folder, quiet=True)
+        for goal in ["all", "run"]:
+            result = subprocess.run(["make", "-s", "--no-print-directory", "-C", str(folder), goal],
+                                    capture_output=True, text=True, timeout=120)
+            assert result.returncode == 0, result.stdout + result.stderr
+        return result.stdout
+    return run_workload
+
+
+@pytest.fixture
+def run_c(tmp_path):
+    """
+    Returns a function compiling a C program with OpenMP and running it. The function returns the standard output of
+    the program. Skips the test if gcc is not installed
+    """
+    if shutil.which("gcc") is None:
+        pytest.skip("gcc is required to compile C programs")
+
+    def run_c(source):
+        (tmp_path / "test.c").write_text(source)
+        result = subprocess.run(["gcc", "-O2", "-fopenmp", "-o", str(tmp_path / "test.out"), str(tmp_path / "test.c"),
+                                 "-lm"], capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        result = subprocess.run([str(tmp_path / "test.out")], capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stdout + result.stderr
+        return result.stdout
+    return run_c
@@ -0,0 +1,233 @@
+import itertools
+import os
+
+import pytest
+
+import access_patterns
+import allocators
+
+mixed = access_patterns.get_registered("mixed")
+latency = access_patterns.get_registered("latency")
+loaded_latency = access_patterns.get_registered("loaded-latency")
+numa_matrix = access_patterns.get_registered("numa-matrix")
+
+
+@pytest.mark.parametrize("ratio, slots", [
+    (0.0, [False]),
+    (1.0, [True]),
+    (0.5, [False, True]),
+    (0.25, [False, False, False, True]),
+    (2 / 3, [False, True, True]),
+    (0.4, [False, False, True, False, True]),
+])
+def test_mixed_slots(parser, ratio, slots):
+    assert mixed._get_slots(parser.parse_args(["--read-ratio", str(ratio)])) == slots
+
+
+@pytest.mark.parametrize("ratio", [0.1, 0.3, 0.37, 0.5, 0.9, 0.99])
+def test_mixed_slots_are_spread_evenly(parser, ratio):
+    args = parser.parse_args(["--read-ratio", str(ratio)])
+    fraction = mixed.get_ratio(args)
+    slots = mixed._get_slots(args)
+    assert len(slots) == fraction.denominator <= access_patterns.MAX_MIXED_PERIOD
+    assert sum(slots) == fraction.numerator
+    assert abs(float(fraction) - ratio) <= 1 / (2 * access_patterns.MAX_MIXED_PERIOD)
+    # every run of consecutive slots reads within one chunk of its share, also across the end of a period
+    for length in range(1, len(slots) + 1):
+        for start in range(len(slots)):
+            reads = sum(itertools.islice(itertools.cycle(slots), start, start + length))
+            assert abs(reads - length * fraction) < 1
+
+
+def test_mixed_kernel(generate):
+    code = generate(["-P", "mixed", "--read-ratio", "0.25", "-c", "2"])
+    assert "long periods = chunks / 4;" in code
+    assert "[metric] mixed.read_ratio = %f\\n\", 0.25" in code
+    assert code.count("sum += A[base + j];") == 1
+    assert code.count("A[base + j] = 3.0;") == 3
+    code = generate(["-P", "mixed", "--read-ratio", "0.25", "--nt-stores"])
+    assert code.count("mwg_stream(&A[base + j], 3.0);") == 3
+    assert "mwg_stream_fence();" in code
+
+
+def test_mixed_random_kernel(generate):
+    code = generate(["-P", "mixed-random", "--read-ratio", "0.5"])
+    assert "mwg_shuffle(chunks, order, 37);" in code
+    assert "base = order[first + 1] * " in code
+
+
+@pytest.mark.parametrize("pattern", ["mixed", "mixed-random"])
+def test_mixed_workload_runs(run_workload, pattern):
+    output = run_workload(["-P", pattern, "--read-ratio", "0.3", "--parallelize", "-t", "2", "-S", "1MiB"])
+    assert "[metric] mixed.read_ratio = 0.300000" in output
+
+
+def test_chains_kernel(generate):
+    code = generate(["-P", "random-load", "--chains", "4"])
+    assert "size_t chain_count = (size_t) 4 * 1;" in code
+    assert "size_t per_chain = size / 4;" in code
+    assert all(f"size_t offset{c} = chain_offsets[{c}];" in code for c in range(4))
+    assert all(f"offset{c} = next_indices[offset{c}];" in code for c in range(4))
+    assert "chain_offsets[3] = offset3;" in code
+    assert "free(chain_offsets);" in code
+    code = generate(["-P", "random-load", "--chains", "2", "--parallelize"])
+    assert "size_t chain_count = (size_t) 2 * omp_get_max_threads();" in code
+    assert "size_t* thread_chains = chain_offsets + (size_t) 2 * omp_get_thread_num();" in code
+    assert "size_t offset1 = thread_chains[1];" in code
+
+
+def test_chains_ignored_by_skewed_distributions(generate):
+    code = generate(["-P", "random-load", "--chains", "4", "--distribution", "zipf"])
+    assert "chain_offsets" not in code
+
+
+@pytest.mark.parametrize("pattern", ["random-load", "random-store", "random-sum"])
+def test_chains_workload_runs(run_workload, pattern):
+    output = run_workload(["-P", pattern, "--chains", "4", "--parallelize", "-t", "2", "-S", "1MiB"])
+    assert "err:" not in output
+
+
+
+_TIME = """
+double mwg_time(void) {
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return (double) now.tv_sec + (double) now.tv_nsec * 1e-9;
+}
+"""
+
+
+def get_working_sets(size: int) -> [int]:
+    # the working sets grow by 1.5 from powers of two and by 4/3 to the next power of two
+    working_sets = [latency.min_working_set]
+    while True:
+        working_set = working_sets[-1]
+        working_set = working_set + working_set // 2 if working_set & (working_set - 1) == 0 else working_set // 3 * 4
+        if working_set > size:
+            return working_sets
+        working_sets.append(working_set)
+
+
+def test_latency_kernel(generate):
+    code = generate(["-P", "latency", "-S", "64KiB"])
+    # Sattolo's algorithm swaps with an element below i, which yields a single cycle over all lines
+    assert "size_t j = mwg_rng_below(&rng, i);" in code
+    assert "mwg_sattolo_chain(chain, lines, line_size, 37 + working_set);" in code
+    assert "size_t max_working_set = 65536;" in code
+    assert "working_set = (working_set & (working_set - 1)) == 0 ? working_set + working_set / 2 : working_set / 3 * 4" in code
+    assert code.count("p = *(char**) p;") == latency.unroll
+
+
+def test_sattolo_chain_is_single_cycle(get_definitions, run_c):
+    definitions = get_definitions([], lambda args, generator: generator.add_multiline_indented(_TIME),
+                                  latency._write_chain_definitions)
+    output = run_c(definitions + """
+int main() {
+    size_t sizes[] = {2, 3, 64, 1000, 4096};
+    for (int s = 0; s < 5; s++) {
+        size_t lines = sizes[s];
+        char* chain = (char*) malloc(lines * 64);
+        mwg_sattolo_chain(chain, lines, 64, 37 + s);
+        char* p = chain;
+        size_t length = 0;
+        do {
+            p = *(char**) p;
+            length++;
+        } while (p != chain && length <= lines);
+        printf("%zu %zu\\n", lines, length);
+        free(chain);
+    }
+    return 0;
+}
+""")
+    # following the chain from the first line visits every line before it returns
+    assert [line.split() for line in output.splitlines()] == [[n, n] for n in ["2", "3", "64", "1000", "4096"]]
+
+
+def test_latency_workload_runs(run_workload):
+    output = run_workload(["-P", "latency", "-S", "64KiB", "-n", "1"])
+    metrics = {line.split()[1]: float(line.split()[-1]) for line in output.splitlines() if line.startswith("[metric] latency.")}
+    working_sets = get_working_sets(65536)
+    assert working_sets == [4096, 6144, 8192, 12288, 16384, 24576, 32768, 49152, 65536]
+    assert set(metrics) == {f"latency.{ws}.{metric}" for ws in working_sets for metric in ["ns", "cycles"]}
+    assert all(metrics[f"latency.{ws}.ns"] > 0 for ws in working_sets)
+    assert all(metrics[f"latency.{ws}.cycles"] >= 0 for ws in working_sets)
+
+@pytest.mark.parametrize("levels, expected", [
+    ("0,0.2,0.4", [1.0, 0.4, 0.2, 0.0]),
+    ("0.5", [1.0, 0.5]),
+    ("0.5,1,0.5", [1.0, 0.5]),
+    ("1", [1.0]),
+    ("0", [0.0]),
+])
+def test_loaded_latency_levels(parser, levels, expected):
+    # the unthrottled level is added and measured first, it determines the rates of the throttled levels
+    assert loaded_latency._get_levels(parser.parse_args(["--load-levels", levels])) == expected
+
+
+def test_loaded_latency_kernel(generate):
+    code = generate(["-P", "loaded-latency", "--load-levels", "0,0.5", "--probe-cpu", "3", "--parallelize"])
+    main = code[code.index("int main("):]
+    # the OpenMP threads of the load inherit the affinity without the CPU of the probe
+    assert main.index("int probe_cpu = mwg_probe_cpu(3);") < main.index("mwg_exclude_cpu(probe_cpu);") < main.index("#pragma omp")
+    assert "double levels[] = {1.0, 0.5, 0.0};" in code
+    assert "mwg_probe_t probe = {chain, probe_steps * 1, probe_cpu, 0, 0, 0.0};" in code
+    assert "pthread_create(&probe_thread, NULL, mwg_probe_main, &probe);" in code
+    assert "mwg_probe_cpu(-1);" in generate(["-P", "loaded-latency"])
+
+
+def test_loaded_latency_workload_runs(run_workload):
+    output = run_workload(["-P", "loaded-latency", "-S", "1MiB", "-n", "1", "--load-levels", "0,0.5",
+                           "--load-pattern", "strided-load", "--probe-cpu", "0", "--parallelize", "-t", "2"])
+    metrics = {line.split()[1]: float(line.split()[-1]) for line in output.splitlines() if line.startswith("[metric] loaded_latency.")}
+    assert set(metrics) == {f"loaded_latency.{percent}.{metric}" for percent in [100, 50, 0] for metric in ["bandwidth", "ns", "cycles"]}
+    assert metrics["loaded_latency.100.bandwidth"] > 0
+    assert 0 < metrics["loaded_latency.50.bandwidth"] < metrics["loaded_latency.100.bandwidth"]
+    assert metrics["loaded_latency.0.bandwidth"] == 0
+    assert all(metrics[f"loaded_latency.{percent}.ns"] > 0 for percent in [100, 50, 0])
+    assert "Load: strided-load (CPUs other than 0), probe: CPU 0" in output
+    # the load can only be kept off the CPU of the probe if the process may use others
+    excluded = len(os.sched_getaffinity(0)) > 1 and 0 in os.sched_getaffinity(0)
+    assert ("warning: The load cannot be kept off CPU 0 of the probe" in output) != excluded
+
+def test_numa_matrix_cell_arguments(parser):
+    args = parser.parse_args(["-P", "numa-matrix"])
+    cell_args = numa_matrix._get_cell_args(args)
+    # the cell allocates on its memory node without changing the allocator of the generator
+    assert cell_args is not args
+    assert isinstance(cell_args.allocator, allocators.NumaNodeAllocator)
+    assert cell_args.allocator.node == "mem_node"
+    assert repr(args.allocator) == "stdlib"
+
+
+def test_numa_matrix_kernel(generate):
+    code = generate(["-P", "numa-matrix", "--matrix-pattern", "strided-copy", "-S", "1MiB"])
+    assert "A = (double*) numa_alloc_onnode(sizeof(double) * (long) N, mem_node);" in code
+    assert "B = (double*) numa_alloc_onnode(sizeof(double) * (long) N, mem_node);" in code
+    assert "chain = (char*) numa_alloc_onnode(sizeof(char) * (long) max_working_set, mem_node);" in code
+    assert "numa_free(B, sizeof(double) * N);" in code
+    assert "#pragma omp parallel" not in code
+    assert code.count("numa_run_on_node(cpu_node);") == 1
+    assert code.count("numa_run_on_node(-1);") == 1
+
+
+def test_numa_matrix_binds_every_thread(generate):
+    lines = [line.strip() for line in generate(["-P", "numa-matrix", "--parallelize"]).splitlines()]
+    # numa_run_on_node() binds the calling thread only, so every OpenMP thread and the main thread call it
+    for node in ["cpu_node", "-1"]:
+        call = lines.index(f"numa_run_on_node({node});")
+        assert lines[call - 1] == "#pragma omp parallel"
+        assert lines[call + 1] == f"numa_run_on_node({node});"
+
+
+def test_numa_matrix_workload_runs(run_workload):
+    output = run_workload(["-P", "numa-matrix", "-S", "1MiB", "-n", "2", "--parallelize", "-t", "2"])
+    metrics = {line.split()[1]: float(line.split()[-1]) for line in output.splitlines() if line.startswith("[metric] numa_matrix.")}
+    # every pair of a CPU node and a memory node reports its bandwidth and latency, also on a single-node machine
+    cells = {name.rsplit(".", 1)[0] for name in metrics}
+    assert len(cells) >= 1
+    for cell in cells:
+        assert metrics[f"{cell}.bandwidth"] > 0
+        assert metrics[f"{cell}.ns"] > 0
+        assert metrics[f"{cell}.cycles"] > 0
+    assert "Bandwidth (GB/s) of strided-load with 2 thread(s)" in output
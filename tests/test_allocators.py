@@ -0,0 +1,79 @@
+import pytest
+
+import allocators
+
+# mwg_munmap times msync with the clock defined by the template of main.c
+_TIME = """
+double mwg_time(void) {
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return (double) now.tv_sec + (double) now.tv_nsec * 1e-9;
+}
+"""
+
+
+@pytest.mark.parametrize("allocator, call", [
+    ("mmap", 'mwg_mmap("A", sizeof(double) * (size_t) N, 0, 0, 0, -1, 0)'),
+    ("mmap-thp", 'mwg_mmap("A", sizeof(double) * (size_t) N, 0, 0, 1, -1, 0)'),
+    ("mmap-hugetlb-2m", 'mwg_mmap("A", sizeof(double) * (size_t) N, MAP_HUGE_2MB, (2UL << 20), 0, -1, 0)'),
+])
+def test_mapping_calls(generate, allocator, call):
+    code = generate(["-P", "strided-load", "-A", allocator, "--runtime-parameters"])
+    assert f"A = (double*) {call};" in code
+    assert 'mwg_munmap("A", A, 0);' in code
+
+
+def test_file_mapping_call(generate):
+    code = generate(["-P", "strided-load", "-A", "mmap-file", "-L", "/dev/shm", "--mapping", "private", "--populate",
+                     "--madvise", "sequential"])
+    assert f'mwg_mmap_file("A", "/dev/shm", sizeof(double) * (size_t) N, 0, {allocators.MADVISE_HINTS["sequential"]}, 1, 0)' in code
+
+
+def test_file_mapping_requires_location(generate):
+    with pytest.raises(AttributeError, match="allocation-location"):
+        generate(["-P", "strided-load", "-A", "mmap-file"])
+
+
+def test_mapping_table_grows(get_definitions, run_c, tmp_path):
+    directory = tmp_path / "files"
+    directory.mkdir()
+    definitions = get_definitions([], lambda args, generator: generator.add_multiline_indented(_TIME),
+                                  allocators.get_registered("mmap").write_definitions)
+    output = run_c(definitions + """
+int main() {
+    char names[40][8];
+    char* buffers[80];
+    for (int i = 0; i < 40; i++) {
+        sprintf(names[i], "b%d", i);
+        buffers[i] = (char*) mwg_mmap(names[i], 8192, 0, 0, i % 2, -1, 0);
+        buffers[40 + i] = (char*) mwg_mmap_file(names[i], "%DIRECTORY%", 8192, 1, -1, 0, 0);
+        if (buffers[i] == NULL || buffers[40 + i] == NULL) {
+            return 1;
+        }
+        buffers[i][0] = buffers[40 + i][8191] = 1;
+    }
+    size_t count = mwg_mapping_count;
+    for (int i = 0; i < 80; i++) {
+        mwg_munmap(names[i % 40], buffers[i], 1);
+    }
+    size_t mapped = 0;
+    for (size_t i = 0; i < mwg_mapping_count; i++) {
+        mapped += mwg_mappings[i].address != NULL;
+    }
+    printf("%zu %zu\\n", count, mapped);
+    return 0;
+}
+""".replace("%DIRECTORY%", str(directory)))
+    count, mapped = [int(v) for v in output.splitlines()[-1].split()]
+    assert count >= 80
+    assert mapped == 0
+    # every backing file is removed when its buffer is unmapped
+    assert list(directory.iterdir()) == []
+
+
+def test_file_mapped_workload_runs(run_workload, tmp_path):
+    directory = tmp_path / "files"
+    directory.mkdir()
+    output = run_workload(["-P", "strided-copy", "-A", "mmap-file", "-L", str(directory), "-S", "1MiB", "--msync"])
+    assert "[metric] allocation.A.msync_time" in output
+    assert list(directory.iterdir()) == []
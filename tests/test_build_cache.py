@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from build_cache import BuildCache
+
+
+def write_workload(folder, source="int main() { return 0; }", flags="-O2", binary=None):
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / "main.c").write_text(source)
+    # a compiler that does not exist, so the key does not depend on the compilers of this machine
+    (folder / "Makefile").write_text(f"CC = mwg-missing-compiler\nFLAGS = {flags}\n\nall:\n\t$(CC) $(FLAGS) main.c\n")
+    if binary is not None:
+        (folder / "main.out").write_bytes(binary)
+    return folder
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return BuildCache(tmp_path / "cache", 1024)
+
+
+def test_key_depends_on_source_and_flags(cache, tmp_path):
+    key = cache.get_key(write_workload(tmp_path / "a"))
+    assert key == cache.get_key(write_workload(tmp_path / "b"))
+    assert key != cache.get_key(write_workload(tmp_path / "c", source="int main() { return 1; }"))
+    assert key != cache.get_key(write_workload(tmp_path / "d", flags="-O3"))
+
+
+def test_store_and_fetch(cache, tmp_path):
+    built = write_workload(tmp_path / "built", binary=b"binary")
+    key = cache.get_key(built)
+    target = write_workload(tmp_path / "target")
+    assert not cache.fetch(key, target)
+    cache.store(key, built)
+    assert cache.fetch(key, target)
+    assert (target / "main.out").read_bytes() == b"binary"
+
+
+def test_evicts_least_recently_used(cache, tmp_path):
+    folders = [write_workload(tmp_path / str(i), source=f"int main() {{ return {i}; }}", binary=b"x" * 400) for i in range(3)]
+    keys = [cache.get_key(folder) for folder in folders]
+    for i in range(2):
+        cache.store(keys[i], folders[i])
+        os.utime(cache._get_entry(keys[i]), (i, i))
+    target = write_workload(tmp_path / "target")
+    # fetching marks the older entry as used, so storing a third entry beyond 1024 bytes evicts the second one
+    assert cache.fetch(keys[0], target)
+    cache.store(keys[2], folders[2])
+    assert cache.fetch(keys[0], target)
+    assert not cache.fetch(keys[1], target)
+    assert cache.fetch(keys[2], target)
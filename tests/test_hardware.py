@@ -0,0 +1,56 @@
+import argparse
+
+import pytest
+
+import hardware
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    def write(path, content):
+        path = tmp_path / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content + "\n")
+    cache = "devices/system/cpu/cpu0/cache"
+    for index, (level, kind, size) in enumerate([(1, "Data", "32K"), (1, "Instruction", "32K"), (2, "Unified", "1024K"),
+                                                 (3, "Unified", "32768K")]):
+        write(f"{cache}/index{index}/level", str(level))
+        write(f"{cache}/index{index}/type", kind)
+        write(f"{cache}/index{index}/size", size)
+        write(f"{cache}/index{index}/ways_of_associativity", "8")
+    write("devices/system/node/node0/meminfo", "Node 0 MemTotal:       16777216 kB")
+    write("devices/system/node/node0/cpulist", "0-7")
+    write("devices/system/node/node1/meminfo", "Node 1 MemTotal:        8388608 kB")
+    write("devices/system/node/node1/cpulist", "8-15")
+    write("kernel/mm/hugepages/hugepages-2048kB/nr_hugepages", "16")
+    write("kernel/mm/hugepages/hugepages-2048kB/free_hugepages", "8")
+    return str(tmp_path)
+
+
+def test_discover(sysfs):
+    topology = hardware.discover(sysfs)
+    assert [(repr(c), c.size, c.line_size, c.ways) for c in topology.caches] == \
+        [("L1", 32 * 1024, 64, 8), ("L2", 1024 ** 2, 64, 8), ("L3", 32 * 1024 ** 2, 64, 8)]
+    assert [(n.id, n.memory, n.cpus) for n in topology.nodes] == [(0, 16 * 1024 ** 3, "0-7"), (1, 8 * 1024 ** 3, "8-15")]
+    assert topology.huge_pages == {2 * 1024 ** 2: (16, 8)}
+    assert topology.get_level("l2") == 1024 ** 2
+    assert topology.get_level("LLC") == 32 * 1024 ** 2
+    assert topology.get_level("DRAM") == 8 * 1024 ** 3
+    with pytest.raises(ValueError):
+        topology.get_level("L4")
+
+
+def test_get_hierarchy_sizes(sysfs):
+    assert hardware.get_hierarchy_sizes(hardware.discover(sysfs)) == [
+        ("L1", 16 * 1024), ("L2", 180 * 1024), ("L3", 5792 * 1024), ("DRAM", 256 * 1024 ** 2)]
+
+
+def test_parse_symbolic_size(sysfs, monkeypatch):
+    topology = hardware.discover(sysfs)
+    monkeypatch.setattr(hardware, "discover", lambda root="/sys": topology)
+    assert hardware.parse_size("2MiB") == 2 * 1024 ** 2
+    assert hardware.parse_size("L2") == 1024 ** 2
+    assert hardware.parse_size("llcx0.5") == 16 * 1024 ** 2
+    assert hardware.parse_size("L1x0.001") == 32
+    with pytest.raises(argparse.ArgumentTypeError, match="no L4 cache"):
+        hardware.parse_size("L4x2")
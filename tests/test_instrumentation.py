@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+import instrumentation
+
+
+def write_report(output_dir, name, report):
+    folder = output_dir / "papi_hl_output"
+    folder.mkdir(exist_ok=True)
+    (folder / name).write_text(json.dumps(report))
+
+
+def test_papi_parse_output_with_region_lists(tmp_path):
+    # output of PAPI 6.0: a list of threads, each with a list of {region name: counters}
+    write_report(tmp_path, "rank_0.json", {"threads": [
+        {"id": 0, "regions": [{"main": {"region_count": 1, "PAPI_TOT_INS": "100", "UNC_M_CAS_COUNT:RD": 40}}]},
+        {"id": 1, "regions": [{"main": {"region_count": 1, "PAPI_TOT_INS": "50", "UNC_M_CAS_COUNT:RD": 30}}]},
+    ]})
+    assert instrumentation.PAPIInstrumentation().parse_output(str(tmp_path), "") == {
+        "papi.main.region_count": 2.0, "papi.main.PAPI_TOT_INS": 150.0, "papi.main.UNC_M_CAS_COUNT:RD": 40.0,
+        "papi.main.threads": 2}
+
+
+def test_papi_parse_output_with_region_ids(tmp_path):
+    # output of PAPI 7: threads and regions are dictionaries keyed by their ids, regions carry their name
+    write_report(tmp_path, "rank_0.json", {"threads": {
+        "0": {"regions": {"0": {"name": "phase0", "parent_region_id": "-1", "cycles": "200", "PAPI_L1_DCM": "7",
+                                "PAPI_TOT_INS": {"not": "a counter"}},
+                          "1": {"name": "phase1", "parent_region_id": "-1", "cycles": "300"}}},
+    }})
+    assert instrumentation.PAPIInstrumentation().parse_output(str(tmp_path), "") == {
+        "papi.phase0.cycles": 200.0, "papi.phase0.PAPI_L1_DCM": 7.0, "papi.phase1.cycles": 300.0,
+        "papi.phase0.threads": 1, "papi.phase1.threads": 1}
+
+
+def test_papi_parse_output_without_output(tmp_path):
+    assert instrumentation.PAPIInstrumentation().parse_output(str(tmp_path), "") == {}
+
+
+def test_papi_derived_metrics():
+    record = {"main.bytes": 1000, "main.repetitions": 2, "main.time": 0.5,
+              "papi.main.cycles": 400.0, "papi.main.PAPI_TOT_INS": 200.0, "papi.main.PAPI_L1_DCM": 10.0,
+              "papi.main.UNC_M_CAS_COUNT:RD": 1e6, "papi.main.real_time_nsec": 4e8, "papi.main.threads": 2,
+              "papi.idle_start.cycles": 0.0, "papi.idle_start.PAPI_TOT_INS": 5.0}
+    derived = instrumentation.PAPIInstrumentation().get_derived_metrics(record)
+    assert derived["papi.main.ipc"] == pytest.approx(0.5)
+    assert derived["papi.main.papi_l1_dcm_per_kb"] == pytest.approx(5.0)
+    assert derived["papi.main.memory_bytes"] == 64e6
+    # the real time of the region is summed over both threads
+    assert derived["papi.main.memory_bandwidth"] == pytest.approx(64e6 / 0.2 * 1e-9)
+    # regions without cycles or traffic have no derived metrics
+    assert not any(key.startswith("papi.idle_start.") for key in derived)
+
+
+def is_on_all_threads(lines: list, statement: str) -> bool:
+    return lines[lines.index(statement) - 2:lines.index(statement)] == ["#pragma omp parallel", "{"]
+
+
+def test_likwid_regions_on_all_threads(generate):
+    lines = [line.strip() for line in generate(["-P", "strided-load", "-I", "likwid", "--parallelize"]).splitlines()]
+    # the marker API is initialized once, then every thread registers itself and starts and stops the regions
+    assert lines.count("likwid_markerInit();") == 1
+    assert not is_on_all_threads(lines, "likwid_markerInit();")
+    for statement in ["likwid_markerThreadInit();", 'likwid_markerStartRegion("main");', 'likwid_markerStopRegion("main");']:
+        assert lines.count(statement) == 1
+        assert is_on_all_threads(lines, statement)
+    assert lines.count("likwid_markerClose();") == 1
+    lines = [line.strip() for line in generate(["-P", "strided-load", "-I", "likwid"]).splitlines()]
+    assert "likwid_markerThreadInit();" not in lines
+    assert "#pragma omp parallel" not in lines
+    for statement in ["likwid_markerInit();", 'likwid_markerStartRegion("main");', 'likwid_markerStopRegion("main");']:
+        assert lines.count(statement) == 1
+
+
+def test_papi_regions_on_all_threads(generate):
+    statements = ['if(PAPI_hl_region_begin("main") != PAPI_OK) { printf("Failed to begin PAPI region main\\n"); }',
+                  'if(PAPI_hl_read("main") != PAPI_OK) { printf("Failed to read PAPI region main\\n"); }',
+                  'if(PAPI_hl_region_end("main") != PAPI_OK) { printf("Failed to end PAPI region main\\n"); }',
+                  'if(PAPI_hl_stop() != PAPI_OK) { printf("Failed to stop PAPI hl API"); }']
+    code = generate(["-P", "strided-load", "-I", "papi", "--parallelize", "--sample-interval", "5"])
+    assert "#include \"papi.h\"" in code
+    lines = [line.strip() for line in code.splitlines()]
+    # the high-level API keeps an event set per thread, so every thread begins, reads and ends the regions
+    for statement in statements:
+        assert lines.count(statement) == 1
+        assert is_on_all_threads(lines, statement)
+    lines = [line.strip() for line in generate(["-P", "strided-load", "-I", "papi", "--sample-interval", "5"]).splitlines()]
+    assert "#pragma omp parallel" not in lines
+    for statement in statements:
+        assert lines.count(statement) == 1
+
+
+def test_perf_regions_on_all_threads(generate):
+    code = generate(["-P", "strided-load", "-I", "perf", "--parallelize"])
+    assert "#include <linux/perf_event.h>" in code
+    lines = [line.strip() for line in code.splitlines()]
+    # every thread opens its own counters and starts and stops them in a parallel region
+    for statement in ["mwg_perf_thread_init(omp_get_thread_num());", 'mwg_perf_start("main", omp_get_thread_num());',
+                      'mwg_perf_stop("main", omp_get_thread_num());']:
+        assert is_on_all_threads(lines, statement)
+    assert "mwg_perf_report(0);" in code
+    code = generate(["-P", "strided-load", "-I", "perf"])
+    assert 'mwg_perf_start("main", 0);' in code
+
+
+def test_perf_derived_metrics():
+    record = {"main.bytes": 2000, "main.repetitions": 1, "perf.main.cycles": 1000.0, "perf.main.instructions": 1500.0,
+              "perf.main.cache_misses": 4.0, "perf.main.page_faults": 2.0}
+    derived = instrumentation.PerfInstrumentation().get_derived_metrics(record)
+    assert derived["perf.main.ipc"] == pytest.approx(1.5)
+    assert derived["perf.main.cache_misses_per_kb"] == pytest.approx(2.0)
+    assert derived["perf.main.page_faults_per_kb"] == pytest.approx(1.0)
+
+
+def test_perf_workload_runs(run_workload):
+    output = run_workload(["-P", "strided-copy", "-I", "perf", "--parallelize", "-t", "2", "-S", "1MiB"])
+    assert "Computation took" in output
+    # the counters may be unavailable in containers and virtual machines, the workload still runs without them
+    if "no perf events available" not in output:
+        assert "[metric] perf.main." in output
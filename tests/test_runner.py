@@ -0,0 +1,118 @@
+import argparse
+import csv
+import json
+import os
+
+import pytest
+
+import runner
+import sweep
+import workload_writer
+
+
+def test_parse_stdout():
+    stdout = "\n".join([
+        "Allocating buffers...",
+        "Computation took: 0.125s",
+        "Result: 42",
+        "[metric] main.bandwidth = 12.5",
+        "  [metric] phase0.latency = 3e-9  ",
+        "[metric] allocation.A.page = huge",
+        "[metric] malformed",
+    ])
+    assert runner.parse_stdout(stdout) == {"time": 0.125, "result": 42.0, "main.bandwidth": 12.5,
+                                           "phase0.latency": 3e-9, "allocation.A.page": "huge"}
+
+
+def test_parse_stdout_empty():
+    assert runner.parse_stdout("") == {}
+
+
+def test_append_results_jsonl(tmp_path):
+    path = tmp_path / "results.jsonl"
+    runner.append_results(path, [{"a": 1}])
+    runner.append_results(path, [{"a": 2, "b": {"c": 3}}])
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [{"a": 1}, {"a": 2, "b": {"c": 3}}]
+
+
+def test_append_results_csv_merges_header(tmp_path):
+    path = tmp_path / "results.csv"
+    runner.append_results(path, [{"folder": "00000", "time": 1.5}])
+    runner.append_results(path, [{"folder": "00001", "bandwidth": 2.0, "arguments": ["--size=1024"]}])
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == ["folder", "time", "bandwidth", "arguments"]
+        rows = list(reader)
+    assert rows == [{"folder": "00000", "time": "1.5", "bandwidth": "", "arguments": ""},
+                    {"folder": "00001", "time": "", "bandwidth": "2.0", "arguments": '["--size=1024"]'}]
+
+
+def test_get_workloads_of_sweep(tmp_path):
+    manifest = {"workloads": [{"folder": "00000", "arguments": ["--size=1024"], "configuration": {"size": 1024}},
+                              {"folder": "00000", "arguments": ["--size=2048"], "configuration": {"size": 2048}}]}
+    (tmp_path / sweep.MANIFEST_NAME).write_text(json.dumps(manifest))
+    assert runner.get_workloads(tmp_path) == [(tmp_path / "00000", ["--size=1024"], {"size": 1024}),
+                                              (tmp_path / "00000", ["--size=2048"], {"size": 2048})]
+
+
+def test_get_workloads_of_single_workload(tmp_path):
+    (tmp_path / "Makefile").write_text("")
+    assert runner.get_workloads(tmp_path) == [(tmp_path, [], {})]
+    (tmp_path / workload_writer.CONFIGURATION_NAME).write_text(json.dumps({"pattern": "strided-copy"}))
+    assert runner.get_workloads(tmp_path) == [(tmp_path, [], {"pattern": "strided-copy"})]
+
+
+def test_get_workloads_without_workload(tmp_path):
+    with pytest.raises(AttributeError):
+        runner.get_workloads(tmp_path)
+
+
+def write_make(tmp_path, script):
+    # stands in for make, the script runs for both the all and the run goal
+    make = tmp_path / "make"
+    make.write_text("#!/bin/sh\n" + script)
+    os.chmod(make, 0o755)
+    return str(make)
+
+
+def test_run_once_records_timeline_of_run(tmp_path):
+    make = write_make(tmp_path, "echo 'Computation took: 0.5s'\necho \"[metric] env.timeline = $MWG_TIMELINE\"\n")
+    args = argparse.Namespace(make=make, timeout=None, verbose=False)
+    config = {"sampleInterval": 10, "timeline": "timeline.csv"}
+    record = runner.run_once(args, tmp_path, config, [])
+    assert record["exit_code"] == 0
+    assert record["time"] == 0.5
+    assert record["timeline"] == record["env.timeline"]
+    assert record["timeline"] != "timeline.csv"
+    assert config["timeline"] == "timeline.csv"
+
+
+def test_run_once_records_timeout(tmp_path):
+    args = argparse.Namespace(make=write_make(tmp_path, "echo 'Computation took: 0.5s'\nsleep 10\n"), timeout=0.5,
+                              verbose=False)
+    record = runner.run_once(args, tmp_path, {}, [])
+    assert record["timed_out"]
+    assert record["exit_code"] != 0
+    assert record["time"] == 0.5
+
+
+def test_main_continues_after_failed_build(tmp_path, capsys):
+    make = write_make(tmp_path, "case \"$*\" in *00000*all*) echo 'main.c: error' >&2; exit 2;; esac\n"
+                                "echo 'Computation took: 0.5s'\n")
+    manifest = {"workloads": [{"folder": "00000", "configuration": {"size": 1024}},
+                              {"folder": "00001", "configuration": {"size": 2048}}]}
+    (tmp_path / sweep.MANIFEST_NAME).write_text(json.dumps(manifest))
+    results = tmp_path / "results.jsonl"
+    with pytest.raises(SystemExit) as e:
+        runner.main([str(tmp_path), "--make", make, "-r", str(results)])
+    assert e.value.code == 1
+    assert "main.c: error" in capsys.readouterr().out
+    records = [json.loads(line) for line in results.read_text().splitlines()]
+    assert [(r["folder"], r["exit_code"], r["timed_out"], r["time"]) for r in records] == \
+        [(str(tmp_path / "00001"), 0, False, 0.5)]
+
+
+def test_main_without_workload_is_usage_error(tmp_path):
+    with pytest.raises(SystemExit) as e:
+        runner.main([str(tmp_path)])
+    assert e.value.code == 2
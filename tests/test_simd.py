@@ -0,0 +1,101 @@
+import pathlib
+
+import pytest
+
+import simd
+
+OPERATIONS = ["copy", "triad", "load", "store"]
+DATA_TYPES = ["double", "float", "int"]
+# prefix, register width and feature checked at runtime of each instruction set
+INSTRUCTION_SETS = {"sse": ("_mm", 128, "sse4.1"), "avx2": ("_mm256", 256, "avx2"), "avx512": ("_mm512", 512, "avx512f")}
+
+
+def get_intrinsics(isa: str, data_type: str) -> dict:
+    prefix, bits, _ = INSTRUCTION_SETS[isa]
+    suffix = {"double": "pd", "float": "ps", "int": "epi32"}[data_type]
+    if data_type == "int":
+        return {"load": f"{prefix}_loadu_si{bits}((const void*) (A + base + j))",
+                "store": f"{prefix}_storeu_si{bits}((void*) (",
+                "mul": f"{prefix}_mullo_epi32(", "add": f"{prefix}_add_epi32(", "set1": f"{prefix}_set1_epi32(",
+                "setzero": f"{prefix}_setzero_si{bits}()"}
+    return {"load": f"{prefix}_loadu_{suffix}(A + base + j)", "store": f"{prefix}_storeu_{suffix}(",
+            "mul": f"{prefix}_mul_{suffix}(", "add": f"{prefix}_add_{suffix}(", "set1": f"{prefix}_set1_{suffix}(",
+            "setzero": f"{prefix}_setzero_{suffix}()"}
+
+
+def get_cpu_flags() -> set:
+    cpuinfo = pathlib.Path("/proc/cpuinfo")
+    if not cpuinfo.exists():
+        return set()
+    return {flag for line in cpuinfo.read_text().splitlines() if line.startswith("flags") for flag in line.split(":", 1)[1].split()}
+
+
+def test_vector_width():
+    assert simd.get_registered("sse").get_vector_width("double") == 2
+    assert simd.get_registered("avx2").get_vector_width("float") == 8
+    assert simd.get_registered("avx512").get_vector_width("int") == 16
+    assert simd.simd_modes == ["auto", "scalar", "sse", "avx2", "avx512"]
+
+
+@pytest.mark.parametrize("isa", list(INSTRUCTION_SETS))
+@pytest.mark.parametrize("data_type", DATA_TYPES)
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_intrinsic_kernels(generate, isa, data_type, operation):
+    code = generate(["-P", f"strided-{operation}", "--simd", isa, "-T", data_type])
+    _, _, feature = INSTRUCTION_SETS[isa]
+    intrinsics = get_intrinsics(isa, data_type)
+    assert f"__attribute__((target(\"{feature}\"))) double mwg_strided_{operation}_{isa}({data_type}* A, " in code
+    assert f"MWG_SCALAR_FUNCTION double mwg_strided_{operation}_scalar({data_type}* A, " in code
+    if operation == "copy":
+        address = "B + base + j)" if data_type == "int" else "B + base + j"
+        assert f"{intrinsics['store']}{address}, {intrinsics['load']});" in code
+    elif operation == "triad":
+        assert intrinsics["add"] + intrinsics["load"] in code
+        assert intrinsics["mul"] + intrinsics["set1"] in code
+        assert intrinsics["store"] + "C + base + j" in code
+    elif operation == "load":
+        assert f"acc = {intrinsics['setzero']};" in code
+        assert f"acc = {intrinsics['add']}acc, {intrinsics['load']});" in code
+    else:
+        assert intrinsics["store"] + "A + base + j" in code
+        assert intrinsics["set1"] + ("1" if data_type == "int" else "1.0") in code
+    # the kernel is selected by CPUID at runtime and falls back to scalar code
+    assert f"if (__builtin_cpu_supports(\"{feature}\")) {{" in code
+    assert f"kernel = mwg_strided_{operation}_{isa};" in code
+    assert f"mwg_strided_kernel_t kernel = mwg_strided_{operation}_scalar;" in code
+
+
+@pytest.mark.parametrize("data_type", DATA_TYPES)
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_scalar_kernels(generate, data_type, operation):
+    code = generate(["-P", f"strided-{operation}", "--simd", "scalar", "-T", data_type])
+    assert f"MWG_SCALAR_FUNCTION double mwg_strided_{operation}_scalar({data_type}* A, " in code
+    assert "MWG_NOVECTOR" in code
+    assert "__builtin_cpu_supports" not in code
+    assert "_mm" not in code.replace("#include <immintrin.h>", "")
+
+
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_auto_kernels(generate, operation):
+    # auto leaves vectorization of the plain loop to the compiler
+    code = generate(["-P", f"strided-{operation}"])
+    assert "mwg_strided_run" not in code
+    assert "__builtin_cpu_supports" not in code
+    assert "immintrin.h" not in code
+
+
+@pytest.mark.parametrize("mode", simd.simd_modes)
+def test_simd_workload_runs(run_workload, mode):
+    output = run_workload(["-P", "strided-triad", "-S", "1MiB", "-n", "2", "--simd", mode])
+    assert "Computation took" in output
+    if mode == "auto":
+        assert "Using " not in output
+        return
+    if mode == "scalar":
+        assert "Using scalar kernel" in output
+        return
+    flags = get_cpu_flags()
+    if len(flags) == 0:
+        pytest.skip("the CPU flags are unknown")
+    supported = INSTRUCTION_SETS[mode][2].replace(".", "_") in flags
+    assert f"Using {mode if supported else 'scalar'} kernel" in output
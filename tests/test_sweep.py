@@ -0,0 +1,89 @@
+import pytest
+
+import cli
+import hardware
+import sweep
+
+
+def test_expand_range_linear():
+    assert sweep._expand_range("1:4") == ["1", "2", "3", "4"]
+    assert sweep._expand_range("1KiB:4KiB:1KiB") == ["1024", "2048", "3072", "4096"]
+
+
+def test_expand_range_geometric():
+    assert sweep._expand_range("1KiB:8KiB:*2") == ["1024", "2048", "4096", "8192"]
+    assert sweep._expand_range("1:10:*3") == ["1", "3", "9"]
+
+
+def test_expand_range_fractional():
+    assert sweep._expand_range("0:1:0.25", float) == ["0.0", "0.25", "0.5", "0.75", "1.0"]
+    assert sweep._expand_range("0:0.3:0.1", float) == ["0.0", "0.1", "0.2", "0.3"]
+    assert sweep._expand_range("0.5:2:*2", float) == ["0.5", "1.0", "2.0"]
+
+
+@pytest.mark.parametrize("spec", ["1", "1:2:3:4", "1:foo", "1:4:*x", "1:4:*1", "1:4:0"])
+def test_expand_range_invalid(spec):
+    with pytest.raises(AttributeError):
+        sweep._expand_range(spec)
+
+
+def test_option_actions(parser):
+    actions = cli.get_option_actions(parser)
+    assert actions["-S"] is actions["--size"]
+    assert actions["--size"].dest == "size"
+    assert actions["--read-ratio"].type is not None
+    assert "--no-such-option" not in actions
+
+
+def test_parse_sweep_spec(parser):
+    assert sweep.parse_sweep_spec("stride=1,2, 4", parser) == ("--stride", ["1", "2", "4"])
+    assert sweep.parse_sweep_spec("--size=1KiB:2KiB:1KiB,1MiB", parser) == ("--size", ["1024", "2048", "1MiB"])
+
+
+def test_parse_sweep_spec_fractional_range(parser):
+    assert sweep.parse_sweep_spec("target-bandwidth=0.5:2.5:1", parser) == ("--target-bandwidth", ["0.5", "1.5", "2.5"])
+    assert sweep.parse_sweep_spec("read-ratio=0:1:0.5", parser) == ("--read-ratio", ["0.0", "0.5", "1.0"])
+    assert sweep.parse_sweep_spec("stride=1:3", parser) == ("--stride", ["1", "2", "3"])
+
+
+@pytest.mark.parametrize("spec", ["stride", "bogus=1", "stride=,", "stride=1:2:0.5", "read-ratio=0:2:1", "type=1:4"])
+def test_parse_sweep_spec_invalid(parser, spec):
+    with pytest.raises(AttributeError):
+        sweep.parse_sweep_spec(spec, parser)
+
+
+def test_parse_sweep_spec_hierarchy(parser, monkeypatch):
+    topology = hardware.Topology([hardware.Cache(1, 32 * 1024, 64, 8, "0"), hardware.Cache(2, 2 * 1024 ** 2, 64, 16, "0")],
+                                 [hardware.Node(0, 64 * 1024 ** 3, "0")], {})
+    monkeypatch.setattr(hardware, "discover", lambda root="/sys": topology)
+    option, values = sweep.parse_sweep_spec("size=hierarchy", parser)
+    assert option == "--size"
+    assert values == [str(size) for _, size in hardware.get_hierarchy_sizes(topology)]
+    assert len(values) == 3
+
+
+def test_expand_sweep(parser):
+    points = sweep.expand_sweep(["stride=1,2", "size=1MiB,2MiB,4MiB"], parser)
+    assert len(points) == 6
+    assert points[0] == {"--stride": "1", "--size": "1MiB"}
+    assert points[-1] == {"--stride": "2", "--size": "4MiB"}
+
+
+def test_get_point_arguments(parser):
+    base = ["-P", "random-load"]
+    assert sweep.get_point_arguments(base, {"--size": "1MiB", "--parallelize": "true"}, parser) == \
+        ["-P", "random-load", "--size", "1MiB", "--parallelize"]
+    assert sweep.get_point_arguments(base, {"--parallelize": "false"}, parser) == base
+
+
+def test_get_runtime_arguments(parser):
+    point = {"--size": "1KiB", "--stride": "2", "--pattern": "random-load"}
+    assert sweep.get_runtime_arguments(point, parser) == ["--size=1024", "--stride=2"]
+
+
+def test_compile_time_key_groups_runtime_parameters(parser):
+    points = sweep.expand_sweep(["size=1MiB,2MiB", "pattern=random-load,random-store"], parser)
+    args = parser.parse_args(["--runtime-parameters"])
+    assert len({sweep._get_compile_time_key(args, point, parser) for point in points}) == 2
+    args = parser.parse_args([])
+    assert len({sweep._get_compile_time_key(args, point, parser) for point in points}) == 4
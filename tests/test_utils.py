@@ -0,0 +1,45 @@
+import argparse
+
+import pytest
+
+import utils
+
+
+@pytest.mark.parametrize("size, expected", [
+    ("4096", 4096),
+    (4096, 4096),
+    ("512B", 512),
+    ("1kB", 1000),
+    ("1KiB", 1024),
+    ("1.5 MiB", 3 * 2 ** 19),
+    ("2MB", 2 * 10 ** 6),
+    ("1gib", 2 ** 30),
+    ("1GB", 10 ** 9),
+    ("2TiB", 2 ** 41),
+    (".5KiB", 512),
+])
+def test_parse_size(size, expected):
+    assert utils.parse_size(size) == expected
+
+
+@pytest.mark.parametrize("size", ["", "foo", "1XiB", "-1KiB", "1 2", "KiB"])
+def test_parse_size_malformed(size):
+    with pytest.raises(argparse.ArgumentTypeError):
+        utils.parse_size(size)
+
+
+def test_parse_and_assert():
+    parse = utils.parse_and_assert(int, lambda x: x >= 1, "The number must be at least 1")
+    assert parse("3") == 3
+    with pytest.raises(argparse.ArgumentTypeError, match="at least 1"):
+        parse("0")
+    with pytest.raises(argparse.ArgumentTypeError, match="Malformed value 'x'"):
+        parse("x")
+
+
+@pytest.mark.parametrize("argv", [["-S", "foo"], ["--chains", "0"], ["--chains", "x"]])
+def test_invalid_options_are_usage_errors(parser, argv, capsys):
+    with pytest.raises(SystemExit) as e:
+        parser.parse_args(argv)
+    assert e.value.code == 2
+    assert "error: argument" in capsys.readouterr().err
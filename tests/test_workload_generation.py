@@ -0,0 +1,303 @@
+import json
+import math
+import os
+import re
+
+import pytest
+
+import workload_generation
+
+
+def test_distribution_parameters_of_phases(generate, tmp_path):
+    spec = tmp_path / "spec.json"
+    spec.write_text(json.dumps([{"name": "mild", "pattern": "random-load", "size": "1MiB", "zipf-theta": 0.5},
+                                {"name": "steep", "pattern": "random-load", "size": "1MiB", "zipf-theta": 1.2}]))
+    code = generate(["--spec", str(spec), "--distribution", "zipf"])
+    assert code.count("void mwg_distribution_init(") == 1
+    assert "mwg_distribution_init(&distribution, size, 0.5);" in code
+    assert "mwg_distribution_init(&distribution, size, 1.2);" in code
+
+
+def test_hotspot_parameters(generate):
+    code = generate(["-P", "random-load", "--distribution", "hotspot", "--hot-fraction", "0.1", "--hot-probability", "0.9"])
+    assert "mwg_distribution_init(&distribution, size, 0.1, 0.9);" in code
+    assert "d->hot_probability" in code
+
+
+def test_prefetch_hint_of_phases(generate, tmp_path):
+    spec = tmp_path / "spec.json"
+    spec.write_text(json.dumps([{"name": "near", "pattern": "strided-load", "prefetch-hint": "t0"},
+                                {"name": "far", "pattern": "strided-load", "prefetch-hint": "nta"}]))
+    code = generate(["--spec", str(spec), "--prefetch-distance", "16"])
+    assert code.count("#define MWG_PREFETCH(address, locality)") == 1
+    assert "MWG_PREFETCH(&A[i + prefetch_ahead], 3);" in code
+    assert "MWG_PREFETCH(&A[i + prefetch_ahead], 0);" in code
+
+
+def test_shuffle_of_random_patterns(generate):
+    code = generate(["-P", "random-load"])
+    assert "mwg_shuffle(size, next_indices" in code
+    assert "mwg_parallel_shuffle" not in code
+    code = generate(["-P", "random-load", "--parallelize"])
+    assert "void mwg_parallel_shuffle(" in code
+    assert "mwg_parallel_shuffle(size, next_indices" in code
+
+
+def test_random_definitions(get_definitions, run_c):
+    definitions = get_definitions(["--parallelize"], workload_generation.write_random_definitions)
+    output = run_c(definitions + """
+int main() {
+    size_t n = 100003;
+    size_t* a = (size_t*) malloc(sizeof(size_t) * n);
+    char* seen = (char*) calloc(n, 1);
+    for (size_t i = 0; i < n; i++) {
+        a[i] = i;
+    }
+    omp_set_num_threads(4);
+    mwg_parallel_shuffle(n, a, 42);
+    size_t fixed = 0;
+    for (size_t i = 0; i < n; i++) {
+        if (a[i] >= n || seen[a[i]]) {
+            printf("not a permutation\\n");
+            return 1;
+        }
+        seen[a[i]] = 1;
+        fixed += a[i] == i;
+    }
+    mwg_rng_t rng;
+    mwg_rng_seed(&rng, 1);
+    size_t counts[3] = {0, 0, 0};
+    for (int i = 0; i < 300000; i++) {
+        counts[mwg_rng_below(&rng, 3)]++;
+    }
+    printf("%zu %zu %zu %zu\\n", fixed, counts[0], counts[1], counts[2]);
+    return 0;
+}
+""")
+    fixed, *counts = [int(v) for v in output.split()]
+    # a uniform permutation has a single fixed point on average
+    assert fixed < 10
+    assert all(abs(c - 100000) < 2000 for c in counts)
+
+
+def test_parallel_random_workload_runs(run_workload):
+    output = run_workload(["-P", "random-load", "--parallelize", "-t", "4", "-S", "1MiB"])
+    assert "Computation took" in output
+
+
+# samples a skewed distribution over n items and prints the fraction of samples of each rank, the bijection scattering
+# ranks over the items is inverted to recover the rank of a sample
+_DISTRIBUTION_HISTOGRAM = """
+int main() {
+    uint64_t n = 1000;
+    uint64_t samples = 2000000;
+    mwg_distribution_t distribution;
+    mwg_distribution_init(&distribution, n, %PARAMETERS%);
+    uint64_t* rank = (uint64_t*) malloc(sizeof(uint64_t) * n);
+    uint64_t* counts = (uint64_t*) calloc(n, sizeof(uint64_t));
+    for (uint64_t i = 0; i < n; i++) {
+        rank[i] = n;
+    }
+    for (uint64_t k = 0; k < n; k++) {
+        uint64_t item = mwg_scatter(k, distribution.multiplier, n);
+        if (rank[item] != n) {
+            printf("not a bijection\\n");
+            return 1;
+        }
+        rank[item] = k;
+    }
+    mwg_rng_t rng;
+    mwg_rng_seed(&rng, 7);
+    for (uint64_t i = 0; i < samples; i++) {
+        uint64_t item = mwg_distribution_sample(&distribution, &rng);
+        if (item >= n) {
+            printf("sample out of range\\n");
+            return 1;
+        }
+        counts[rank[item]]++;
+    }
+    for (uint64_t k = 0; k < n; k++) {
+        printf("%f\\n", (double) counts[k] / samples);
+    }
+    return 0;
+}
+"""
+
+
+def get_rank_frequencies(get_definitions, run_c, argv, parameters):
+    definitions = get_definitions(argv, workload_generation.write_random_definitions,
+                                  workload_generation.write_distribution_definitions)
+    output = run_c(definitions + _DISTRIBUTION_HISTOGRAM.replace("%PARAMETERS%", parameters))
+    return [float(v) for v in output.split()]
+
+
+@pytest.mark.parametrize("theta", [0.5, 1.0, 1.2])
+def test_zipf_sampler(get_definitions, run_c, theta):
+    frequencies = get_rank_frequencies(get_definitions, run_c, ["--distribution", "zipf"], str(theta))
+    normalization = sum(1 / k ** theta for k in range(1, 1001))
+    for k in [1, 2, 10, 100]:
+        assert frequencies[k - 1] == pytest.approx(1 / k ** theta / normalization, rel=0.05)
+
+
+def test_hotspot_sampler(get_definitions, run_c):
+    frequencies = get_rank_frequencies(get_definitions, run_c, ["--distribution", "hotspot"], "0.1, 0.9")
+    # 90% of the samples are spread uniformly over the 100 hot items, the others over the 900 remaining items
+    assert sum(frequencies[:100]) == pytest.approx(0.9, abs=0.005)
+    assert min(frequencies[:100]) == pytest.approx(0.009, rel=0.1)
+    assert sum(frequencies[100:]) == pytest.approx(0.1, abs=0.005)
+    assert max(frequencies[100:]) < min(frequencies[:100]) / 10
+
+
+def test_timeline_kernel(generate):
+    code = generate(["-P", "strided-load", "--sample-interval", "5"])
+    assert "mwg_timeline_add(&timeline, 0.0, 0, 0.0, sample_counters);" in code
+    assert "mwg_next_slice(slice_iterations, slice_end - slice_begin, sample_time - slice_time, 0.005, kernel_iterations);" in code
+    assert "mwg_timeline_write(&timeline, \"timeline.csv\", NULL, timeline_counters, 0, 0);" in code
+    assert "mwg_timeline" not in generate(["-P", "strided-load"])
+    assert "mwg_timeline" not in generate(["-P", "latency", "-S", "64KiB", "--sample-interval", "5"])
+
+
+def test_timeline_of_run(run_workload, tmp_path):
+    timeline = tmp_path / "timeline.csv"
+    output = run_workload(["-P", "strided-load", "-S", "16MiB", "-n", "4", "--sample-interval", "2",
+                           "--timeline", str(timeline)])
+    lines = timeline.read_text().splitlines()
+    assert lines[0] == "time,interval,repetition,timed,bytes,bandwidth"
+    assert f"[metric] timeline.samples = {len(lines) - 1}" in output
+    rows = [[float(v) for v in line.split(",")] for line in lines[1:]]
+    assert len(rows) > 4
+    assert all(row[1] >= 0 and row[5] >= 0 for row in rows)
+    # time and bytes are cumulative, the bytes of the last sample are those of all repetitions
+    assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+    assert all(previous[4] < row[4] for previous, row in zip(rows, rows[1:]))
+    assert f"[metric] main.bytes = {int(rows[-1][4]) // 4}" in output
+    assert sum(row[1] for row in rows) == pytest.approx(rows[-1][0], abs=1e-6 * len(rows))
+    assert {int(row[2]) for row in rows} == {0, 1, 2, 3}
+
+
+def test_throttled_kernel(generate):
+    code = generate(["-P", "strided-load", "--target-bandwidth", "2"])
+    assert "long slice_iterations = mwg_throttle_slice(2000000000.0, " in code
+    assert "mwg_throttle(&throttle, (double) (slice_end - slice_begin) * " in code
+    assert "[metric] main.target_bandwidth = %.6f\\n\", 2.0" in code
+    assert "mwg_throttle" not in generate(["-P", "strided-load"])
+
+
+def test_duration_kernel(generate):
+    code = generate(["-P", "strided-load", "--duration", "0.5"])
+    assert "for (int repetition = 0; repetition < 0 + 1 || mwg_time() < deadline; repetition++) {" in code
+    assert "deadline = mwg_time() + 0.5;" in code
+    assert "times = (double*) realloc(times, sizeof(double) * times_capacity);" in code
+    assert "deadline" not in generate(["-P", "strided-load"])
+
+
+def get_metrics(output: str) -> dict:
+    return {line.split()[1]: float(line.split()[-1]) for line in output.splitlines() if line.startswith("[metric]")}
+
+
+@pytest.mark.parametrize("pattern, result", [
+    ("strided-load", "result = A[0];"),
+    ("strided-store", "result = A[0];"),
+    ("strided-copy", "result = A[0] + B[0];"),
+    ("strided-triad", "result = A[0] + C[0];"),
+    ("random-store", "result = data[0];"),
+])
+def test_result_reads_written_buffers(generate, pattern, result):
+    assert result in generate(["-P", pattern])
+
+
+def test_copy_bandwidth(run_workload):
+    output = run_workload(["-P", "strided-copy", "-S", "64MiB", "-n", "3"])
+    metrics = get_metrics(output)
+    # a copy whose stores were eliminated would report an implausible bandwidth
+    assert math.isfinite(metrics["main.bandwidth"])
+    assert 0.1 < metrics["main.bandwidth"] < 1000
+    assert re.search(r"^Computation took: \d+\.\d{9}s$", output, re.M)
+
+
+def test_throttled_run(run_workload):
+    metrics = get_metrics(run_workload(["-P", "strided-load", "-S", "16MiB", "-n", "4", "--target-bandwidth", "0.5"]))
+    # the tokens saved up before the first slice allow a short burst above the target
+    assert metrics["main.bandwidth"] <= 0.5 * 1.1
+    assert metrics["main.target_bandwidth"] == 0.5
+
+
+def test_duration_run(run_workload):
+    metrics = get_metrics(run_workload(["-P", "strided-load", "-S", "1MiB", "--duration", "0.2"]))
+    # the timed kernels take most of the duration, the rest is spent between repetitions
+    assert metrics["main.time"] >= 0.2 * 0.9
+    assert metrics["main.repetitions"] > 1
+
+
+@pytest.mark.parametrize("placement", workload_generation.PLACEMENTS)
+def test_placement_kernel(generate, placement):
+    code = generate(["-P", "strided-load", "--parallelize", "--placement", placement])
+    assert f"mwg_place_threads({workload_generation.PLACEMENTS.index(placement)}, 0);" in code
+    # the kernel uses the static schedule of the first touch
+    assert "#pragma omp parallel for firstprivate(A) lastprivate(temp) schedule(static)" in code
+    if placement == "per-node":
+        assert "mwg_bind_partition(A, sizeof(*A) * (N), omp_get_thread_num(), omp_get_num_threads());" in code
+        assert "#pragma omp for schedule(static)" in code
+    else:
+        assert "mwg_bind_partition(A" not in code
+        assert "#pragma omp parallel for schedule(static)" in code
+
+
+def test_placement_requires_parallelize(generate):
+    code = generate(["-P", "strided-load", "--placement", "compact"])
+    assert "mwg_place_threads" not in code
+    assert "schedule(static)" not in code
+
+
+def test_bind_partition_skips_partial_pages(get_definitions, run_c):
+    def write_includes(args, generator):
+        args.phases = None
+        generator.include("errno.h", sys=True)
+        generator.include("sys/mman.h", sys=True)
+
+    definitions = get_definitions(["--parallelize", "--placement", "per-node"], write_includes,
+                                  workload_generation.write_placement_definitions)
+    # two partitions of 6 pages starting 100 bytes into a page, the mode of each page is printed (MPOL_BIND = 2)
+    output = run_c(definitions + """
+int main() {
+    long page = sysconf(_SC_PAGESIZE);
+    char* base = (char*) mmap(NULL, 8 * page, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    for (int t = 0; t < 2; t++) {
+        mwg_thread_nodes[t] = mwg_cpu_node(sched_getcpu());
+        mwg_bind_partition(base + 100, 6 * page, t, 2);
+    }
+    for (int p = 0; p < 8; p++) {
+        int mode = -1;
+        unsigned long mask[CPU_SETSIZE / (8 * sizeof(unsigned long))] = {0};
+        syscall(SYS_get_mempolicy, &mode, mask, (unsigned long) CPU_SETSIZE, base + p * page, 1UL << 1);
+        printf("%d\\n", mode);
+    }
+    return 0;
+}
+""")
+    if "warning: failed to bind" in output:
+        pytest.skip("mbind is not permitted")
+    # the first and last page and the page split between the partitions are shared, they stay unbound
+    assert output.split() == ["0", "2", "2", "0", "2", "2", "0", "0"]
+
+
+@pytest.mark.parametrize("placement", workload_generation.PLACEMENTS)
+def test_placement_of_run(run_workload, placement):
+    output = run_workload(["-P", "strided-triad", "-S", "1MiB", "--parallelize", "-t", "2", "--placement", placement])
+    assert "warning:" not in output
+    line = next(line for line in output.splitlines() if line.startswith("Thread placement (thread:CPU/node):"))
+    threads = [tuple(int(v) for v in entry.replace("/", ":").split(":")) for entry in line.split("):", 1)[1].split()]
+    assert [t for t, _, _ in threads] == [0, 1]
+    assert all(cpu in os.sched_getaffinity(0) for _, cpu, _ in threads)
+    assert all(node == get_cpu_node(cpu) for _, cpu, node in threads)
+    nodes = [node for _, _, node in threads]
+    if placement == "scatter" and len({get_cpu_node(cpu) for cpu in os.sched_getaffinity(0)}) > 1:
+        assert nodes[0] != nodes[1]
+    else:
+        assert nodes == sorted(nodes)
+
+
+def get_cpu_node(cpu: int) -> int:
+    # like mwg_cpu_node(), the node<n> link in the sysfs directory of the CPU
+    links = [entry.name for entry in os.scandir(f"/sys/devices/system/cpu/cpu{cpu}") if re.match(r"^node\d+$", entry.name)]
+    return int(links[0][4:]) if len(links) > 0 else 0
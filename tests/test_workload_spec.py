@@ -0,0 +1,136 @@
+import argparse
+import json
+
+import pytest
+
+import main
+import workload_spec
+
+
+def write_spec(tmp_path, spec, name="spec.json"):
+    path = tmp_path / name
+    path.write_text(json.dumps(spec))
+    return str(path)
+
+
+def get_phases(parser, tmp_path, spec, argv=()):
+    args = parser.parse_args(list(argv))
+    args.spec = workload_spec.load_spec(write_spec(tmp_path, spec))
+    return workload_spec.get_phases(args, parser)
+
+
+def test_load_spec_names_phases(tmp_path):
+    phases = workload_spec.load_spec(write_spec(tmp_path, [{"pattern": "strided-load"}, {"name": "copy", "idle": 5}]))
+    assert [p["name"] for p in phases] == ["phase0", "copy"]
+    phases = workload_spec.load_spec(write_spec(tmp_path, {"phases": [{"pattern": "strided-load"}]}))
+    assert [p["name"] for p in phases] == ["phase0"]
+
+
+def test_load_spec_yaml(tmp_path):
+    pytest.importorskip("yaml")
+    path = tmp_path / "spec.yaml"
+    path.write_text("phases:\n  - name: load\n    pattern: strided-load\n    size: 1MiB\n")
+    assert workload_spec.load_spec(str(path)) == [{"name": "load", "pattern": "strided-load", "size": "1MiB"}]
+
+
+@pytest.mark.parametrize("spec", [
+    [],
+    {"phase": []},
+    ["strided-load"],
+    [{"pattern": "strided-load", "bogus": 1}],
+    [{"name": "a"}, {"name": "a"}],
+    [{"name": "1st"}],
+    [{"name": "idle_start"}],
+    [{"buffers": {"A": "not a name"}}],
+])
+def test_load_spec_invalid(tmp_path, spec):
+    with pytest.raises(argparse.ArgumentTypeError):
+        workload_spec.load_spec(write_spec(tmp_path, spec))
+
+
+@pytest.mark.parametrize("name, content", [
+    ("spec.json", "[{\"pattern\": "),
+    ("spec.json", b"\xff\xfe"),
+    ("spec.yaml", "phases: [{pattern: "),
+])
+def test_load_spec_malformed(tmp_path, name, content):
+    if name.endswith(".yaml"):
+        pytest.importorskip("yaml")
+    path = tmp_path / name
+    path.write_bytes(content if isinstance(content, bytes) else content.encode())
+    with pytest.raises(argparse.ArgumentTypeError, match="Malformed specification"):
+        workload_spec.load_spec(str(path))
+
+
+def test_load_spec_missing(tmp_path):
+    with pytest.raises(argparse.ArgumentTypeError, match="Cannot read specification"):
+        workload_spec.load_spec(str(tmp_path / "missing.json"))
+
+
+def test_get_phases_applies_options(parser, tmp_path):
+    phases = get_phases(parser, tmp_path, [{"name": "load", "pattern": "strided-load", "size": "1KiB", "idle": 10},
+                                           {"name": "chase", "pattern": "random-load", "chains": 4, "type": "int"}],
+                        ["-S", "2KiB", "-T", "double"])
+    assert [p.name for p in phases] == ["load", "chase"]
+    assert [p.idle for p in phases] == [10, 0]
+    assert repr(phases[0].args.pattern) == "strided-load"
+    assert phases[0].args.size == 1024
+    assert phases[1].args.size == 2048
+    assert phases[1].args.chains == 4
+    assert [p.args.dataType for p in phases] == ["double", "int"]
+
+
+def test_get_phases_without_spec(parser):
+    assert workload_spec.get_phases(parser.parse_args([]), parser) is None
+
+
+def test_get_phases_shares_buffers(parser, tmp_path):
+    phases = get_phases(parser, tmp_path, [{"name": "write", "pattern": "strided-store", "buffers": {"A": "data"}},
+                                           {"name": "read", "pattern": "strided-load", "buffers": {"A": "data"}}])
+    assert phases[0].args.allocator.owned == ["data"]
+    assert phases[1].args.allocator.owned == []
+    assert phases[1].args.allocator.reuses("A")
+    assert [name for name, _ in workload_spec.get_shared_buffers(phases)] == ["data"]
+
+
+@pytest.mark.parametrize("spec, argv", [
+    ([{"pattern": "strided-load", "size": "foo"}], []),
+    ([{"pattern": "strided-load", "chains": 0}], []),
+    ([{"pattern": "sequential"}], []),
+    ([{"pattern": "strided-load"}], ["--runtime-parameters"]),
+    ([{"pattern": "strided-load"}, {"pattern": "strided-copy", "type": "int"}], ["--nt-stores"]),
+    ([{"pattern": "strided-load", "buffers": {"B": "data"}}], []),
+    ([{"pattern": "gather", "buffers": {"data": "data"}}], []),
+])
+def test_get_phases_invalid(parser, tmp_path, spec, argv):
+    with pytest.raises(AttributeError):
+        get_phases(parser, tmp_path, spec, argv)
+
+
+def test_get_phases_unknown_option(parser):
+    args = parser.parse_args([])
+    args.spec = [{"name": "phase0", "pattern": "strided-load", "bogus": 1}]
+    with pytest.raises(AttributeError, match="Unknown option 'bogus' in phase phase0"):
+        workload_spec.get_phases(args, parser)
+
+
+@pytest.mark.parametrize("spec, message", [
+    ([{"pattern": "strided-load", "bogus": 1}], "Unknown key(s) bogus in phase 0"),
+    ([{"pattern": "strided-load", "size": "foo"}], "Invalid value 'foo' of size in phase phase0"),
+    ([{"name": "load", "pattern": "strided-load", "buffers": {"B": "data"}}], "Pattern strided-load of phase load has no buffer(s) B"),
+])
+def test_invalid_spec_is_usage_error(tmp_path, capsys, spec, message):
+    with pytest.raises(SystemExit) as e:
+        main.main(["-o", str(tmp_path / "out"), "--spec", write_spec(tmp_path, spec)])
+    assert e.value.code == 2
+    assert message in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
+
+
+def test_invalid_spec_of_sweep_is_usage_error(tmp_path, capsys):
+    spec = write_spec(tmp_path, [{"name": "load", "pattern": "strided-load", "buffers": {"B": "data"}}])
+    with pytest.raises(SystemExit) as e:
+        main.main(["-o", str(tmp_path / "out"), "--spec", spec, "--sweep", "stride=1,2"])
+    assert e.value.code == 2
+    assert "Pattern strided-load of phase load has no buffer(s) B" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()